@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Optional, Dict
 import os
 
 class Settings(BaseSettings):
@@ -30,6 +30,52 @@ class Settings(BaseSettings):
     # File storage
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024  # 64KB
+    UPLOAD_FORM_OVERHEAD: int = 64 * 1024  # multipart headers and form fields allowed on top of MAX_FILE_SIZE
+    RESUMABLE_UPLOAD_TTL: int = 24 * 3600  # seconds since the last chunk before a partial upload expires
+    RESUMABLE_UPLOAD_SWEEP_INTERVAL: int = 15 * 60
+
+    # Object storage: "local" serves files from disk, "s3" uses presigned URLs
+    STORAGE_BACKEND: str = "local"
+    STORAGE_URL_EXPIRY: int = 900  # seconds a presigned URL stays valid
+    STORAGE_KEEP_LOCAL_COPY: bool = True  # keep processed files on disk as a cache
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. http://localhost:9000 for MinIO
+    S3_KEY_PREFIX: str = ""
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024  # 8MB
+    S3_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
+
+    # Admin review previews (name -> longest side in pixels)
+    PREVIEW_SIZES: Dict[str, int] = {"thumb": 240, "preview": 1024}
+    PREVIEW_QUALITY: int = 80
+    PREVIEW_CACHE_MAX_AGE: int = 365 * 24 * 3600
+
+    # Document templates (field-ROI OCR for known ID layouts)
+    DOCUMENT_TEMPLATE_DIR: str = "document_templates"
+    TEMPLATE_ALIGN_WIDTH: int = 800
+    TEMPLATE_ORB_FEATURES: int = 1500
+    TEMPLATE_MIN_INLIERS: int = 25
+
+    # Document localisation (boundary detection + perspective crop)
+    DOCUMENT_DETECT_WIDTH: int = 640
+    DOCUMENT_CANONICAL_WIDTH: int = 1200
+    DOCUMENT_MIN_AREA_RATIO: float = 0.2
+
+    # OCR language selection (detected script -> Tesseract traineddata). Below
+    # OCR_OSD_MIN_CONFIDENCE (OSD score) and OCR_SCRIPT_MIN_SHARE (share of letters
+    # in a quick OCR pass) the document is read with all installed OCR_LANGUAGES
+    OCR_DEFAULT_LANGUAGE: str = "eng"
+    OCR_LANGUAGES: str = "eng+hin+ben+pan+guj+ori+tam+tel+kan+mal"
+    OCR_SCRIPT_LANGUAGES: Dict[str, str] = {
+        "Latin": "eng", "Devanagari": "hin", "Bengali": "ben", "Gurmukhi": "pan", "Gujarati": "guj",
+        "Oriya": "ori", "Tamil": "tam", "Telugu": "tel", "Kannada": "kan", "Malayalam": "mal"
+    }
+    OCR_OSD_MIN_CONFIDENCE: float = 2.0
+    OCR_SCRIPT_MIN_SHARE: float = 0.6
+    SCRIPT_DETECT_WIDTH: int = 800
+
+    # Orientation normalisation (longest thumbnail side for the text-direction estimate)
+    ORIENTATION_THUMBNAIL_SIZE: int = 600
     
     # LiveKit
     LIVEKIT_URL: str = "wss://your-livekit-server.com"
@@ -52,6 +98,91 @@ class Settings(BaseSettings):
     
     # Sarvam AI
     SARVAM_API_KEY: Optional[str] = None
+    SARVAM_WS_URL: str = "wss://api.sarvam.ai/speech-to-text-translate/ws"
+    STT_FRAME_MS: int = 200  # Audio per upstream message (100-250 ms keeps latency low)
+
+    # Upstream STT connection policy: connect when a speaker joins (pre-warm), reconnect
+    # with jittered exponential backoff, and stop all retries for STT_BREAKER_RESET
+    # seconds after STT_BREAKER_THRESHOLD consecutive connect failures
+    STT_PREWARM: bool = True
+    STT_PREWARM_TTL: float = 30.0  # Unused pre-warmed connections older than this are not reused
+    STT_CONNECT_TIMEOUT: float = 10.0
+    STT_RECONNECT_BASE: float = 0.5
+    STT_RECONNECT_MAX: float = 30.0
+    STT_BREAKER_THRESHOLD: int = 5
+    STT_BREAKER_RESET: float = 30.0
+    STT_MAX_BUFFERED_MS: int = 10000  # Audio kept for upstream while disconnected
+
+    # Speech-to-text engine: "sarvam" (cloud streaming) or "whisper" (local CPU model via
+    # faster-whisper). Whisper transcribes VAD speech segments, batching the segments of
+    # all sessions that are ready within WHISPER_BATCH_WAIT_MS into one inference call
+    STT_ENGINE: str = "sarvam"
+    WHISPER_MODEL: str = "small"  # Model size or path to a converted CTranslate2 model
+    WHISPER_COMPUTE_TYPE: str = "int8"
+    WHISPER_CPU_THREADS: int = 0  # 0 = CTranslate2 default
+    WHISPER_BATCH_SIZE: int = 8
+    WHISPER_BATCH_WAIT_MS: int = 100
+    WHISPER_MAX_SEGMENT_MS: int = 20000  # Longer speech is cut into segments of this length
+    WHISPER_NO_SPEECH_THRESHOLD: float = 0.6
+
+    # Server-side voice-activity gate: only speech (plus pre-roll and hangover)
+    # and a short ambient keep-alive every few seconds are sent to the STT provider
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 20
+    VAD_ONSET_MS: int = 40  # Speech needed to open the gate
+    VAD_PREROLL_MS: int = 300
+    VAD_HANGOVER_MS: int = 600
+    VAD_MARGIN_DB: float = 9.0  # Energy above the adaptive noise floor that counts as speech
+    VAD_MIN_SPEECH_DBFS: float = -55.0
+    VAD_KEEPALIVE_INTERVAL_MS: int = 4000
+    VAD_KEEPALIVE_MS: int = 200
+
+    # Transcript fan-out between workers: "memory" (single worker), "redis" or "postgres".
+    # PUBSUB_URL is the Redis URL, or a Postgres DSN (defaults to DATABASE_URL)
+    PUBSUB_BACKEND: str = "memory"
+    PUBSUB_URL: Optional[str] = None
+
+    # Partial transcripts published per speaker per second (0 = no limit)
+    PARTIAL_MAX_RATE: float = 5.0
+
+    # Per-subscriber transcript send queue: partials are dropped first when full,
+    # and a subscriber whose oldest queued message is older than the lag is evicted
+    SUBSCRIBER_QUEUE_SIZE: int = 256
+    SUBSCRIBER_MAX_LAG: float = 10.0
+
+    # Final transcripts are bulk-inserted into transcript_segments every
+    # TRANSCRIPT_BATCH_INTERVAL_MS or once TRANSCRIPT_BATCH_SIZE rows are waiting
+    TRANSCRIPT_BATCH_INTERVAL_MS: int = 500
+    TRANSCRIPT_BATCH_SIZE: int = 100
+
+    # Session reaper: sessions nobody streams to or subscribes to are ended (transcripts
+    # flushed to the session file and the database) after SESSION_IDLE_TTL seconds without
+    # activity; sessions with no activity at all for SESSION_MAX_IDLE are ended even with
+    # subscribers still attached, but never while audio streams through any worker. Checked every
+    # SESSION_REAP_INTERVAL seconds
+    SESSION_IDLE_TTL: float = 300.0
+    SESSION_MAX_IDLE: float = 3600.0
+    SESSION_REAP_INTERVAL: float = 30.0
+
+    # Call recording: each speaker's audio is teed off the transcription stream into a
+    # lossless track, and at session end the tracks are mixed into a stereo recording
+    # (User left, Agent right) as "opus" (Ogg), "flac" or "wav". Audio older than
+    # RECORDING_JITTER_MS is written every RECORDING_FLUSH_MS; a speaker buffering more
+    # than RECORDING_MAX_BUFFER_MS loses its oldest audio. Tracks recorded on different
+    # workers are aligned by wall clock, so the workers' clocks must be kept in sync (NTP)
+    RECORDING_ENABLED: bool = True
+    RECORDING_FORMAT: str = "opus"
+    RECORDING_FLUSH_MS: int = 500
+    RECORDING_JITTER_MS: int = 1000
+    RECORDING_MAX_BUFFER_MS: int = 10000
+
+    # Bearer token required by /metrics (series carry session ids); /metrics is disabled while unset
+    METRICS_TOKEN: Optional[str] = None
+
+    # Transcript journal durability: "always" fsyncs every record, "interval" at most
+    # TRANSCRIPT_FSYNC_INTERVAL seconds after a write, "never" leaves it to the OS
+    TRANSCRIPT_FSYNC_POLICY: str = "interval"
+    TRANSCRIPT_FSYNC_INTERVAL: float = 1.0
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -1,9 +1,20 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from config import settings
 
 engine = create_async_engine(settings.async_database_url, echo=settings.DEBUG)
 
+
+def begin_before_savepoint(conn, name):
+    """pysqlite only opens a transaction before DML, so a SAVEPOINT issued first
+    would start one that its RELEASE commits; open the outer transaction explicitly"""
+    if not conn.connection.driver_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN")
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "savepoint", begin_before_savepoint)
+
 async_session_maker = async_sessionmaker(
     engine, 
     class_=AsyncSession, 
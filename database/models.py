@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, String, DateTime, Float, Boolean, ForeignKey, Enum, Text, Integer, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -24,6 +24,10 @@ class DocumentType(str, enum.Enum):
     NATIONAL_ID = "national_id"
     OTHER = "other"
 
+class UploadKind(str, enum.Enum):
+    DOCUMENT = "document"
+    SELFIE = "selfie"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -54,6 +58,29 @@ class KYCSession(Base):
     liveness_check = relationship("LivenessCheck", back_populates="kyc_session", uselist=False)
     video_session = relationship("VideoSession", back_populates="kyc_session", uselist=False)
 
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+    
+    sha256 = Column(String, primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ResumableUpload(Base):
+    __tablename__ = "resumable_uploads"
+    
+    id = Column(String, primary_key=True, default=generate_uuid)
+    kyc_session_id = Column(String, ForeignKey("kyc_sessions.id"), nullable=False)
+    kind = Column(Enum(UploadKind), nullable=False)
+    document_type = Column(Enum(DocumentType), nullable=True)
+    size = Column(Integer, nullable=False)  # Declared total size in bytes
+    received = Column(Integer, default=0, nullable=False)  # Bytes written so far (next offset)
+    content_type = Column(String, nullable=True)  # Sniffed from the first chunk
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Document(Base):
     __tablename__ = "documents"
     
@@ -61,10 +88,14 @@ class Document(Base):
     kyc_session_id = Column(String, ForeignKey("kyc_sessions.id"), nullable=False)
     document_type = Column(Enum(DocumentType), nullable=False)
     file_path = Column(String, nullable=False)
+    blob_sha256 = Column(String, ForeignKey("stored_blobs.sha256"), nullable=True)
     ocr_data = Column(Text, nullable=True)  # JSON string
     extracted_name = Column(String, nullable=True)
     extracted_dob = Column(String, nullable=True)
     extracted_id_number = Column(String, nullable=True)
+    normalized_path = Column(String, nullable=True)  # Cropped, upright document
+    portrait_path = Column(String, nullable=True)  # Face crop used for verification
+    validation_data = Column(Text, nullable=True)  # JSON string
     uploaded_at = Column(DateTime, default=datetime.utcnow)
     
     kyc_session = relationship("KYCSession", back_populates="documents")
@@ -75,6 +106,7 @@ class FaceVerification(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     kyc_session_id = Column(String, ForeignKey("kyc_sessions.id"), nullable=False)
     selfie_path = Column(String, nullable=False)
+    selfie_sha256 = Column(String, ForeignKey("stored_blobs.sha256"), nullable=True)
     document_face_path = Column(String, nullable=True)
     match_score = Column(Float, nullable=True)
     is_match = Column(Boolean, default=False)
@@ -110,3 +142,35 @@ class VideoSession(Base):
     agent_notes = Column(Text, nullable=True)
     
     kyc_session = relationship("KYCSession", back_populates="video_session")
+
+class CallRecordingTrack(Base):
+    """One speaker's audio as recorded by one worker, mixed into the call recording at session end"""
+    __tablename__ = "call_recording_tracks"
+    
+    id = Column(String, primary_key=True, default=generate_uuid)
+    kyc_session_id = Column(String, ForeignKey("kyc_sessions.id"), nullable=False, index=True)
+    speaker = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    started_at = Column(Float, nullable=False)  # Wall-clock (epoch) time of the first sample
+    samples = Column(Integer, default=0, nullable=False)
+    status = Column(String, default="recording", nullable=False)  # recording, done
+    mix_id = Column(String, nullable=True)  # Claim of the worker mixing it
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TranscriptSegment(Base):
+    """A final transcript line, written in batches by the transcript store"""
+    __tablename__ = "transcript_segments"
+    __table_args__ = (
+        Index("ix_transcript_segments_session_time", "session_id", "spoken_at", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    transcript_id = Column(String, unique=True, nullable=False)  # Id of the live transcript entry
+    session_id = Column(String, nullable=False)  # Transcription session (the KYC session id)
+    speaker = Column(String, nullable=False)
+    original_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=True)
+    source_language = Column(String, nullable=True)
+    target_language = Column(String, nullable=True)
+    confidence = Column(Float, nullable=True)
+    spoken_at = Column(DateTime, nullable=False)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 from datetime import datetime
-from database.models import KYCStatus, DocumentType
+from database.models import KYCStatus, DocumentType, UploadKind
 
 # Auth Schemas
 class UserCreate(BaseModel):
@@ -68,6 +68,24 @@ class DocumentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Resumable Upload Schemas
+class ResumableUploadCreate(BaseModel):
+    kind: UploadKind
+    size: int
+    document_type: Optional[DocumentType] = None
+
+class ResumableUploadResponse(BaseModel):
+    id: str
+    kind: UploadKind
+    document_type: Optional[DocumentType]
+    size: int
+    received: int
+    content_type: Optional[str]
+    expires_at: datetime
+    
+    class Config:
+        from_attributes = True
+
 # Face Verification Schemas
 class FaceVerificationResponse(BaseModel):
     id: str
@@ -107,6 +125,23 @@ class VideoSessionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TranscriptSegmentResponse(BaseModel):
+    id: int
+    transcript_id: str
+    speaker: str
+    original_text: str
+    translated_text: Optional[str]
+    source_language: Optional[str]
+    confidence: Optional[float]
+    spoken_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class TranscriptSegmentPage(BaseModel):
+    segments: List[TranscriptSegmentResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+
 class VideoRoomCreate(BaseModel):
     pass
 
@@ -0,0 +1,12 @@
+"""
+Load testing for the transcription WebSocket (/video/ws/{session_id}).
+
+- loadtest.fake_sarvam: a local stand-in for Sarvam's speech-to-text-translate
+  WebSocket with configurable latency, partials and speech events
+- loadtest.harness: drives N simulated calls (a user and an agent stream each)
+  and reports transcript latency percentiles plus server CPU and memory
+
+Quick run against a freshly spawned server and simulator:
+
+    python -m loadtest.harness --spawn --sessions 20 --duration 60
+"""
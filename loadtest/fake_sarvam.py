@@ -0,0 +1,177 @@
+"""
+Local simulator of Sarvam's speech-to-text-translate streaming WebSocket.
+Accepts the same audio messages as the real endpoint
+({"audio": {"data": <base64 PCM>, ...}}) and answers in its message format:
+
+- {"type": "events", "data": {"signal_type": "START_SPEECH" | "END_SPEECH"}}
+- {"type": "data", "data": {"transcript", "is_final", "language_code",
+  "original_transcript"}}
+
+Speech is detected by frame energy. While a speaker talks, a partial with one
+more word goes out every --partial-interval-ms; after --end-silence-ms of
+silence the final (unless --no-finals) and END_SPEECH follow. Every reply is
+delayed by --latency-ms (+ up to --jitter-ms) without reordering. Transcripts
+read "utterance <n> ...", counting from 1 per connection, so the load-test
+harness can match them to the audio it sent.
+
+Usage: python -m loadtest.fake_sarvam [--port 8765] [--latency-ms 300] ...
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import websockets
+
+logger = logging.getLogger(__name__)
+
+WORDS = "namaste please show your identity document to the camera thank you".split()
+
+
+class FakeSarvamServer:
+    """Serves simulated streaming STT sessions, one per WebSocket connection"""
+
+    def __init__(
+        self,
+        latency_ms: float = 300,
+        jitter_ms: float = 0,
+        partial_interval_ms: float = 400,
+        end_silence_ms: float = 400,
+        speech_dbfs: float = -45.0,
+        finals: bool = True,
+        sample_rate: int = 16000
+    ):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.partial_interval = partial_interval_ms / 1000
+        self.end_silence = end_silence_ms / 1000
+        self.speech_dbfs = speech_dbfs
+        self.finals = finals
+        self.sample_rate = sample_rate
+        self.connections = 0
+        self.audio_seconds = 0.0
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Run until cancelled"""
+        async with websockets.serve(self.handle, host, port, max_size=None):
+            logger.info(f"Fake Sarvam STT listening on ws://{host}:{port}")
+            await asyncio.Future()
+
+    async def handle(self, ws):
+        self.connections += 1
+        query = parse_qs(urlparse(ws.request.path).query)
+        language = query.get("language-code", ["unknown"])[0]
+        language = "hi-IN" if language == "unknown" else language
+
+        # Replies go out through a queue so latency delays them without reordering
+        outbox: asyncio.Queue = asyncio.Queue()
+        sender = asyncio.create_task(self._send_delayed(ws, outbox))
+
+        def reply(message: dict):
+            outbox.put_nowait((time.monotonic() + self.latency + random.uniform(0, self.jitter), message))
+
+        def transcript(text: str, is_final: bool) -> dict:
+            return {"type": "data", "data": {
+                "transcript": text, "is_final": is_final,
+                "language_code": language, "original_transcript": text
+            }}
+
+        utterance = 0
+        words = 0
+        speaking = False
+        speech_time = 0.0   # Audio seconds into the current utterance
+        silence_time = 0.0  # Trailing silence seconds
+        try:
+            async for message in ws:
+                audio = json.loads(message).get("audio", {})
+                pcm = np.frombuffer(base64.b64decode(audio.get("data", "")), dtype=np.int16)
+                if not len(pcm):
+                    continue
+                seconds = len(pcm) / audio.get("sample_rate", self.sample_rate)
+                self.audio_seconds += seconds
+                power = np.mean(pcm.astype(np.float32) ** 2)
+                speech = 10 * np.log10(max(power, 1e-10) / 32768.0 ** 2) >= self.speech_dbfs
+
+                if speech:
+                    silence_time = 0.0
+                    if not speaking:
+                        speaking = True
+                        utterance += 1
+                        words = 0
+                        speech_time = 0.0
+                        reply({"type": "events", "data": {"signal_type": "START_SPEECH"}})
+                    speech_time += seconds
+                    if speech_time >= (words + 1) * self.partial_interval:
+                        words += 1
+                        reply(transcript(self._text(utterance, words), False))
+                elif speaking:
+                    silence_time += seconds
+                    if silence_time >= self.end_silence:
+                        speaking = False
+                        if self.finals:
+                            reply(transcript(self._text(utterance, max(words, 1)), True))
+                        reply({"type": "events", "data": {"signal_type": "END_SPEECH"}})
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            # Let replies already due drain before the connection goes
+            outbox.put_nowait(None)
+            try:
+                await asyncio.wait_for(sender, timeout=self.latency + self.jitter + 1)
+            except (asyncio.TimeoutError, Exception):
+                sender.cancel()
+
+    @staticmethod
+    def _text(utterance: int, words: int) -> str:
+        return f"utterance {utterance} " + " ".join(WORDS[i % len(WORDS)] for i in range(words))
+
+    @staticmethod
+    async def _send_delayed(ws, outbox: asyncio.Queue):
+        while True:
+            item = await outbox.get()
+            if item is None:
+                return
+            due, message = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await ws.send(json.dumps(message))
+            except websockets.exceptions.ConnectionClosed:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Sarvam streaming STT simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Delay before every reply")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Extra random delay, up to this much")
+    parser.add_argument("--partial-interval-ms", type=float, default=400, help="Speech per additional partial word")
+    parser.add_argument("--end-silence-ms", type=float, default=400, help="Silence that ends an utterance")
+    parser.add_argument("--speech-dbfs", type=float, default=-45.0, help="Frame energy that counts as speech")
+    parser.add_argument("--no-finals", action="store_true", help="End utterances with END_SPEECH only (the service commits the last partial)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeSarvamServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        partial_interval_ms=args.partial_interval_ms,
+        end_silence_ms=args.end_silence_ms,
+        speech_dbfs=args.speech_dbfs,
+        finals=not args.no_finals
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
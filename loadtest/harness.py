@@ -0,0 +1,380 @@
+"""
+Transcription load test: N simulated calls against /video/ws/{session_id}.
+Each call has a user and an agent stream sending real-time 48 kHz PCM: tone
+bursts ("utterances") separated by low-level noise. Every stream watches its
+own speaker's transcripts in the broadcast and matches them to the audio by
+utterance number (see loadtest.fake_sarvam). Reported:
+
+- first partial: from the start of an utterance's audio to its first partial
+- final: from the end of an utterance's audio to its final transcript
+- CPU (% of one core) and RSS of the processes given by --pid (or spawned),
+  sampled from /proc
+
+With --spawn, the simulator and a single uvicorn worker are started on free
+ports (SARVAM_WS_URL pointing at the simulator, a temporary SQLite database
+unless DATABASE_URL is set) and stopped afterwards. Session ids start with
+"loadtest-", which also marks their files in transcription/.
+
+Usage: python -m loadtest.harness --spawn --sessions 20 --duration 60
+       python -m loadtest.harness --url ws://127.0.0.1:8001 --pid <server pid> ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+import websockets
+
+SAMPLE_RATE = 48000
+CHUNK_SAMPLES = 2048  # The browser's ScriptProcessor buffer
+UTTERANCE_PATTERN = re.compile(r"utterance (\d+)")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(np.ceil(q / 100 * len(ordered))) - 1))]
+
+
+class AudioSource:
+    """Speech-like tone bursts and background noise as int16 PCM chunks"""
+
+    def __init__(self, frequency: int):
+        # One second of each, looped: cheap enough that the harness is not the bottleneck
+        t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+        # Harmonics with a syllable-rate envelope, around -20 dBFS
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+        wave = sum(np.sin(2 * np.pi * frequency * k * t) / k for k in (1, 2, 3))
+        self.speech = (3000 * envelope * wave).astype(np.int16).tobytes()
+        self.noise = (np.random.randn(SAMPLE_RATE) * 10).astype(np.int16).tobytes()  # About -70 dBFS
+        self.position = 0
+
+    def chunk(self, speech: bool) -> bytes:
+        source = self.speech if speech else self.noise
+        start = self.position % SAMPLE_RATE * 2
+        self.position += CHUNK_SAMPLES
+        chunk = source[start:start + CHUNK_SAMPLES * 2]
+        return chunk + source[:CHUNK_SAMPLES * 2 - len(chunk)]
+
+
+class StreamClient:
+    """One participant's socket: sends paced audio and times its own transcripts"""
+
+    def __init__(self, url: str, session_id: str, role: str, args):
+        self.url = f"{url}/video/ws/{session_id}?role={role}&sample_rate={SAMPLE_RATE}"
+        self.speaker = "Agent" if role == "agent" else "User"
+        self.args = args
+        self.source = AudioSource(random.randint(110, 240))
+        self.speech_started: Dict[int, float] = {}
+        self.speech_ended: Dict[int, float] = {}
+        self.first_partial: Dict[int, float] = {}
+        self.final: Dict[int, float] = {}
+        self.error: Optional[str] = None
+        self.closed_code: Optional[int] = None
+
+    async def run(self, stop_at: float):
+        try:
+            # Uncompressed: deflating PCM would make the harness, not the server, the bottleneck
+            async with websockets.connect(self.url, max_size=None, open_timeout=30, compression=None) as ws:
+                receiver = asyncio.create_task(self._receive(ws))
+                await self._send(ws, stop_at)
+                # Give the last utterance time to come back
+                await asyncio.sleep(self.args.drain)
+                receiver.cancel()
+                self.closed_code = ws.close_code
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _send(self, ws, stop_at: float):
+        chunk_seconds = CHUNK_SAMPLES / SAMPLE_RATE
+        utterance = 0
+        started = time.monotonic()
+        sent = 0
+        # Leading silence, staggered so streams don't speak in lockstep
+        phase_end = started + random.uniform(0.5, self.args.pause_ms / 1000)
+        speaking = False
+        while True:
+            now = time.monotonic()
+            if now >= phase_end:
+                if speaking:
+                    self.speech_ended[utterance] = now
+                    phase_end = now + self.args.pause_ms / 1000 * random.uniform(0.8, 1.2)
+                    speaking = False
+                elif now >= stop_at:
+                    break
+                else:
+                    utterance += 1
+                    self.speech_started[utterance] = now
+                    phase_end = now + self.args.utterance_ms / 1000 * random.uniform(0.8, 1.2)
+                    speaking = True
+            await ws.send(self.source.chunk(speaking))
+            sent += 1
+            # Real-time pacing against the stream clock, not per-chunk sleeps
+            delay = started + sent * chunk_seconds - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def _receive(self, ws):
+        try:
+            async for message in ws:
+                if isinstance(message, bytes):
+                    continue
+                data = json.loads(message)
+                if data.get("type") != "transcript" or data.get("speaker") != self.speaker:
+                    continue
+                match = UTTERANCE_PATTERN.match(data.get("original_text") or "")
+                if not match:
+                    continue
+                utterance = int(match.group(1))
+                now = time.monotonic()
+                if data.get("is_final"):
+                    self.final.setdefault(utterance, now)
+                else:
+                    self.first_partial.setdefault(utterance, now)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def latencies(self):
+        partials = [self.first_partial[n] - self.speech_started[n] for n in self.first_partial if n in self.speech_started]
+        finals = [self.final[n] - self.speech_ended[n] for n in self.final if n in self.speech_ended]
+        return partials, finals
+
+
+class ProcessSampler:
+    """Periodic CPU and RSS samples of other processes from /proc"""
+
+    def __init__(self, pids: List[int], interval: float = 1.0):
+        self.pids = pids
+        self.interval = interval
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.cpu: Dict[int, List[float]] = {pid: [] for pid in pids}
+        self.rss: Dict[int, List[float]] = {pid: [] for pid in pids}
+
+    def _cpu_seconds(self, pid: int) -> float:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    @staticmethod
+    def _rss_mb(pid: int) -> float:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def run(self):
+        previous = {}
+        last = time.monotonic()
+        while True:
+            now = time.monotonic()
+            for pid in self.pids:
+                try:
+                    cpu = self._cpu_seconds(pid)
+                    self.rss[pid].append(self._rss_mb(pid))
+                except OSError:
+                    continue
+                if pid in previous:
+                    self.cpu[pid].append(100 * (cpu - previous[pid]) / max(now - last, 1e-3))
+                previous[pid] = cpu
+            last = now
+            await asyncio.sleep(self.interval)
+
+    def summary(self) -> Dict[int, dict]:
+        return {
+            pid: {
+                "cpu_avg": float(np.mean(self.cpu[pid])) if self.cpu[pid] else None,
+                "cpu_max": max(self.cpu[pid], default=None),
+                "rss_peak_mb": max(self.rss[pid], default=None),
+                "rss_last_mb": self.rss[pid][-1] if self.rss[pid] else None
+            }
+            for pid in self.pids
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with code {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout:.0f}s")
+
+
+def spawn(args) -> tuple:
+    """Start the simulator and one app worker; returns (ws base url, processes, ports)"""
+    sarvam_port, app_port = free_port(), free_port()
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.fake_sarvam", "--port", str(sarvam_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)],
+        cwd=REPO_ROOT, stdout=log, stderr=log
+    )
+    env = dict(os.environ, SARVAM_API_KEY="loadtest", SARVAM_WS_URL=f"ws://127.0.0.1:{sarvam_port}")
+    # A throwaway database unless one is given
+    env.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='loadtest-')}/ekyc.db")
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port)],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=log
+    )
+    return f"ws://127.0.0.1:{app_port}", (app, fake), (app_port, sarvam_port)
+
+
+async def run(args) -> dict:
+    processes = ()
+    url, pids = args.url, list(args.pid)
+    if args.spawn:
+        url, processes, ports = spawn(args)
+        pids = [process.pid for process in processes]
+        for port, process in zip(ports, processes):
+            await wait_for_port(port, process)
+
+    # The harness itself too: if it saturates a core, the latencies measure it rather than the server
+    pids.append(os.getpid())
+    sampler = ProcessSampler(pids)
+    sampler_task = asyncio.create_task(sampler.run())
+    clients: List[StreamClient] = []
+    started = time.monotonic()
+    try:
+        tasks = []
+        for index in range(args.sessions):
+            session_id = f"loadtest-{uuid.uuid4().hex[:12]}"
+            # Ramp up: spread session starts over --ramp seconds
+            delay = args.ramp * index / max(args.sessions, 1)
+            for role in ("user", "agent"):
+                client = StreamClient(url, session_id, role, args)
+                clients.append(client)
+                tasks.append(asyncio.create_task(start_later(client, delay, started + args.duration)))
+        await asyncio.gather(*tasks)
+    finally:
+        sampler_task.cancel()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    partials, finals = [], []
+    for client in clients:
+        client_partials, client_finals = client.latencies()
+        partials += client_partials
+        finals += client_finals
+    sent = sum(len(client.speech_ended) for client in clients)
+    return {
+        "sessions": args.sessions,
+        "streams": len(clients),
+        "duration": args.duration,
+        "utterances_sent": sent,
+        "finals_received": len(finals),
+        "stream_errors": [client.error for client in clients if client.error],
+        "evictions": sum(1 for client in clients if client.closed_code == 1013),
+        "first_partial_ms": latency_summary(partials),
+        "final_ms": latency_summary(finals),
+        "processes": {
+            str(pid): dict(summary, name=name)
+            for (pid, summary), name in zip(sampler.summary().items(), process_names(pids, args.spawn))
+        }
+    }
+
+
+async def start_later(client: StreamClient, delay: float, stop_at: float):
+    await asyncio.sleep(delay)
+    await client.run(stop_at)
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    return {
+        "count": len(seconds),
+        **{f"p{q}": None if percentile(seconds, q) is None else round(1000 * percentile(seconds, q), 1) for q in (50, 90, 99)},
+        "max": round(1000 * max(seconds), 1) if seconds else None
+    }
+
+
+def process_names(pids: List[int], spawned: bool) -> List[str]:
+    if spawned:
+        return ["app", "fake_sarvam", "harness"]
+    names = []
+    for pid in pids[:-1]:
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                names.append(f.read().strip())
+        except OSError:
+            names.append("?")
+    return names + ["harness"]
+
+
+def print_report(report: dict):
+    print(f"\n{report['sessions']} sessions ({report['streams']} streams) for {report['duration']:g}s")
+    missing = report["utterances_sent"] - report["finals_received"]
+    print(f"Utterances: {report['utterances_sent']} sent, {report['finals_received']} finals, {missing} missing")
+    if report["stream_errors"]:
+        print(f"Stream errors: {len(report['stream_errors'])} (first: {report['stream_errors'][0]})")
+    if report["evictions"]:
+        print(f"Subscribers evicted: {report['evictions']}")
+
+    print(f"\n{'Latency (ms)':<16}{'n':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    cell = lambda value: f"{value:>9.0f}" if value is not None else f"{'-':>9}"
+    for label, key in (("first partial", "first_partial_ms"), ("final", "final_ms")):
+        row = report[key]
+        print(f"{label:<16}{row['count']:>7}" + "".join(cell(row[q]) for q in ("p50", "p90", "p99", "max")))
+
+    if report["processes"]:
+        print(f"\n{'Process':<22}{'CPU avg %':>11}{'CPU max %':>11}{'RSS peak MB':>13}{'RSS end MB':>12}")
+        for pid, row in report["processes"].items():
+            print(f"{row['name'] + ' (' + pid + ')':<22}" + cell(row["cpu_avg"]) + "  " + cell(row["cpu_max"])
+                  + "    " + cell(row["rss_peak_mb"]) + "   " + cell(row["rss_last_mb"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the transcription WebSocket")
+    parser.add_argument("--url", default="ws://127.0.0.1:8001", help="Base WebSocket URL of the app")
+    parser.add_argument("--spawn", action="store_true", help="Start the Sarvam simulator and an app worker")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="Process to sample (repeatable)")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent calls (two streams each)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of audio per stream")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds over which sessions start")
+    parser.add_argument("--utterance-ms", type=float, default=2000)
+    parser.add_argument("--pause-ms", type=float, default=1500)
+    parser.add_argument("--drain", type=float, default=3, help="Seconds to wait for the last transcripts")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Simulator latency (with --spawn)")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Simulator jitter (with --spawn)")
+    parser.add_argument("--server-log", help="Append spawned processes' output to this file")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
+import secrets
 import logging
 
 # Configure logging
@@ -12,7 +14,16 @@ logger = logging.getLogger(__name__)
 
 from config import settings
 from database.database import init_db
-from routes import auth, kyc, documents, face, video
+from routes import auth, kyc, documents, face, video, uploads
+from services.storage import storage, LOCAL_MOUNTS
+from services.resumable_upload import resumable_uploads
+from services.transcription_service import transcription_service
+from services.pubsub import pubsub
+from services.transcript_store import transcript_store
+from services.session_reaper import session_reaper
+from services.call_recorder import call_recorder
+from services.metrics import metrics
+from services.upload_service import UploadSizeLimit
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -40,9 +51,36 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Admin check/creation skipped: {e}")
         
+    # Transcript fan-out between workers
+    await pubsub.start()
+    await transcription_service.start()  # Session control messages from the other workers
+
+    # Batched transcript_segments writer
+    await transcript_store.start()
+
+    # Recover transcription sessions that were in flight
+    recovered = await transcription_service.recover_sessions()
+    if recovered:
+        logger.info(f"Recovered {recovered} transcription session(s) from journals")
+
+    # Expire abandoned resumable uploads
+    upload_sweeper = asyncio.create_task(resumable_uploads.sweep_forever())
+
+    # End transcription sessions abandoned by their clients
+    session_sweeper = asyncio.create_task(session_reaper.reap_forever())
+
+    # Incremental call recording writer
+    await call_recorder.start()
+
     logger.info(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} started")
     yield
     # Shutdown
+    upload_sweeper.cancel()
+    session_sweeper.cancel()
+    await call_recorder.stop()  # Finalises open recordings while the database is still up
+    await transcription_service.shutdown()
+    await transcript_store.stop()
+    await pubsub.stop()
     logger.info("👋 Shutting down...")
 
 app = FastAPI(
@@ -61,28 +99,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap multipart upload bodies before Starlette spools them
+app.add_middleware(UploadSizeLimit, paths=["/documents/upload", "/face/verify"])
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(kyc.router)
 app.include_router(documents.router)
 app.include_router(face.router)
 app.include_router(video.router)
+app.include_router(uploads.router)
 
 # Static files
 static_path = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_path):
     app.mount("/static", StaticFiles(directory=static_path), name="static")
 
-# Serve uploaded files (for admin viewing)
-uploads_path = settings.UPLOAD_DIR
-if os.path.exists(uploads_path):
-    app.mount("/uploads", StaticFiles(directory=uploads_path), name="uploads")
-
-# Serve recordings
-recordings_path = os.path.join(os.path.dirname(__file__), "recordings")
-if not os.path.exists(recordings_path):
-    os.makedirs(recordings_path)
-app.mount("/recordings", StaticFiles(directory=recordings_path), name="recordings")
+# Serve uploads and recordings from disk only for the local storage backend;
+# remote backends hand out presigned URLs instead
+for url_prefix, directory in LOCAL_MOUNTS.items():
+    os.makedirs(directory, exist_ok=True)
+    if storage.is_local:
+        app.mount(url_prefix, StaticFiles(directory=directory), name=url_prefix.strip("/"))
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -131,6 +169,17 @@ async def health_check():
         "version": settings.APP_VERSION
     }
 
+@app.get("/metrics")
+async def metrics_endpoint(request: Request, format: str = "prometheus"):
+    """Runtime metrics (Prometheus text format, or ?format=json)"""
+    if not settings.METRICS_TOKEN:
+        return PlainTextResponse("Metrics disabled: set METRICS_TOKEN", status_code=403)
+    if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+        return PlainTextResponse("Unauthorized", status_code=401)
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8001)
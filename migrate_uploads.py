@@ -0,0 +1,122 @@
+"""
+Migrate legacy flat uploads (uploads/documents, uploads/faces) into the
+content-addressed blob store and set up reference counts.
+
+Usage: python migrate_uploads.py [--dry-run]
+"""
+import asyncio
+import glob
+import os
+import shutil
+import sys
+from typing import Dict, Optional
+from sqlalchemy import select, inspect, text
+from database.database import engine, async_session_maker, init_db
+from database.models import Document, FaceVerification
+from services.blob_store import blob_store
+from services.storage import storage
+from services.upload_service import IngestedUpload, hash_file
+import logging
+
+# Configure logging for script usage
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def _ensure_columns():
+    """Add columns introduced after the tables were first created (create_all skips them)"""
+    def add_missing(sync_conn):
+        inspector = inspect(sync_conn)
+        for table in (Document.__table__, FaceVerification.__table__):
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=sync_conn.dialect)
+                    sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    logger.info(f"Added column {table.name}.{column.name}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(add_missing)
+
+async def migrate_uploads(dry_run: bool = False):
+    await init_db()
+    await _ensure_columns()
+
+    migrated: Dict[str, str] = {}  # legacy path -> blob path
+    legacy_derived = []  # Intermediates copied next to their blob
+
+    async def adopt(db, path: str) -> Optional[str]:
+        """Move one legacy file into the store; returns its sha256"""
+        if path in migrated:
+            sha256 = os.path.basename(migrated[path]).split(".")[0]
+            await blob_store.acquire(db, sha256)
+            return sha256
+        if not os.path.exists(path):
+            logger.warning(f"Missing file, skipped: {path}")
+            return None
+
+        sha256, size, content_type = await asyncio.to_thread(hash_file, path)
+        if dry_run:
+            logger.info(f"[dry-run] {path} -> {sha256[:12]} ({size} bytes)")
+            return None
+
+        # Stage a copy so the legacy file stays until the database commit succeeds
+        staged = os.path.join(blob_store.staging_dir, f".migrate-{sha256}")
+        shutil.copyfile(path, staged)
+        blob = await blob_store.commit(db, IngestedUpload(staged, size, sha256, content_type))
+        migrated[path] = blob.path
+        return sha256
+
+    def move_derived(legacy_path: Optional[str], blob_path: str, suffix: str) -> Optional[str]:
+        """Carry a pipeline intermediate (e.g. _portrait.jpg) over next to its blob"""
+        if not legacy_path or not os.path.exists(legacy_path):
+            return legacy_path
+        target = f"{os.path.splitext(blob_path)[0]}_{suffix}"
+        shutil.copyfile(legacy_path, target)
+        legacy_derived.append(legacy_path)
+        return target
+
+    async with async_session_maker() as db:
+        result = await db.execute(select(Document).where(Document.blob_sha256 == None))
+        documents = result.scalars().all()
+        for document in documents:
+            legacy_path = document.file_path
+            sha256 = await adopt(db, legacy_path)
+            if sha256:
+                document.blob_sha256 = sha256
+                document.file_path = migrated[legacy_path]
+                document.normalized_path = move_derived(document.normalized_path, document.file_path, "document.jpg")
+                document.portrait_path = move_derived(document.portrait_path, document.file_path, "portrait.jpg")
+
+        result = await db.execute(select(FaceVerification).where(FaceVerification.selfie_sha256 == None))
+        faces = result.scalars().all()
+        for face in faces:
+            legacy_path = face.selfie_path
+            sha256 = await adopt(db, legacy_path)
+            if sha256:
+                face.selfie_sha256 = sha256
+                face.selfie_path = migrated[legacy_path]
+            if face.document_face_path in migrated:
+                face.document_face_path = migrated[face.document_face_path]
+
+        if dry_run:
+            logger.info(f"[dry-run] {len(documents)} documents and {len(faces)} selfies would be migrated")
+            return
+
+        await db.commit()
+
+    # Copy the migrated files to the configured storage backend
+    for blob_path in set(migrated.values()):
+        await storage.save(blob_path)
+        for derived_path in glob.glob(f"{blob_store.derived_prefix(blob_path)}*"):
+            await storage.save(derived_path, "image/jpeg")
+
+    # Only remove legacy files once the new paths are committed
+    for legacy_path in list(migrated) + legacy_derived:
+        try:
+            os.remove(legacy_path)
+        except FileNotFoundError:
+            pass
+    logger.info(f"Migrated {len(migrated)} files into {blob_store.root}")
+
+if __name__ == "__main__":
+    asyncio.run(migrate_uploads(dry_run="--dry-run" in sys.argv))
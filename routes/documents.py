@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Request, Response
+from fastapi.responses import RedirectResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import os
-import uuid
+import json
 from datetime import datetime
 
 from database.database import get_db
@@ -10,14 +10,22 @@ from database.models import User, KYCSession, Document, KYCStatus, DocumentType
 from database.schemas import DocumentResponse, DocumentUpload
 from routes.auth import get_current_user
 from services.ocr_service import OCRService
-from config import settings
+from services.face_service import FaceService
+from services.document_pipeline import DocumentPipeline
+from services.upload_service import UploadIngestor, UploadRejected, IngestedUpload, DOCUMENT_CONTENT_TYPES
+from services.blob_store import blob_store
+from services.storage import storage
+from services.preview_service import preview_generator, cache_headers, not_modified
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
 ocr_service = OCRService()
+document_pipeline = DocumentPipeline(ocr_service, FaceService())
+upload_ingestor = UploadIngestor()
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     document_type: DocumentType = Form(...),
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
@@ -36,36 +44,44 @@ async def upload_document(
     if not session:
         raise HTTPException(status_code=404, detail="No active KYC session")
     
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Invalid file type")
+    # Copy to disk: type sniffed from content, size capped (request body by UploadSizeLimit)
+    try:
+        upload = await upload_ingestor.ingest(file, blob_store.staging_dir, DOCUMENT_CONTENT_TYPES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     
-    # Validate file size
-    contents = await file.read()
-    if len(contents) > settings.MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
-    # Save file
-    file_ext = file.filename.split(".")[-1] if file.filename else "jpg"
-    filename = f"{uuid.uuid4()}.{file_ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, "documents", filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    return await store_document(db, session, document_type, upload, background_tasks)
+
+async def store_document(
+    db: AsyncSession,
+    session: KYCSession,
+    document_type: DocumentType,
+    upload: IngestedUpload,
+    background_tasks: BackgroundTasks
+) -> Document:
+    """Store an ingested document, run the pipeline and record the result"""
+    # Content-addressed storage: identical re-uploads share one blob
+    blob = await blob_store.commit(db, upload)
+    file_path = blob.path
     
-    # Perform OCR
-    ocr_result = await ocr_service.extract_document_data(file_path, document_type)
+    # Decode once: quality checks, OCR and portrait crop
+    processed = await document_pipeline.process(file_path, document_type)
+    ocr_result = processed["ocr"]
+    await blob_store.publish(blob, processed["normalized_path"], processed["portrait_path"])
     
     # Create document record
     document = Document(
         kyc_session_id=session.id,
         document_type=document_type,
         file_path=file_path,
+        blob_sha256=blob.sha256,
         ocr_data=str(ocr_result),
         extracted_name=ocr_result.get("name"),
         extracted_dob=ocr_result.get("dob"),
-        extracted_id_number=ocr_result.get("id_number")
+        extracted_id_number=ocr_result.get("id_number"),
+        normalized_path=processed["normalized_path"],
+        portrait_path=processed["portrait_path"],
+        validation_data=json.dumps(processed["validation"])
     )
     db.add(document)
     
@@ -74,6 +90,9 @@ async def upload_document(
     
     await db.commit()
     await db.refresh(document)
+    
+    # Admin review thumbnails are rendered after the response is sent
+    background_tasks.add_task(preview_generator.generate, file_path, processed["portrait_path"])
     return document
 
 @router.get("/session/{session_id}", response_model=list[DocumentResponse])
@@ -97,3 +116,62 @@ async def get_session_documents(
         select(Document).where(Document.kyc_session_id == session_id)
     )
     return result.scalars().all()
+
+async def _get_document_variant(db: AsyncSession, current_user: User, document_id: str, variant: str):
+    """Load a document the user may see and the path of the requested image variant"""
+    document = await db.get(Document, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    session = await db.get(KYCSession, document.kyc_session_id)
+    if session.user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    paths = {
+        "original": document.file_path,
+        "normalized": document.normalized_path,
+        "portrait": document.portrait_path
+    }
+    if variant not in paths:
+        raise HTTPException(status_code=400, detail="Invalid variant")
+    return document, paths[variant]
+
+@router.get("/{document_id}/file")
+async def get_document_file(
+    document_id: str,
+    variant: str = "original",
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Redirect to the stored document image (original, normalized or portrait)"""
+    document, path = await _get_document_variant(db, current_user, document_id, variant)
+    
+    url = storage.url(path) if path else None
+    if not url:
+        raise HTTPException(status_code=404, detail="File not available")
+    return RedirectResponse(url, status_code=307)
+
+@router.get("/{document_id}/preview")
+async def get_document_preview(
+    document_id: str,
+    request: Request,
+    variant: str = "original",
+    size: str = "thumb",
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Downscaled document image for the review UI (cacheable, ETag)"""
+    if size not in preview_generator.sizes:
+        raise HTTPException(status_code=400, detail="Invalid size")
+    document, path = await _get_document_variant(db, current_user, document_id, variant)
+    
+    # Content-addressed source: the preview for this document never changes
+    etag = f'"{document.blob_sha256 or document.id}-{variant}-{size}"'
+    headers = cache_headers(etag)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    preview_path = await preview_generator.get(path, size) if path else None
+    if not preview_path:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    return FileResponse(preview_path, media_type=preview_generator.media_type, headers=headers)
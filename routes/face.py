@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Request, Response
+from fastapi.responses import RedirectResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import os
-import uuid
 import base64
 
 from database.database import get_db
@@ -11,15 +11,20 @@ from database.schemas import FaceVerificationResponse, LivenessCheckResponse, Li
 from routes.auth import get_current_user
 from services.face_service import FaceService
 from services.liveness_service import LivenessService
-from config import settings
+from services.upload_service import UploadIngestor, UploadRejected, IngestedUpload, SELFIE_CONTENT_TYPES
+from services.blob_store import blob_store
+from services.storage import storage
+from services.preview_service import preview_generator, cache_headers, not_modified
 
 router = APIRouter(prefix="/face", tags=["Face Verification"])
 
 face_service = FaceService()
 liveness_service = LivenessService()
+upload_ingestor = UploadIngestor()
 
 @router.post("/verify", response_model=FaceVerificationResponse)
 async def verify_face(
+    background_tasks: BackgroundTasks,
     selfie: UploadFile = File(...),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -46,23 +51,43 @@ async def verify_face(
     if not document:
         raise HTTPException(status_code=400, detail="Please upload a document first")
     
-    # Save selfie
-    contents = await selfie.read()
-    filename = f"{uuid.uuid4()}.jpg"
-    selfie_path = os.path.join(settings.UPLOAD_DIR, "faces", filename)
-    
-    with open(selfie_path, "wb") as f:
-        f.write(contents)
+    # Save selfie (streamed, size-limited, type sniffed from content)
+    try:
+        upload = await upload_ingestor.ingest(selfie, blob_store.staging_dir, SELFIE_CONTENT_TYPES)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     
+    return await store_selfie(db, session, document, upload, background_tasks)
+
+async def store_selfie(
+    db: AsyncSession,
+    session: KYCSession,
+    document: Document,
+    upload: IngestedUpload,
+    background_tasks: BackgroundTasks
+) -> FaceVerification:
+    """Match an ingested selfie against the document and record the result"""
     # Perform face verification
     try:
+        portrait_path = document.portrait_path
+        if portrait_path:
+            portrait_path = await storage.ensure_local(portrait_path)
+        else:
+            await storage.ensure_local(document.file_path)
         match_result = await face_service.compare_faces(
-            selfie_path, 
-            document.file_path
+            upload.path, 
+            document.file_path,
+            portrait_path=portrait_path
         )
     except Exception as e:
+        os.remove(upload.path)
         raise HTTPException(status_code=400, detail=f"Face verification failed: {str(e)}")
     
+    # Keep the selfie in content-addressed storage
+    blob = await blob_store.commit(db, upload)
+    selfie_path = blob.path
+    await blob_store.publish(blob)
+    
     # Create or update face verification record
     result = await db.execute(
         select(FaceVerification).where(FaceVerification.kyc_session_id == session.id)
@@ -70,14 +95,19 @@ async def verify_face(
     face_record = result.scalar_one_or_none()
     
     if face_record:
+        previous_selfie = face_record.selfie_sha256
         face_record.selfie_path = selfie_path
+        face_record.selfie_sha256 = blob.sha256
+        face_record.document_face_path = document.portrait_path or document.file_path
         face_record.match_score = match_result["score"]
         face_record.is_match = match_result["is_match"]
+        await blob_store.release(db, previous_selfie)
     else:
         face_record = FaceVerification(
             kyc_session_id=session.id,
             selfie_path=selfie_path,
-            document_face_path=document.file_path,
+            selfie_sha256=blob.sha256,
+            document_face_path=document.portrait_path or document.file_path,
             match_score=match_result["score"],
             is_match=match_result["is_match"]
         )
@@ -89,8 +119,64 @@ async def verify_face(
     
     await db.commit()
     await db.refresh(face_record)
+    
+    background_tasks.add_task(preview_generator.generate, selfie_path)
     return face_record
 
+async def _get_face_record(db: AsyncSession, current_user: User, session_id: str) -> FaceVerification:
+    """Face verification of a session the user may see"""
+    session = await db.get(KYCSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if session.user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    result = await db.execute(
+        select(FaceVerification).where(FaceVerification.kyc_session_id == session_id)
+    )
+    face_record = result.scalar_one_or_none()
+    if not face_record:
+        raise HTTPException(status_code=404, detail="Selfie not available")
+    return face_record
+
+@router.get("/session/{session_id}/selfie")
+async def get_selfie_file(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Redirect to the stored selfie of a KYC session"""
+    face_record = await _get_face_record(db, current_user, session_id)
+    url = storage.url(face_record.selfie_path)
+    if not url:
+        raise HTTPException(status_code=404, detail="Selfie not available")
+    return RedirectResponse(url, status_code=307)
+
+@router.get("/session/{session_id}/selfie/preview")
+async def get_selfie_preview(
+    session_id: str,
+    request: Request,
+    size: str = "thumb",
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Downscaled selfie for the review UI (ETag)"""
+    if size not in preview_generator.sizes:
+        raise HTTPException(status_code=400, detail="Invalid size")
+    face_record = await _get_face_record(db, current_user, session_id)
+    
+    # A retried verification replaces the selfie under the same URL, so revalidate
+    etag = f'"{face_record.selfie_sha256 or face_record.id}-{size}"'
+    headers = cache_headers(etag, immutable=False)
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    preview_path = await preview_generator.get(face_record.selfie_path, size)
+    if not preview_path:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    return FileResponse(preview_path, media_type=preview_generator.media_type, headers=headers)
+
 @router.post("/liveness/check", response_model=LivenessCheckResponse)
 async def check_liveness(
     request: LivenessActionRequest,
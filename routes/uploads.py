@@ -0,0 +1,155 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, BackgroundTasks
+from starlette.requests import ClientDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime
+
+from database.database import get_db
+from database.models import User, KYCSession, Document, KYCStatus, ResumableUpload, UploadKind
+from database.schemas import (
+    ResumableUploadCreate,
+    ResumableUploadResponse,
+    DocumentResponse,
+    FaceVerificationResponse,
+)
+from routes.auth import get_current_user
+from routes.documents import store_document
+from routes.face import store_selfie
+from services.upload_service import UploadRejected
+from services.resumable_upload import resumable_uploads
+from services.blob_store import blob_store
+
+router = APIRouter(prefix="/resumable-uploads", tags=["Resumable Uploads"])
+
+async def _get_active_session(db: AsyncSession, current_user: User) -> KYCSession:
+    result = await db.execute(
+        select(KYCSession).where(
+            KYCSession.user_id == current_user.id,
+            KYCSession.status.notin_([KYCStatus.APPROVED, KYCStatus.REJECTED])
+        )
+    )
+    session = result.scalar_one_or_none()
+
+    if not session:
+        raise HTTPException(status_code=404, detail="No active KYC session")
+    return session
+
+async def _get_session_document(db: AsyncSession, session: KYCSession) -> Document:
+    result = await db.execute(
+        select(Document).where(Document.kyc_session_id == session.id)
+    )
+    document = result.scalars().first()
+
+    if not document:
+        raise HTTPException(status_code=400, detail="Please upload a document first")
+    return document
+
+async def _get_upload(db: AsyncSession, current_user: User, upload_id: str) -> ResumableUpload:
+    upload = await db.get(ResumableUpload, upload_id)
+    if not upload or upload.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    session = await db.get(KYCSession, upload.kyc_session_id)
+    if session.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return upload
+
+@router.post("", response_model=ResumableUploadResponse)
+async def create_upload(
+    request: ResumableUploadCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start a resumable document or selfie upload of a known size"""
+    session = await _get_active_session(db, current_user)
+    if request.kind == UploadKind.SELFIE:
+        await _get_session_document(db, session)
+
+    try:
+        upload = await resumable_uploads.create(
+            db, session.id, request.kind, request.size, request.document_type
+        )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+@router.get("/{upload_id}", response_model=ResumableUploadResponse)
+async def get_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Current offset of an upload, used to resume after a dropped connection"""
+    return await _get_upload(db, current_user, upload_id)
+
+@router.put("/{upload_id}", response_model=ResumableUploadResponse)
+async def put_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Write the request body at `offset` (raw bytes, any chunk size)"""
+    upload = await _get_upload(db, current_user, upload_id)
+
+    try:
+        await resumable_uploads.write_chunk(db, upload, offset, request.stream())
+    except UploadRejected as e:
+        await db.commit()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except ClientDisconnect:
+        # Keep what arrived; the client asks for the offset when it reconnects
+        await db.commit()
+        return Response(status_code=204)
+
+    await db.commit()
+    await db.refresh(upload)
+    return upload
+
+@router.delete("/{upload_id}")
+async def cancel_upload(
+    upload_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Abandon an upload and delete its partial file"""
+    upload = await _get_upload(db, current_user, upload_id)
+    await resumable_uploads.discard(db, upload)
+    await db.commit()
+    return {"status": "cancelled", "upload_id": upload_id}
+
+@router.post("/{upload_id}/complete", response_model=DocumentResponse | FaceVerificationResponse)
+async def complete_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Finalise a fully received upload; OCR or face matching runs only now"""
+    upload = await _get_upload(db, current_user, upload_id)
+    session = await _get_active_session(db, current_user)
+    if session.id != upload.kyc_session_id:
+        raise HTTPException(status_code=409, detail="Upload belongs to a closed KYC session")
+
+    kind = upload.kind
+    document_type = upload.document_type
+    document = await _get_session_document(db, session) if kind == UploadKind.SELFIE else None
+
+    try:
+        ingested = await resumable_uploads.finalize(db, upload, blob_store.staging_dir)
+    except UploadRejected as e:
+        await db.commit()
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    if kind == UploadKind.DOCUMENT:
+        stored = await store_document(db, session, document_type, ingested, background_tasks)
+    else:
+        stored = await store_selfie(db, session, document, ingested, background_tasks)
+    # Committed together with the upload row's deletion; until then a failed
+    # store rolls back and the client can complete the upload again
+    resumable_uploads.remove_part(upload_id)
+    return stored
@@ -1,19 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import RedirectResponse
 from starlette.websockets import WebSocketState
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
+from typing import Optional
+import asyncio
 import json
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 from database.database import get_db
 from database.models import User, KYCSession, VideoSession, KYCStatus
-from database.schemas import VideoSessionResponse, VideoTokenResponse
+from database.schemas import VideoSessionResponse, VideoTokenResponse, TranscriptSegmentPage
 from routes.auth import get_current_user, get_current_admin
 from services.livekit_service import LiveKitService
 from services.transcription_service import transcription_service
+from services.storage import storage
+from services.transcript_store import transcript_store
+from services.audio_decoder import DECODED_SAMPLE_RATE, codec_supported, decode_audio_stream
+from services.metrics import metrics
 from config import settings
 
 router = APIRouter(prefix="/video", tags=["Video Verification"])
@@ -124,17 +132,6 @@ async def end_video_session(
     video_session.ended_at = datetime.utcnow()
     video_session.agent_notes = notes
 
-    # Simulate saving recording file
-    recording_filename = f"recording_{session_id}_{int(video_session.ended_at.timestamp())}.mp4"
-    recording_path = f"recordings/{recording_filename}"
-    
-    try:
-        with open(recording_path, "w") as f:
-            f.write("DUMMY VIDEO DATA - SIMULATED RECORDING")
-        video_session.recording_url = f"/recordings/{recording_filename}"
-    except Exception as e:
-        logger.error(f"Failed to save simulated recording: {e}")
-
     # Update KYC session status
     result = await db.execute(
         select(KYCSession).where(KYCSession.id == session_id)
@@ -144,6 +141,13 @@ async def end_video_session(
         kyc_session.status = KYCStatus.VIDEO_COMPLETED
     
     await db.commit()
+
+    # The call is over on every worker: save the transcript (session file,
+    # segments and VideoSession.transcript), disconnect its subscribers and
+    # finalise the recording tracks. The worker that finishes the last track
+    # mixes and links the recording, so it may still be None here.
+    await transcription_service.end_session(session_id)
+    await db.refresh(video_session)
     
     return {
         "status": "ended", 
@@ -151,6 +155,43 @@ async def end_video_session(
         "recording_url": video_session.recording_url
     }
 
+@router.get("/room/{session_id}/recording")
+async def get_recording(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Admin: Redirect to the stored call recording"""
+    result = await db.execute(
+        select(VideoSession).where(VideoSession.kyc_session_id == session_id)
+    )
+    video_session = result.scalar_one_or_none()
+    
+    if not video_session or not video_session.recording_url:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    
+    # recording_url keeps the local mount path; its key is the same path without the slash
+    url = storage.url(video_session.recording_url.lstrip("/"), filename=os.path.basename(video_session.recording_url))
+    if not url:
+        raise HTTPException(status_code=404, detail="Recording not available")
+    return RedirectResponse(url, status_code=307)
+
+@router.get("/room/{session_id}/transcript", response_model=TranscriptSegmentPage)
+async def get_transcript_segments(
+    session_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    speaker: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """Admin: Final transcript segments of a call in time order, one page at a time"""
+    try:
+        segments, next_cursor = await transcript_store.page(db, session_id, cursor, limit, speaker)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"segments": segments, "next_cursor": next_cursor}
+
 @router.get("/pending-rooms")
 async def list_pending_rooms(
     db: AsyncSession = Depends(get_db),
@@ -185,11 +226,23 @@ async def websocket_transcription_endpoint(websocket: WebSocket, session_id: str
     Query Params:
     - role: 'user' or 'agent' (default: user)
     - sample_rate: audio sample rate (default: 48000)
+    - codec: 'pcm' (default), 'opus' (one raw Opus packet per message) or
+      'webm' (MediaRecorder audio/webm;codecs=opus chunks); an unsupported
+      codec is refused with close code 4415 so the client can fall back to PCM
+    - deltas: '1' to receive partial updates as transcript_delta messages
+    - last_id: id of the last transcript seen before a reconnect; the history
+      snapshot then only holds later entries
     """
     await websocket.accept()
     role = websocket.query_params.get("role", "user")
     speaker_name = "Agent" if role == "agent" else "User"
     
+    codec = websocket.query_params.get("codec", "pcm")
+    if not codec_supported(codec):
+        logger.warning(f"[WS] {speaker_name} asked for unsupported audio codec '{codec}'")
+        await websocket.close(code=4415, reason="Unsupported audio codec")
+        return
+    
     # Session metadata
     metadata = {
         "role": role,
@@ -203,7 +256,7 @@ async def websocket_transcription_endpoint(websocket: WebSocket, session_id: str
     except ValueError:
         input_sample_rate = 48000
     
-    logger.info(f"[WS] {speaker_name} connected to session {session_id} (rate={input_sample_rate})")
+    logger.info(f"[WS] {speaker_name} connected to session {session_id} (codec={codec}, rate={input_sample_rate})")
 
     # Subscriber callback for this websocket
     async def on_transcript(transcript_data: dict):
@@ -213,26 +266,34 @@ async def websocket_transcription_endpoint(websocket: WebSocket, session_id: str
         except Exception as e:
             logger.error(f"[WS] Error sending transcript to {speaker_name}: {e}")
 
+    async def on_evict(reason: str):
+        # Too slow to keep up: close so the client reconnects and catches up from history
+        try:
+            await asyncio.wait_for(websocket.close(code=1013, reason="Subscriber lagging"), timeout=5)
+        except Exception as e:
+            logger.warning(f"[WS] Could not close lagging {speaker_name} socket: {e}")
+
     try:
         # Start/join session
-        await transcription_service.start_session(session_id, metadata=metadata)
+        await transcription_service.start_session(session_id, metadata=metadata, speaker=speaker_name)
         
-        # Subscribe to receive transcripts from all speakers
-        transcription_service.subscribe(session_id, on_transcript)
-        
-        # Send existing history immediately
-        history = transcription_service.get_transcripts(session_id)
-        if history:
-            logger.info(f"[WS] Sending {len(history)} historical transcripts to {speaker_name}")
-            for entry in history:
-                await websocket.send_json(entry)
+        # Subscribe to receive transcripts from all speakers; the history (or, on a
+        # reconnect, what was missed since last_id) arrives first as one snapshot
+        deltas = websocket.query_params.get("deltas") == "1"
+        last_id = websocket.query_params.get("last_id")
+        await transcription_service.subscribe(
+            session_id, on_transcript, on_evict, deltas=deltas, history=True, last_id=last_id
+        )
         
         # Audio generator reads binary audio from this WebSocket
         async def audio_generator():
             try:
                 while True:
                     message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
                     if "bytes" in message:
+                        metrics.inc("audio_uplink_bytes_total", len(message["bytes"]), codec=codec)
                         yield message["bytes"]
                     elif "text" in message:
                         # Browser speech API fallback sends JSON text
@@ -254,10 +315,16 @@ async def websocket_transcription_endpoint(websocket: WebSocket, session_id: str
                 logger.error(f"[WS] Audio generator error ({speaker_name}): {e}")
                 return
         
+        audio = audio_generator()
+        if codec != "pcm":
+            # Decoded as it arrives, straight to the STT rate
+            audio = decode_audio_stream(codec, audio)
+            input_sample_rate = DECODED_SAMPLE_RATE
+        
         # Stream audio to Sarvam AI for transcription
         await transcription_service.process_audio_stream(
             session_id=session_id, 
-            audio_generator=audio_generator(),
+            audio_generator=audio,
             speaker=speaker_name,
             input_sample_rate=input_sample_rate
         )
@@ -267,7 +334,6 @@ async def websocket_transcription_endpoint(websocket: WebSocket, session_id: str
     except Exception as e:
         logger.error(f"[WS] Error for {speaker_name}: {e}")
     finally:
-        transcription_service.unsubscribe(session_id, on_transcript)
-        # Only the user's disconnect triggers session save
-        if role == "user":
-            await transcription_service.end_session(session_id)
+        # A dropped socket doesn't end the call: the client reconnects and resumes.
+        # The session ends with the video session, or the reaper ends it once idle
+        await transcription_service.unsubscribe(session_id, on_transcript)
@@ -0,0 +1,161 @@
+"""
+Streaming decode of compressed uplink audio to 16 kHz mono PCM.
+Browsers can send Opus at 16-32 kbit/s instead of 768 kbit/s of 48 kHz PCM.
+The WebSocket's `codec` query parameter selects the format:
+
+- pcm:  raw 16-bit PCM at `sample_rate` (unchanged, the default)
+- opus: one raw Opus packet per message (WebCodecs AudioEncoder)
+- webm: MediaRecorder chunks of an audio/webm;codecs=opus recording
+
+Decoding needs PyAV (`pip install av`). Opus packets are decoded on the
+event loop (tens of microseconds each); a WebM stream is demuxed in its own
+thread, fed through a pipe, because the demuxer reads synchronously.
+Either way the output is resampled by libswresample straight to 16 kHz.
+"""
+import asyncio
+import io
+import logging
+import queue
+import threading
+from typing import AsyncIterator, Optional
+
+from services.metrics import metrics
+
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("pcm", "opus", "webm")
+DECODED_SAMPLE_RATE = 16000
+
+metrics.describe("audio_uplink_bytes_total", "Audio bytes received from browsers, by uplink codec")
+metrics.describe("audio_decode_errors_total", "Compressed uplink streams that failed to decode")
+
+
+def codec_supported(codec: str) -> bool:
+    return codec == "pcm" or (codec in CODECS and av is not None)
+
+
+class OpusPacketDecoder:
+    """Decodes raw Opus packets one at a time"""
+
+    def __init__(self, output_rate: int = DECODED_SAMPLE_RATE):
+        self.codec = av.CodecContext.create("opus", "r")
+        self.codec.sample_rate = 48000
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=output_rate)
+
+    def decode(self, packet: bytes) -> bytes:
+        pcm = []
+        for frame in self.codec.decode(av.Packet(packet)):
+            for resampled in self.resampler.resample(frame):
+                pcm.append(resampled.to_ndarray().tobytes())
+        return b"".join(pcm)
+
+
+class _ChunkPipe(io.RawIOBase):
+    """Blocking file-like object fed with chunks from the event loop"""
+
+    def __init__(self):
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._pending = b""
+        self._eof = False
+
+    def feed(self, chunk: Optional[bytes]):
+        """A chunk, or None at the end of the stream"""
+        self._chunks.put(chunk)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # Return what is available rather than filling the buffer, so frames
+        # are decoded as soon as their bytes arrive
+        while not self._pending:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+                return 0
+            self._pending = chunk
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class ContainerStreamDecoder:
+    """Demuxes and decodes a streamed container (WebM/Opus) in a background thread"""
+
+    def __init__(self, container_format: str = "matroska", output_rate: int = DECODED_SAMPLE_RATE):
+        self.container_format = container_format
+        self.output_rate = output_rate
+        self.pipe = _ChunkPipe()
+        self.output: asyncio.Queue = asyncio.Queue()  # PCM chunks, then None
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name="uplink-decoder", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: Optional[bytes]):
+        self.pipe.feed(chunk)
+
+    def _emit(self, pcm: Optional[bytes]):
+        self._loop.call_soon_threadsafe(self.output.put_nowait, pcm)
+
+    def _run(self):
+        try:
+            # Minimal probing: the header arrives in the first chunk and every
+            # byte the prober waits for is latency
+            with av.open(self.pipe, mode="r", format=self.container_format,
+                         options={"probesize": "4096", "analyzeduration": "0"}) as container:
+                stream = container.streams.audio[0]
+                resampler = av.AudioResampler(format="s16", layout="mono", rate=self.output_rate)
+                for packet in container.demux(stream):
+                    for frame in packet.decode():
+                        pcm = b"".join(resampled.to_ndarray().tobytes() for resampled in resampler.resample(frame))
+                        if pcm:
+                            self._emit(pcm)
+        except Exception as e:
+            logger.error(f"Uplink {self.container_format} decode failed: {e}")
+            metrics.inc("audio_decode_errors_total")
+        finally:
+            self._emit(None)
+
+
+async def decode_audio_stream(codec: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """16 kHz mono PCM decoded from a compressed uplink"""
+    if codec == "opus":
+        decoder = OpusPacketDecoder()
+        async for packet in chunks:
+            try:
+                pcm = decoder.decode(packet)
+            except av.error.FFmpegError as e:
+                # A single corrupt packet is skipped; Opus recovers on the next one
+                logger.warning(f"Dropping undecodable Opus packet: {e}")
+                continue
+            if pcm:
+                yield pcm
+        return
+
+    decoder = ContainerStreamDecoder()
+
+    async def feed():
+        try:
+            async for chunk in chunks:
+                decoder.feed(chunk)
+        finally:
+            decoder.feed(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            pcm = await decoder.output.get()
+            if pcm is None:
+                return
+            yield pcm
+    finally:
+        feeder.cancel()
+        decoder.feed(None)  # Unblocks the thread if the consumer stopped early
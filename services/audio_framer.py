@@ -0,0 +1,51 @@
+"""
+Fixed-duration framing for the STT uplink.
+Browser chunks (2048 samples, ~23 per second) are accumulated into frames of
+STT_FRAME_MS in one preallocated buffer, so each upstream WebSocket message
+carries 100-250 ms of audio instead of ~43 ms.
+"""
+from typing import Iterator, Optional
+
+from config import settings
+
+MIN_FRAME_MS = 20
+MAX_FRAME_MS = 1000
+
+
+class AudioFramer:
+    """Accumulates 16-bit PCM into fixed-size frames in a reusable buffer"""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = None, sample_width: int = 2):
+        frame_ms = min(max(frame_ms or settings.STT_FRAME_MS, MIN_FRAME_MS), MAX_FRAME_MS)
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * sample_width
+        self._buffer = bytearray(self.frame_bytes)
+        self._view = memoryview(self._buffer)
+        self._fill = 0
+
+    def push(self, pcm: bytes) -> Iterator[memoryview]:
+        """
+        Yield every frame completed by `pcm`.
+        Frames are views of the shared buffer, valid until the next iteration.
+        """
+        data = memoryview(pcm)
+        while data:
+            take = min(len(data), self.frame_bytes - self._fill)
+            self._view[self._fill:self._fill + take] = data[:take]
+            self._fill += take
+            data = data[take:]
+            if self._fill == self.frame_bytes:
+                self._fill = 0
+                yield self._view
+
+    def flush(self) -> Optional[memoryview]:
+        """The trailing partial frame at the end of the stream, if any"""
+        if not self._fill:
+            return None
+        frame = self._view[:self._fill]
+        self._fill = 0
+        return frame
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._fill / self.frame_bytes * self.frame_ms
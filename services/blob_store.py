@@ -0,0 +1,169 @@
+"""
+Content-addressed upload storage.
+Blobs live under a hash-sharded layout (blobs/ab/cd/<sha256>.<ext>), identical
+uploads are stored once, and `stored_blobs.ref_count` tracks how many Document
+and FaceVerification rows point at each blob. Paths stay local for processing;
+`publish` hands finished files to the configured storage backend.
+
+Files follow the database transaction: a blob whose last reference is
+released is only deleted once the session commits, and a blob file created
+in a transaction that rolls back (or is closed uncommitted) is removed.
+"""
+import asyncio
+import os
+import logging
+from typing import List, Optional, Set
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from database.models import StoredBlob
+from services.upload_service import IngestedUpload, CONTENT_TYPE_EXTENSIONS
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Session.info key: blob files waiting on the outcome of the session's transaction
+PENDING_FILES = "blob_store_pending_files"
+
+
+class BlobStore:
+    """Hash-sharded, deduplicating, reference-counted file store"""
+
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(settings.UPLOAD_DIR, "blobs")
+        self.staging_dir = os.path.join(self.root, "staging")
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._removals: Set[asyncio.Task] = set()
+
+    def blob_path(self, sha256: str, extension: str) -> str:
+        """Two levels of two-hex-digit shards keep directories small"""
+        return os.path.join(self.root, sha256[:2], sha256[2:4], f"{sha256}.{extension}")
+
+    async def commit(self, db: AsyncSession, upload: IngestedUpload) -> StoredBlob:
+        """
+        Move an ingested upload into the store and take one reference.
+        If the same bytes are already stored, the new copy is discarded.
+        The caller commits the session.
+        """
+        blob = await db.get(StoredBlob, upload.sha256)
+        if blob is None:
+            path = self.blob_path(upload.sha256, CONTENT_TYPE_EXTENSIONS.get(upload.content_type, "bin"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(upload.path, path)
+            try:
+                async with db.begin_nested():
+                    blob = StoredBlob(
+                        sha256=upload.sha256,
+                        path=path,
+                        size=upload.size,
+                        content_type=upload.content_type,
+                        ref_count=1
+                    )
+                    db.add(blob)
+                self._pending(db)["created"].append(path)
+                return blob
+            except IntegrityError:
+                # A concurrent upload of the same bytes won the insert
+                blob = await db.get(StoredBlob, upload.sha256)
+        else:
+            if os.path.exists(blob.path):
+                os.remove(upload.path)
+            else:
+                # Local cache copy was evicted (remote storage); the new bytes are identical
+                os.makedirs(os.path.dirname(blob.path), exist_ok=True)
+                os.replace(upload.path, blob.path)
+            logger.info(f"Deduplicated upload {upload.sha256[:12]} ({upload.size} bytes)")
+
+        await self.acquire(db, blob.sha256)
+        return blob
+
+    async def acquire(self, db: AsyncSession, sha256: str):
+        """Take one reference on an existing blob"""
+        await db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.sha256 == sha256)
+            .values(ref_count=StoredBlob.ref_count + 1)
+        )
+
+    async def release(self, db: AsyncSession, sha256: Optional[str]):
+        """Drop one reference; the blob and its derived files go when none remain"""
+        if not sha256:
+            return
+        await db.execute(
+            update(StoredBlob)
+            .where(StoredBlob.sha256 == sha256)
+            .values(ref_count=StoredBlob.ref_count - 1)
+        )
+        result = await db.execute(
+            select(StoredBlob).where(StoredBlob.sha256 == sha256, StoredBlob.ref_count <= 0)
+        )
+        blob = result.scalar_one_or_none()
+        if blob is None:
+            return
+
+        await db.delete(blob)
+        # The file goes once the delete is committed; a rollback keeps row and file
+        self._pending(db)["released"].append(blob.path)
+
+    def _pending(self, db: AsyncSession) -> dict:
+        return db.info.setdefault(PENDING_FILES, {"store": self, "created": [], "released": []})
+
+    def _remove_later(self, paths: List[str]):
+        """Delete blob files (and their derived files) from the transaction hooks"""
+        if not paths:
+            return
+        task = asyncio.get_running_loop().create_task(self._remove(paths))
+        self._removals.add(task)
+        task.add_done_callback(self._removals.discard)
+
+    async def _remove(self, paths: List[str]):
+        for path in paths:
+            try:
+                await storage.delete(path)
+                await storage.delete_prefix(self.derived_prefix(path))
+                logger.info(f"Removed unreferenced blob {os.path.basename(path)[:12]}")
+            except Exception as e:
+                logger.error(f"Could not remove blob file {path}: {e}")
+
+    async def drain(self):
+        """Wait for scheduled file removals"""
+        if self._removals:
+            await asyncio.gather(*self._removals)
+
+    def derived_prefix(self, path: str) -> str:
+        """Intermediates are written next to a blob (normalised document, portrait, ...)"""
+        return f"{os.path.splitext(path)[0]}_"
+
+    async def publish(self, blob: StoredBlob, *derived: Optional[str]):
+        """Hand a blob and the JPEG intermediates derived from it to the storage backend"""
+        await storage.save(blob.path, blob.content_type)
+        for path in derived:
+            if path:
+                await storage.save(path, "image/jpeg")
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_blobs(session: Session):
+    if session.in_nested_transaction():
+        return
+    pending = session.info.pop(PENDING_FILES, None)
+    if pending:
+        pending["store"]._remove_later(pending["released"])
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _remove_uncommitted_blobs(session: Session, transaction):
+    # Reached with files still pending only when the outermost transaction
+    # ended without committing: the rows that would reference them are gone
+    if transaction.parent is not None:
+        return
+    pending = session.info.pop(PENDING_FILES, None)
+    if pending:
+        pending["store"]._remove_later(pending["created"])
+
+# Global singleton instance
+blob_store = BlobStore()
@@ -0,0 +1,482 @@
+"""
+Server-side call audio recording.
+Each speaker's 16 kHz PCM is teed off the transcription uplink into a mono
+track, and at session end the tracks are mixed into one stereo recording
+(User left, Agent right): Opus in Ogg or FLAC through PyAV, or WAV when
+PyAV is not installed.
+
+The user and the agent may stream through different workers, so each
+worker records only the speakers it receives. A track is laid out on its
+own wall clock from the moment it opens: every RECORDING_FLUSH_MS the
+recorder writes everything older than RECORDING_JITTER_MS, filling gaps
+(silence never sent, a disconnected party) with zeros. Audio that arrives
+later than the jitter window lands slightly late instead of being lost.
+Buffers are capped at RECORDING_MAX_BUFFER_MS and tracks are encoded
+(losslessly, FLAC or WAV) to disk on every flush, so a call is never held
+in memory. Speakers who reconnect to the same worker keep writing to their
+open track.
+
+Tracks are registered in call_recording_tracks with their start time. When
+the session ends, every worker holding it finalises its tracks and stores
+them; the worker that finds none still recording claims them in one UPDATE
+and mixes them by wall-clock offset into the call recording, saved through
+the storage backend and linked as VideoSession.recording_url. If the
+session had already been recorded (it resumed after being ended), the new
+mix is remuxed onto the end of the linked recording, so the URL stays the
+same and no audio is orphaned.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+import wave
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import aliased
+
+from config import settings
+from database.database import async_session_maker
+from database.models import CallRecordingTrack, VideoSession
+from services.metrics import metrics
+from services.storage import storage
+
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+RECORDING_DIR = "recordings"  # Served as /recordings
+TRACK_DIR = os.path.join(RECORDING_DIR, "tracks")
+SAMPLE_RATE = 16000
+CHANNELS = {"User": 0, "Agent": 1}
+MIX_BLOCK = SAMPLE_RATE * 10  # Samples mixed at a time
+
+# format -> (extension, content type)
+FORMATS = {
+    "opus": ("ogg", "audio/ogg"),
+    "flac": ("flac", "audio/flac"),
+    "wav": ("wav", "audio/wav"),
+}
+
+metrics.describe("call_recordings_active", "Call recording tracks being written")
+metrics.describe("call_recording_seconds_total", "Call audio written to recording tracks")
+metrics.describe("call_recording_dropped_seconds_total", "Speaker audio dropped from full recording buffers")
+
+
+class PyAVWriter:
+    """Opus/Ogg or FLAC encoder writing to a file as packets come out"""
+
+    def __init__(self, path: str, codec: str, layout: str = "stereo"):
+        self.container = av.open(path, mode="w", format="ogg" if codec == "opus" else "flac")
+        self.stream = self.container.add_stream("libopus" if codec == "opus" else "flac", rate=SAMPLE_RATE)
+        self.stream.layout = layout
+        self.layout = layout
+        self.pts = 0
+
+    def write(self, samples: np.ndarray):
+        # Interleaved int16, one row for packed s16; PyAV re-frames to the encoder's frame size
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout=self.layout)
+        frame.sample_rate = SAMPLE_RATE
+        frame.pts = self.pts
+        self.pts += len(samples)
+        for packet in self.stream.encode(frame):
+            self.container.mux(packet)
+
+    def close(self):
+        for packet in self.stream.encode(None):
+            self.container.mux(packet)
+        self.container.close()
+
+
+class WavWriter:
+    """Uncompressed fallback; the header is patched on every write"""
+
+    def __init__(self, path: str, channels: int = 2):
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(SAMPLE_RATE)
+
+    def write(self, samples: np.ndarray):
+        self.file.writeframes(samples.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class TrackReader:
+    """A track's samples as 16 kHz mono int16, read front to back"""
+
+    def __init__(self, path: str):
+        self.wav = None
+        self.container = None
+        if path.endswith(".wav"):
+            self.wav = wave.open(path, "rb")
+            return
+        self.container = av.open(path)
+        self.frames = self.container.decode(audio=0)
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        self.pending = np.zeros(0, dtype=np.int16)
+
+    def read(self, count: int) -> np.ndarray:
+        """Up to `count` samples; fewer at the end of the file"""
+        if self.wav is not None:
+            return np.frombuffer(self.wav.readframes(count), dtype=np.int16)
+        while len(self.pending) < count:
+            frame = next(self.frames, None)
+            if frame is None:
+                break
+            decoded = [resampled.to_ndarray().reshape(-1) for resampled in self.resampler.resample(frame)]
+            self.pending = np.concatenate([self.pending, *decoded])
+        samples, self.pending = self.pending[:count], self.pending[count:]
+        return samples
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+        if self.container is not None:
+            self.container.close()
+
+
+def mix_tracks(tracks: List[Tuple[str, str, int, int]], writer) -> int:
+    """
+    Write (path, speaker, offset, samples) tracks as interleaved stereo, each
+    starting `offset` samples into the mix. Returns the samples per channel.
+    """
+    length = max(offset + samples for _, _, offset, samples in tracks)
+    readers = []
+    try:
+        for path, speaker, offset, samples in tracks:
+            readers.append((TrackReader(path), CHANNELS.get(speaker, 0), offset, samples))
+        for position in range(0, length, MIX_BLOCK):
+            count = min(MIX_BLOCK, length - position)
+            mixed = np.zeros((count, 2), dtype=np.int32)
+            for reader, channel, offset, samples in readers:
+                start, end = max(position, offset), min(position + count, offset + samples)
+                if start < end:
+                    block = reader.read(end - start)
+                    mixed[start - position:start - position + len(block), channel] += block
+            writer.write(np.clip(mixed, -32768, 32767).astype(np.int16))
+    finally:
+        for reader, *_ in readers:
+            reader.close()
+    return length
+
+
+def concatenate(first: str, second: str, output: str):
+    """Write `second` after `first` into `output`; same codec, packets copied as they are"""
+    extension = os.path.splitext(first)[1][1:]
+    if extension == "wav":
+        with wave.open(output, "wb") as out:
+            for path in (first, second):
+                with wave.open(path, "rb") as part:
+                    if path == first:
+                        out.setparams(part.getparams())
+                    while frames := part.readframes(SAMPLE_RATE):
+                        out.writeframes(frames)
+        return
+
+    with av.open(output, mode="w", format=extension) as out:
+        stream = None
+        offset = 0  # End of the previous part, in the input time base
+        for path in (first, second):
+            with av.open(path) as part:
+                source = part.streams.audio[0]
+                if stream is None:
+                    template = getattr(out, "add_stream_from_template", None)
+                    stream = template(source) if template else out.add_stream(template=source)
+                end = offset
+                for packet in part.demux(source):
+                    if packet.dts is None:
+                        continue  # Flush packet
+                    packet.pts += offset
+                    packet.dts += offset
+                    end = max(end, packet.pts + packet.duration)
+                    packet.stream = stream
+                    out.mux(packet)
+                offset = end
+
+
+class Track:
+    """One speaker's audio on this worker: its buffer on the track clock and the encoder"""
+
+    def __init__(self, session_id: str, speaker: str, track_format: str):
+        extension, self.content_type = FORMATS[track_format]
+        os.makedirs(TRACK_DIR, exist_ok=True)
+        self.id = uuid.uuid4().hex
+        self.speaker = speaker
+        self.path = os.path.join(TRACK_DIR, f"track_{session_id}_{speaker}_{self.id[:8]}.{extension}")
+        if track_format == "wav":
+            self.writer = WavWriter(self.path, channels=1)
+        else:
+            self.writer = PyAVWriter(self.path, track_format, layout="mono")
+        self.started_at = time.time()  # Lines the track up with the other workers' tracks
+        self.started = time.monotonic()
+        self.written = 0  # Samples written so far
+        self.max_buffered = SAMPLE_RATE * settings.RECORDING_MAX_BUFFER_MS // 1000
+        self.buffer = bytearray()
+        self.lock = asyncio.Lock()
+
+    def add(self, pcm: bytes):
+        self.buffer.extend(pcm)
+        excess = len(self.buffer) - 2 * self.max_buffered
+        if excess > 0:
+            # Faster than real time for too long (e.g. a client catching up): keep the newest audio
+            del self.buffer[:excess]
+            metrics.inc("call_recording_dropped_seconds_total", excess / 2 / SAMPLE_RATE)
+
+    def take(self, final: bool = False) -> Optional[np.ndarray]:
+        """The next block of audio that is ready to encode, padded with silence"""
+        if final:
+            target = self.written + len(self.buffer) // 2
+        else:
+            elapsed = time.monotonic() - self.started - settings.RECORDING_JITTER_MS / 1000
+            target = int(elapsed * SAMPLE_RATE)
+        count = target - self.written
+        if count <= 0:
+            return None
+
+        samples = np.zeros(count, dtype=np.int16)
+        available = min(count, len(self.buffer) // 2)
+        if available:
+            samples[:available] = np.frombuffer(self.buffer, dtype=np.int16, count=available)
+            del self.buffer[:available * 2]
+        self.written = target
+        return samples
+
+
+class CallRecorder:
+    """Records each session's speakers on this worker and mixes the call recording"""
+
+    def __init__(self):
+        self.enabled = settings.RECORDING_ENABLED
+        self.format = settings.RECORDING_FORMAT.lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown RECORDING_FORMAT: {settings.RECORDING_FORMAT}")
+        if self.format != "wav" and av is None:
+            logger.warning(f"PyAV not installed: recording calls as WAV instead of {self.format}")
+            self.format = "wav"
+        self.interval = settings.RECORDING_FLUSH_MS / 1000
+        self._tracks: Dict[Tuple[str, str], Track] = {}  # (session_id, speaker) -> track
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def track_format(self) -> str:
+        """Tracks are mixed later, so they are stored losslessly"""
+        return "wav" if self.format == "wav" else "flac"
+
+    async def open(self, session_id: str, speaker: str):
+        """Start recording a speaker of a session (once; a reconnect continues the track)"""
+        if not self.enabled or (session_id, speaker) in self._tracks:
+            return
+        try:
+            track = Track(session_id, speaker, self.track_format)
+        except Exception as e:
+            logger.error(f"Could not start recording {speaker} in session {session_id}: {e}")
+            return
+        self._tracks[(session_id, speaker)] = track
+        try:
+            async with async_session_maker() as db:
+                db.add(CallRecordingTrack(
+                    id=track.id, kyc_session_id=session_id, speaker=speaker,
+                    path=track.path, started_at=track.started_at
+                ))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Could not register recording of {speaker} in session {session_id}: {e}")
+            self._tracks.pop((session_id, speaker), None)
+            await asyncio.to_thread(track.writer.close)
+            await storage.delete(track.path)
+            return
+        metrics.set("call_recordings_active", len(self._tracks))
+        logger.info(f"Recording {speaker} in session {session_id} to {track.path}")
+
+    def write(self, session_id: str, speaker: str, pcm: bytes):
+        """16 kHz mono PCM from one speaker; ignored once the track is finished"""
+        track = self._tracks.get((session_id, speaker))
+        if track is not None and pcm:
+            track.add(pcm)
+
+    async def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Finalise every open track"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for session_id in {session_id for session_id, _ in self._tracks}:
+            await self.finish(session_id)
+
+    async def finish(self, session_id: str) -> Optional[str]:
+        """
+        Close and store this worker's tracks of a session, then mix the call
+        recording if no other worker is still recording it. Returns the
+        recording's URL if it was mixed here.
+        """
+        for key in [key for key in self._tracks if key[0] == session_id]:
+            await self._finalise(session_id, self._tracks.pop(key))
+        metrics.set("call_recordings_active", len(self._tracks))
+        return await self.mix(session_id)
+
+    async def _finalise(self, session_id: str, track: Track):
+        """Flush and close a track, store it and mark it ready for mixing"""
+        async with track.lock:
+            try:
+                await self._flush(track, final=True)
+                await asyncio.to_thread(track.writer.close)
+                if track.written:
+                    await storage.save(track.path, track.content_type)
+            except Exception as e:
+                logger.error(f"Finalising recording of {track.speaker} in session {session_id} failed: {e}")
+                track.written = 0  # Dropped rather than mixed half-written
+
+        try:
+            async with async_session_maker() as db:
+                if track.written:
+                    await db.execute(
+                        update(CallRecordingTrack).where(CallRecordingTrack.id == track.id)
+                        .values(status="done", samples=track.written)
+                    )
+                else:
+                    await db.execute(delete(CallRecordingTrack).where(CallRecordingTrack.id == track.id))
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Marking recording of {track.speaker} in session {session_id} finished failed: {e}")
+        if not track.written:
+            await storage.delete(track.path)
+
+    async def mix(self, session_id: str) -> Optional[str]:
+        """Claim the session's finished tracks and mix them into its recording"""
+        claim = uuid.uuid4().hex
+        recording = aliased(CallRecordingTrack)
+        still_recording = select(recording.id).where(
+            recording.kyc_session_id == session_id, recording.status == "recording"
+        ).exists()
+        try:
+            async with async_session_maker() as db:
+                # One statement, so two workers finishing together never both claim a track
+                await db.execute(
+                    update(CallRecordingTrack)
+                    .where(
+                        CallRecordingTrack.kyc_session_id == session_id,
+                        CallRecordingTrack.status == "done",
+                        CallRecordingTrack.mix_id.is_(None),
+                        ~still_recording
+                    )
+                    .values(mix_id=claim)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                tracks = (await db.execute(
+                    select(CallRecordingTrack).where(CallRecordingTrack.mix_id == claim)
+                    .order_by(CallRecordingTrack.started_at)
+                )).scalars().all()
+        except Exception as e:
+            logger.error(f"Claiming recording tracks of session {session_id} failed: {e}")
+            return None
+        if not tracks:
+            return None
+
+        try:
+            url = await self._mix_claimed(session_id, tracks)
+        except Exception as e:
+            logger.error(f"Mixing recording of session {session_id} failed: {e}")
+            # Released for the next worker to finish the session
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(CallRecordingTrack).where(CallRecordingTrack.mix_id == claim).values(mix_id=None)
+                )
+                await db.commit()
+            return None
+
+        async with async_session_maker() as db:
+            await db.execute(delete(CallRecordingTrack).where(CallRecordingTrack.mix_id == claim))
+            await db.commit()
+        for track in tracks:
+            await storage.delete(track.path)
+        return url
+
+    async def _mix_claimed(self, session_id: str, tracks: List[CallRecordingTrack]) -> str:
+        """Mix claimed tracks by wall-clock offset, store and link the recording"""
+        origin = tracks[0].started_at
+        layout = []
+        for track in tracks:
+            path = await storage.ensure_local(track.path)
+            layout.append((path, track.speaker, round((track.started_at - origin) * SAMPLE_RATE), track.samples))
+
+        extension, content_type = FORMATS[self.format]
+        os.makedirs(RECORDING_DIR, exist_ok=True)
+        path = os.path.join(
+            RECORDING_DIR, f"call_{session_id}_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}.{extension}"
+        )
+        writer = WavWriter(path) if self.format == "wav" else PyAVWriter(path, self.format)
+        try:
+            length = await asyncio.to_thread(mix_tracks, layout, writer)
+        finally:
+            await asyncio.to_thread(writer.close)
+
+        path = await self._append_to_previous(session_id, path)
+        await storage.save(path, content_type)
+        url = f"/{path.replace(os.sep, '/')}"
+        async with async_session_maker() as db:
+            await db.execute(
+                update(VideoSession).where(VideoSession.kyc_session_id == session_id).values(recording_url=url)
+            )
+            await db.commit()
+        logger.info(f"Recording of session {session_id} mixed from {len(tracks)} track(s) ({length / SAMPLE_RATE:.0f}s): {url}")
+        return url
+
+    async def _append_to_previous(self, session_id: str, path: str) -> str:
+        """Merge into the session's linked recording; returns the path that holds the audio"""
+        async with async_session_maker() as db:
+            previous_url = (await db.execute(
+                select(VideoSession.recording_url).where(VideoSession.kyc_session_id == session_id)
+            )).scalar_one_or_none()
+        if not previous_url:
+            return path
+        previous = previous_url.lstrip("/")
+        if os.path.splitext(previous)[1] != os.path.splitext(path)[1]:
+            # Recorded in another format (RECORDING_FORMAT changed, or the old placeholder)
+            logger.warning(f"Session {session_id} already has {previous_url}; linking a separate recording")
+            return path
+
+        previous = await storage.ensure_local(previous)
+        merged = f"{path}.merged"
+        await asyncio.to_thread(concatenate, previous, path, merged)
+        os.replace(merged, previous)
+        os.remove(path)
+        logger.info(f"Appended resumed audio of session {session_id} to {previous_url}")
+        return previous
+
+    async def _flush(self, track: Track, final: bool = False):
+        samples = track.take(final)
+        if samples is not None:
+            await asyncio.to_thread(track.writer.write, samples)
+            metrics.inc("call_recording_seconds_total", len(samples) / SAMPLE_RATE)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for (session_id, speaker), track in list(self._tracks.items()):
+                if track.lock.locked():
+                    continue
+                async with track.lock:
+                    try:
+                        await self._flush(track)
+                    except Exception as e:
+                        logger.error(f"Writing recording of {speaker} in session {session_id} failed: {e}")
+
+# Global singleton instance
+call_recorder = CallRecorder()
@@ -0,0 +1,110 @@
+"""
+Document localisation: find the card/page quadrilateral in a photo
+and warp it to a canonical size before OCR and portrait extraction.
+"""
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+import logging
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Known document aspect ratios (long side / short side)
+DOCUMENT_FORMATS = {
+    "id1_card": 85.60 / 53.98,   # National IDs, driving licences
+    "id3_passport": 125.0 / 88.0,  # Passport data page
+    "a4_page": 297.0 / 210.0,
+}
+
+
+class DocumentLocalizer:
+    """Finds the document outline in a photo and crops it flat"""
+
+    def __init__(self):
+        self.detect_width = settings.DOCUMENT_DETECT_WIDTH
+        self.canonical_width = settings.DOCUMENT_CANONICAL_WIDTH
+        self.min_area_ratio = settings.DOCUMENT_MIN_AREA_RATIO
+
+    def find_quad(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Return the document corners (tl, tr, br, bl) in full-resolution
+        coordinates, or None if no confident quadrilateral was found.
+        """
+        height, width = gray.shape[:2]
+
+        # Edge detection on a small copy is enough to find the outline
+        scale = min(1.0, self.detect_width / width)
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        blurred = cv2.GaussianBlur(small, (5, 5), 0)
+        edges = cv2.Canny(blurred, 50, 150)
+        edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=1)
+
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        frame_area = small.shape[0] * small.shape[1]
+
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+            area = cv2.contourArea(contour)
+            if area < self.min_area_ratio * frame_area:
+                break
+            perimeter = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+            if len(approx) != 4 or not cv2.isContourConvex(approx):
+                continue
+            # A quad covering the whole frame means the photo is already cropped
+            if area > 0.95 * frame_area:
+                return None
+            return self._order_corners(approx.reshape(4, 2).astype(np.float32) / scale)
+
+        return None
+
+    def crop(
+        self,
+        image: np.ndarray,
+        gray: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Warp the located document to its canonical size; returns (image, quad)"""
+        if gray is None:
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        quad = self.find_quad(gray)
+        if quad is None:
+            return image, None
+
+        size = self._canonical_size(quad)
+        target = np.float32([
+            [0, 0],
+            [size[0] - 1, 0],
+            [size[0] - 1, size[1] - 1],
+            [0, size[1] - 1]
+        ])
+        transform = cv2.getPerspectiveTransform(quad, target)
+        warped = cv2.warpPerspective(image, transform, size, flags=cv2.INTER_LINEAR)
+        return warped, quad
+
+    def _canonical_size(self, quad: np.ndarray) -> Tuple[int, int]:
+        """Snap the measured aspect ratio to the nearest known document format"""
+        tl, tr, br, bl = quad
+        measured_w = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+        measured_h = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+        landscape = measured_w >= measured_h
+        ratio = max(measured_w, measured_h) / max(min(measured_w, measured_h), 1.0)
+
+        snapped = min(DOCUMENT_FORMATS.values(), key=lambda known: abs(known - ratio))
+        if abs(snapped - ratio) / snapped > 0.15:
+            snapped = ratio  # Unknown format, keep what we measured
+
+        long_side = self.canonical_width
+        short_side = int(round(long_side / snapped))
+        return (long_side, short_side) if landscape else (short_side, long_side)
+
+    def _order_corners(self, points: np.ndarray) -> np.ndarray:
+        """Order four points as top-left, top-right, bottom-right, bottom-left"""
+        ordered = np.zeros((4, 2), dtype=np.float32)
+        sums = points.sum(axis=1)
+        diffs = np.diff(points, axis=1).ravel()
+        ordered[0] = points[np.argmin(sums)]
+        ordered[2] = points[np.argmax(sums)]
+        ordered[1] = points[np.argmin(diffs)]
+        ordered[3] = points[np.argmax(diffs)]
+        return ordered
@@ -0,0 +1,71 @@
+"""
+Single-decode document pipeline for /documents/upload.
+The upload is decoded once; quality checks, OCR input and the portrait crop
+are derived from shared buffers, and the intermediates are persisted so that
+face verification does not have to decode the original again.
+"""
+import asyncio
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional
+import os
+import logging
+
+from database.models import DocumentType
+from services.ocr_service import OCRService
+from services.face_service import FaceService
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentPipeline:
+    """Decode once, then validate, OCR and extract the portrait"""
+
+    def __init__(self, ocr_service: OCRService, face_service: FaceService):
+        self.ocr_service = ocr_service
+        self.face_service = face_service
+
+    async def process(self, file_path: str, document_type: DocumentType) -> Dict[str, Any]:
+        """Run the pipeline in a worker thread so uploads don't block the event loop"""
+        return await asyncio.to_thread(self._process, file_path, document_type)
+
+    def _process(self, file_path: str, document_type: DocumentType) -> Dict[str, Any]:
+        image, exif_orientation = self.ocr_service.orientation.load(file_path)
+        if image is None:
+            return {
+                "ocr": {"error": "Could not read image", "raw_text": ""},
+                "validation": {"valid": False, "reason": "Could not read image"},
+                "normalized_path": None,
+                "portrait_path": None
+            }
+
+        # Shared buffers: full-frame gray for quality checks and localisation
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        validation = self.ocr_service.validate_image(image, gray)
+
+        # Cropped, upright document and its gray copy feed both OCR and portrait search
+        document, doc_gray, preprocessing = self.ocr_service.prepare_document(image, gray)
+        preprocessing["exif_orientation"] = exif_orientation
+
+        ocr = self.ocr_service.mock_result(file_path)
+        if ocr is None:
+            ocr = self.ocr_service.extract_from_image(doc_gray, document_type, preprocessing)
+
+        portrait = self.face_service.extract_portrait(document, doc_gray)
+
+        base = os.path.splitext(file_path)[0]
+        return {
+            "ocr": ocr,
+            "validation": validation,
+            "normalized_path": self._persist(f"{base}_document.jpg", document),
+            "portrait_path": self._persist(f"{base}_portrait.jpg", portrait)
+        }
+
+    def _persist(self, path: str, image: Optional[np.ndarray]) -> Optional[str]:
+        """Write an intermediate image next to the original upload"""
+        if image is None or image.size == 0:
+            return None
+        if not cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 92]):
+            logger.error(f"Failed to persist intermediate image {path}")
+            return None
+        return path
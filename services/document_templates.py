@@ -0,0 +1,238 @@
+"""
+Document template registry for known ID layouts.
+Aligns an upload to a registered issuer layout and OCRs only the field regions.
+"""
+import cv2
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import os
+import logging
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+from config import settings
+from database.models import DocumentType
+
+logger = logging.getLogger(__name__)
+
+# Document types that have fixed issuer layouts
+TEMPLATE_DOCUMENT_TYPES = (DocumentType.NATIONAL_ID, DocumentType.DRIVERS_LICENSE)
+
+
+class TemplateField:
+    """A field rectangle on a template, in normalised (0-1) coordinates"""
+
+    def __init__(
+        self,
+        name: str,
+        box: Tuple[float, float, float, float],
+        whitelist: Optional[str] = None,
+        psm: int = 7,
+        lang: Optional[str] = None
+    ):
+        self.name = name
+        self.box = box  # (x, y, width, height)
+        self.whitelist = whitelist
+        self.psm = psm
+        self.lang = lang  # Overrides the detected document language
+
+    def crop(self, image: np.ndarray) -> np.ndarray:
+        """Cut this field out of an image already warped to the template size"""
+        height, width = image.shape[:2]
+        x, y, w, h = self.box
+        x0, y0 = int(x * width), int(y * height)
+        x1, y1 = int((x + w) * width), int((y + h) * height)
+        return image[max(y0, 0):min(y1, height), max(x0, 0):min(x1, width)]
+
+    def tesseract_config(self) -> str:
+        config = f"--psm {self.psm}"
+        if self.whitelist:
+            config += f" -c tessedit_char_whitelist={self.whitelist}"
+        return config
+
+
+class DocumentTemplate:
+    """Issuer layout: reference image, canonical size and field rectangles"""
+
+    def __init__(
+        self,
+        template_id: str,
+        document_type: DocumentType,
+        reference: np.ndarray,
+        fields: List[TemplateField],
+        issuer: Optional[str] = None,
+        width: int = 1000
+    ):
+        self.template_id = template_id
+        self.document_type = document_type
+        self.issuer = issuer
+        self.fields = fields
+
+        # Keep the reference at the canonical size so field boxes map 1:1
+        gray = reference if reference.ndim == 2 else cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+        scale = width / gray.shape[1]
+        self.size = (width, int(round(gray.shape[0] * scale)))
+        self.reference = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+
+        # Populated by the registry when the template is registered
+        self.keypoints = None
+        self.descriptors = None
+
+
+class TemplateRegistry:
+    """Registry of issuer layouts with ORB/homography alignment"""
+
+    def __init__(self):
+        self.templates: Dict[DocumentType, List[DocumentTemplate]] = {}
+        self.align_width = settings.TEMPLATE_ALIGN_WIDTH
+        self.min_inliers = settings.TEMPLATE_MIN_INLIERS
+        self.orb = cv2.ORB_create(nfeatures=settings.TEMPLATE_ORB_FEATURES)
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+
+    def register(self, template: DocumentTemplate):
+        """Register a template and precompute its reference features"""
+        template.keypoints, template.descriptors = self.orb.detectAndCompute(template.reference, None)
+        if template.descriptors is None or len(template.keypoints) < self.min_inliers:
+            logger.warning(f"Template {template.template_id} has too few features - skipped")
+            return
+        self.templates.setdefault(template.document_type, []).append(template)
+        logger.info(
+            f"Registered template {template.template_id} "
+            f"({template.document_type.value}, {len(template.fields)} fields)"
+        )
+
+    def load_directory(self, directory: str) -> int:
+        """
+        Load every *.json template definition from a directory.
+
+        Format:
+            {"id": "in-aadhaar-v1", "document_type": "national_id", "issuer": "UIDAI",
+             "reference": "aadhaar_front.png", "width": 1000,
+             "fields": {"name": {"box": [x, y, w, h], "whitelist": "ABC...", "psm": 7, "lang": "eng"}}}
+        The reference path is relative to the definition file.
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        loaded = 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                with open(path, "r") as f:
+                    spec = json.load(f)
+
+                reference = cv2.imread(
+                    os.path.join(directory, spec["reference"]), cv2.IMREAD_GRAYSCALE
+                )
+                if reference is None:
+                    raise ValueError(f"Could not read reference image {spec['reference']}")
+
+                fields = [
+                    TemplateField(
+                        name,
+                        tuple(field["box"]),
+                        whitelist=field.get("whitelist"),
+                        psm=field.get("psm", 7),
+                        lang=field.get("lang")
+                    )
+                    for name, field in spec["fields"].items()
+                ]
+                self.register(DocumentTemplate(
+                    template_id=spec.get("id", filename[:-5]),
+                    document_type=DocumentType(spec["document_type"]),
+                    reference=reference,
+                    fields=fields,
+                    issuer=spec.get("issuer"),
+                    width=spec.get("width", 1000)
+                ))
+                loaded += 1
+            except Exception as e:
+                logger.error(f"Failed to load document template {path}: {e}")
+        return loaded
+
+    def has_templates(self, document_type: DocumentType) -> bool:
+        return bool(self.templates.get(document_type))
+
+    def align(
+        self,
+        gray: np.ndarray,
+        document_type: DocumentType
+    ) -> Optional[Tuple[DocumentTemplate, np.ndarray, int]]:
+        """
+        Find the best matching template and warp the upload onto it.
+        Returns (template, warped_gray, inliers) or None if nothing aligns.
+        """
+        candidates = self.templates.get(document_type)
+        if not candidates:
+            return None
+
+        # Detect features on a downscaled copy; the homography is rescaled afterwards
+        scale = min(1.0, self.align_width / gray.shape[1])
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        keypoints, descriptors = self.orb.detectAndCompute(small, None)
+        if descriptors is None or len(keypoints) < self.min_inliers:
+            return None
+
+        best = None
+        for template in candidates:
+            homography, inliers = self._estimate_homography(keypoints, descriptors, template)
+            if homography is not None and inliers >= self.min_inliers:
+                if best is None or inliers > best[2]:
+                    best = (template, homography, inliers)
+
+        if best is None:
+            return None
+
+        template, homography, inliers = best
+        to_small = np.diag([scale, scale, 1.0])
+        warped = cv2.warpPerspective(gray, homography @ to_small, template.size)
+        return template, warped, inliers
+
+    def _estimate_homography(
+        self,
+        keypoints,
+        descriptors: np.ndarray,
+        template: DocumentTemplate
+    ) -> Tuple[Optional[np.ndarray], int]:
+        """Ratio-test ORB matches and fit an upload -> template homography"""
+        pairs = self.matcher.knnMatch(descriptors, template.descriptors, k=2)
+        good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < 0.75 * p[1].distance]
+        if len(good) < self.min_inliers:
+            return None, 0
+
+        src = np.float32([keypoints[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst = np.float32([template.keypoints[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+        homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        if homography is None:
+            return None, 0
+        return homography, int(mask.sum())
+
+    def read_fields(
+        self,
+        template: DocumentTemplate,
+        warped: np.ndarray,
+        lang: str = "eng"
+    ) -> Dict[str, Any]:
+        """OCR each field rectangle with its own page mode and whitelist"""
+        fields = {}
+        for field in template.fields:
+            crop = field.crop(warped)
+            if crop.size == 0:
+                fields[field.name] = None
+                continue
+            _, crop = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            try:
+                text = pytesseract.image_to_string(
+                    crop, lang=field.lang or lang, config=field.tesseract_config()
+                )
+                fields[field.name] = " ".join(text.split()) or None
+            except Exception as e:
+                logger.error(f"Field OCR failed for {template.template_id}.{field.name}: {e}")
+                fields[field.name] = None
+        return fields
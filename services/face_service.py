@@ -9,6 +9,8 @@ except ImportError:
     face_recognition = None
 
 from config import settings
+from services.document_localizer import DocumentLocalizer
+from services.orientation import OrientationNormalizer
 
 class FaceService:
     """Service for face detection and verification"""
@@ -19,13 +21,18 @@ class FaceService:
         # Load OpenCV's pre-trained face detector as fallback
         cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         self.face_cascade = cv2.CascadeClassifier(cascade_path)
+        
+        # Restricts the document-side face search to the document itself
+        self.localizer = DocumentLocalizer()
+        self.orientation = OrientationNormalizer()
     
     async def compare_faces(
         self, 
         selfie_path: str, 
-        document_path: str
+        document_path: str,
+        portrait_path: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Compare face in selfie with face in document"""
+        """Compare face in selfie with face in document (or its stored portrait crop)"""
         # --- MOCK FOR TESTING ---
         if not face_recognition or "sample_selfie" in selfie_path or "uploads" in selfie_path:
             return {
@@ -37,27 +44,35 @@ class FaceService:
             }
         # ------------------------
 
-        # Load images
-        selfie = cv2.imread(selfie_path)
-        document = cv2.imread(document_path)
+        # Load images (EXIF orientation applied)
+        selfie, _ = self.orientation.load(selfie_path)
+        if portrait_path and os.path.exists(portrait_path):
+            # Portrait already cut out by the document pipeline at upload time
+            document = cv2.imread(portrait_path)
+        else:
+            document, _ = self.orientation.load(document_path)
+            if document is not None:
+                # Search for the portrait only inside the upright document
+                document, _ = self.localizer.crop(document)
+                document, _ = self.orientation.normalize(document)
         
         if selfie is None or document is None:
             raise ValueError("Could not load images")
         
         if face_recognition:
-            return await self._compare_with_face_recognition(selfie_path, document_path)
+            return await self._compare_with_face_recognition(selfie, document)
         else:
             return await self._compare_with_opencv(selfie, document)
     
     async def _compare_with_face_recognition(
         self, 
-        selfie_path: str, 
-        document_path: str
+        selfie: np.ndarray, 
+        document: np.ndarray
     ) -> Dict[str, Any]:
         """Compare faces using face_recognition library"""
-        # Load images
-        selfie_image = face_recognition.load_image_file(selfie_path)
-        document_image = face_recognition.load_image_file(document_path)
+        # face_recognition expects RGB
+        selfie_image = cv2.cvtColor(selfie, cv2.COLOR_BGR2RGB)
+        document_image = cv2.cvtColor(document, cv2.COLOR_BGR2RGB)
         
         # Get face encodings
         selfie_encodings = face_recognition.face_encodings(selfie_image)
@@ -137,9 +152,38 @@ class FaceService:
             "warning": "Using fallback method - install face_recognition for better accuracy"
         }
     
-    def _detect_faces_opencv(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def extract_portrait(
+        self,
+        document: np.ndarray,
+        gray: Optional[np.ndarray] = None,
+        margin: float = 0.3
+    ) -> Optional[np.ndarray]:
+        """Cut the largest face (with margin) out of a prepared document image"""
+        if face_recognition:
+            locations = face_recognition.face_locations(cv2.cvtColor(document, cv2.COLOR_BGR2RGB))
+            faces = [(l, t, r - l, b - t) for t, r, b, l in locations]
+        else:
+            faces = self._detect_faces_opencv(document, gray)
+        
+        if len(faces) == 0:
+            return None
+        
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        height, width = document.shape[:2]
+        return document[
+            max(y - pad_y, 0):min(y + h + pad_y, height),
+            max(x - pad_x, 0):min(x + w + pad_x, width)
+        ].copy()
+    
+    def _detect_faces_opencv(
+        self,
+        image: np.ndarray,
+        gray: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, int, int, int]]:
         """Detect faces using OpenCV Haar cascades"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
@@ -0,0 +1,127 @@
+"""
+In-process metrics registry exposed at /metrics.
+Counters, gauges and summaries (count/sum/min/max) keyed by name and labels,
+rendered in the Prometheus text format or as JSON. A summary's min and max
+are exposed to Prometheus as separate `<name>_min`/`<name>_max` gauges, since
+a summary family may only carry _count, _sum and quantiles. Per-session series are
+dropped with `remove(session=...)` when the session ends so the registry
+does not grow with call history.
+"""
+import threading
+import time
+from typing import Dict, Tuple, Optional
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe store of named, labelled metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._summaries: Dict[str, Dict[LabelKey, list]] = {}  # [count, sum, min, max]
+        self._help: Dict[str, str] = {}
+        self.started_at = time.time()
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            summary = self._summaries.setdefault(name, {}).get(key)
+            if summary is None:
+                self._summaries[name][key] = [1, value, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = min(summary[2], value)
+                summary[3] = max(summary[3], value)
+
+    def get(self, name: str, **labels) -> Optional[float]:
+        """Current value of a counter or gauge"""
+        key = _label_key(labels)
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                if key in store.get(name, {}):
+                    return store[name][key]
+        return None
+
+    def remove(self, **labels):
+        """Drop every series carrying these labels (e.g. session=...)"""
+        wanted = set(_label_key(labels))
+        with self._lock:
+            for store in (self._counters, self._gauges, self._summaries):
+                for series in store.values():
+                    for key in [key for key in series if wanted.issubset(key)]:
+                        del series[key]
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view of every series"""
+        def expand(series):
+            return [{"labels": dict(key), "value": value} for key, value in series.items()]
+
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "counters": {name: expand(series) for name, series in self._counters.items()},
+                "gauges": {name: expand(series) for name, series in self._gauges.items()},
+                "summaries": {
+                    name: [
+                        {"labels": dict(key), "count": s[0], "sum": s[1], "min": s[2], "max": s[3]}
+                        for key, s in series.items()
+                    ]
+                    for name, series in self._summaries.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in store.items():
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in series.items():
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in self._summaries.items():
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for key, (count, total, _, _) in series.items():
+                    labels = _format_labels(key)
+                    lines.append(f"{name}_count{labels} {count}")
+                    lines.append(f"{name}_sum{labels} {total:g}")
+                for suffix, index in (("min", 2), ("max", 3)):
+                    lines.append(f"# HELP {name}_{suffix} {suffix.capitalize()} of {name}")
+                    lines.append(f"# TYPE {name}_{suffix} gauge")
+                    for key, summary in series.items():
+                        lines.append(f"{name}_{suffix}{_format_labels(key)} {summary[index]:g}")
+        return "\n".join(lines) + "\n"
+
+# Global singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,239 @@
+"""
+Orientation normalisation for document photos.
+Applies EXIF orientation, then fixes sideways/upside-down text with a cheap
+text-line direction estimate on a thumbnail (much faster than Tesseract OSD).
+
+Upside-down text is recognised per line where the glyphs are asymmetric:
+headline scripts hang from a dense top row, and mixed-case Latin has sparse
+ascenders above a dense x-height body. All-caps lines have neither, so when
+too few lines decide, the page layout does: text is left-aligned, so line
+starts share a margin and line ends are ragged - mirrored when upside down.
+"""
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+import io
+import logging
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# Decision margins for the text-direction estimate
+SIDEWAYS_RATIO = 1.5  # Vertical vs. horizontal blob elongation needed to call an image sideways
+HEADLINE_COVERAGE = 0.65  # Fraction of inked columns covered by a headline (shirorekha) row
+HEADLINE_PEAK_RATIO = 2.2  # Headline row density vs. mean row density in the line
+LINE_BALANCE_MARGIN = 0.1  # Top/bottom ink balance below which a Latin line is undecided
+X_HEIGHT_STEP = 0.6  # Edge-quarter vs. middle ink density that marks ascender/descender-only rows
+UPSIDE_DOWN_AGREEMENT = 0.7  # Share of decided lines that must vote for the flip
+MARGIN_TOLERANCE = 0.015  # Line ends within this fraction of the width share a margin
+MARGIN_LEAD = 2  # Extra lines on the right margin than the left needed to call the text upside down
+
+
+class OrientationNormalizer:
+    """Rotates decoded images so that text lines read left to right"""
+
+    def __init__(self):
+        self.thumbnail_size = settings.ORIENTATION_THUMBNAIL_SIZE
+
+    def load(self, image_path: str) -> Tuple[Optional[np.ndarray], int]:
+        """Decode an image file with its EXIF orientation applied; returns (image, exif_orientation)"""
+        data = np.fromfile(image_path, dtype=np.uint8)
+        return self.decode(data.tobytes())
+
+    def decode(self, data: bytes) -> Tuple[Optional[np.ndarray], int]:
+        """Decode image bytes with their EXIF orientation applied"""
+        image = cv2.imdecode(
+            np.frombuffer(data, np.uint8),
+            cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+        )
+        if image is None:
+            return None, 1
+        orientation = self.read_exif_orientation(data)
+        return self.apply_exif(image, orientation), orientation
+
+    def read_exif_orientation(self, data: bytes) -> int:
+        """Read the EXIF orientation tag (1 = upright) without decoding pixels"""
+        if Image is None:
+            return 1
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                return int(img.getexif().get(EXIF_ORIENTATION_TAG, 1))
+        except Exception:
+            return 1
+
+    def apply_exif(self, image: np.ndarray, orientation: int) -> np.ndarray:
+        """Transform pixels according to an EXIF orientation value"""
+        if orientation == 2:
+            return cv2.flip(image, 1)
+        if orientation == 3:
+            return cv2.rotate(image, cv2.ROTATE_180)
+        if orientation == 4:
+            return cv2.flip(image, 0)
+        if orientation == 5:
+            return cv2.flip(cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE), 1)
+        if orientation == 6:
+            return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        if orientation == 7:
+            return cv2.flip(cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE), 1)
+        if orientation == 8:
+            return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return image
+
+    def normalize(self, image: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Rotate an image so its text is upright; returns (image, info)"""
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        info = self.estimate(gray)
+        return self.rotate(image, info["rotation"]), info
+
+    def estimate(self, gray: np.ndarray) -> Dict[str, Any]:
+        """Estimate the clockwise rotation that makes the text upright"""
+        scale = min(1.0, self.thumbnail_size / max(gray.shape[:2]))
+        thumb = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+        _, ink = cv2.threshold(thumb, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        rotation = 0
+        glyph_size = self._glyph_size(ink)
+        vertical = self._elongation(ink, glyph_size, vertical=True) if glyph_size else 0.0
+        horizontal = self._elongation(ink, glyph_size, vertical=False) if glyph_size else 0.0
+        if vertical > SIDEWAYS_RATIO * horizontal:
+            # Text lines run vertically; turn them horizontal before the flip test
+            ink = cv2.rotate(ink, cv2.ROTATE_90_CLOCKWISE)
+            rotation = 90
+
+        if glyph_size:
+            ink = self._text_only(ink, glyph_size)
+        upright, flipped, left_aligned, right_aligned = self._flip_votes(ink)
+        if upright + flipped >= 2:
+            upside_down = flipped >= 2 and flipped >= UPSIDE_DOWN_AGREEMENT * (upright + flipped)
+        else:
+            # Lines without glyph asymmetry (e.g. all caps): fall back to the ragged margin
+            upside_down = right_aligned >= left_aligned + MARGIN_LEAD
+        if upside_down:
+            rotation = (rotation + 180) % 360
+
+        return {
+            "rotation": rotation,
+            "upright_lines": upright,
+            "flipped_lines": flipped,
+            "left_aligned_lines": left_aligned,
+            "right_aligned_lines": right_aligned
+        }
+
+    def rotate(self, image: np.ndarray, rotation: int) -> np.ndarray:
+        """Rotate clockwise by a multiple of 90 degrees"""
+        if rotation == 90:
+            return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+        if rotation == 180:
+            return cv2.rotate(image, cv2.ROTATE_180)
+        if rotation == 270:
+            return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        return image
+
+    def _glyph_size(self, ink: np.ndarray) -> int:
+        """Median glyph (or merged word) thickness, used to size the smearing kernel"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        extents = np.minimum(stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT])
+        extents = extents[extents >= 2]
+        return int(np.median(extents)) if len(extents) else 0
+
+    def _text_only(self, ink: np.ndarray, glyph_size: int) -> np.ndarray:
+        """Drop blobs far thicker than a glyph (photos, logos, borders) so they don't join text lines"""
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        thick = np.minimum(stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]) > 4 * glyph_size
+        thick[0] = False
+        return np.where(thick[labels], 0, ink).astype(ink.dtype)
+
+    def _elongation(self, ink: np.ndarray, glyph_size: int, vertical: bool) -> float:
+        """
+        Smear glyphs along one axis and measure how elongated the blobs become.
+        Glyphs on a text line merge into long bars only along the line direction.
+        """
+        length = max(3, int(glyph_size * 1.2))
+        kernel = np.ones((length, 1) if vertical else (1, length), np.uint8)
+        smeared = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, kernel)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(smeared, connectivity=8)
+        if count <= 1:
+            return 0.0
+        widths = stats[1:, cv2.CC_STAT_WIDTH].astype(np.float32)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT].astype(np.float32)
+        areas = stats[1:, cv2.CC_STAT_AREA].astype(np.float32)
+
+        # Thick blobs are photos, logos or borders rather than text
+        text = np.minimum(widths, heights) <= 4 * glyph_size
+        if not text.any():
+            return 0.0
+        ratios = heights[text] / widths[text] if vertical else widths[text] / heights[text]
+        return float((ratios * areas[text]).sum() / areas[text].sum())
+
+    def _flip_votes(self, ink: np.ndarray) -> Tuple[int, int, int, int]:
+        """
+        Count text lines that look upright vs. upside down, and lines whose
+        start (left) or end (right) lines up with another line's.
+        """
+        rows = ink.sum(axis=1)
+        active = np.append(rows > max(2, 0.02 * ink.shape[1]), False)
+
+        upright = flipped = 0
+        lefts, rights = [], []
+        start = None
+        for y, is_text in enumerate(active):
+            if is_text and start is None:
+                start = y
+            elif not is_text and start is not None:
+                line = ink[start:y]
+                vote = self._line_vote(line)
+                upright += vote > 0
+                flipped += vote < 0
+                columns = np.flatnonzero(line.any(axis=0))
+                lefts.append(columns[0])
+                rights.append(columns[-1])
+                start = None
+
+        tolerance = max(2.0, MARGIN_TOLERANCE * ink.shape[1])
+        return upright, flipped, self._aligned(lefts, tolerance), self._aligned(rights, tolerance)
+
+    def _aligned(self, edges: list, tolerance: float) -> int:
+        """Number of line edges within `tolerance` of another line's edge"""
+        edges = np.asarray(edges, dtype=np.float32)
+        if len(edges) < 2:
+            return 0
+        distances = np.abs(edges[:, None] - edges[None, :])
+        np.fill_diagonal(distances, np.inf)
+        return int((distances.min(axis=1) <= tolerance).sum())
+
+    def _line_vote(self, line: np.ndarray) -> int:
+        """+1 upright, -1 upside down, 0 undecided"""
+        height = line.shape[0]
+        if height < 6:
+            return 0
+        rows = line.sum(axis=1).astype(np.float32)
+        inked_columns = max(int(line.any(axis=0).sum()), 1)
+
+        edge = max(1, int(height * 0.45))
+        top_coverage = rows[:edge].max() / inked_columns
+        bottom_coverage = rows[-edge:].max() / inked_columns
+        # A headline is one row far denser than the rest (capitals' top bars are not)
+        peak_ratio = rows.max() / max(float(rows.mean()), 1e-6)
+        if (max(top_coverage, bottom_coverage) >= HEADLINE_COVERAGE and peak_ratio >= HEADLINE_PEAK_RATIO
+                and abs(top_coverage - bottom_coverage) > 0.15):
+            return 1 if top_coverage > bottom_coverage else -1
+
+        # Only a line with an x-height step (sparse ascender or descender rows) is asymmetric;
+        # capitals fill the whole line height evenly
+        quarter = max(1, height // 4)
+        top, bottom = rows[:quarter].sum(), rows[-quarter:].sum()
+        middle = rows[quarter:height - quarter].mean() * quarter
+        if top + bottom == 0 or min(top, bottom) >= X_HEIGHT_STEP * middle:
+            return 0
+        balance = (bottom - top) / (bottom + top)
+        if abs(balance) < LINE_BALANCE_MARGIN:
+            return 0
+        return 1 if balance > 0 else -1
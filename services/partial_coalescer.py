@@ -0,0 +1,68 @@
+"""
+Per-speaker rate limiting of partial transcripts.
+Sarvam can emit several partials a second per speaker under fast speech.
+At most PARTIAL_MAX_RATE partials per second are published for each speaker:
+the first goes out at once, and within each window after it only the latest
+one is sent when the window closes. Finals are never delayed; a final
+cancels the speaker's pending partial and resets the window.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from config import settings
+from services.metrics import metrics
+
+metrics.describe("partials_coalesced_total", "Partial transcripts replaced by a newer one before publishing")
+
+Key = Tuple[str, str]  # (session_id, speaker)
+
+
+class PartialCoalescer:
+    """Publishes the latest partial per speaker at a bounded rate"""
+
+    def __init__(self, publish: Callable[[str, dict], Awaitable[None]], max_rate: float = None):
+        self.publish = publish
+        max_rate = settings.PARTIAL_MAX_RATE if max_rate is None else max_rate
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._last_sent: Dict[Key, float] = {}
+        self._latest: Dict[Key, dict] = {}
+        self._timers: Dict[Key, asyncio.Task] = {}
+
+    async def partial(self, session_id: str, entry: dict):
+        """Publish now if the speaker's window is open, otherwise hold the latest until it is"""
+        key = (session_id, entry["speaker"])
+        now = time.monotonic()
+        wait = self._last_sent.get(key, float("-inf")) + self.interval - now
+        if wait <= 0 and key not in self._timers:
+            self._last_sent[key] = now
+            await self.publish(session_id, dict(entry))
+            return
+
+        if key in self._latest:
+            metrics.inc("partials_coalesced_total")
+        self._latest[key] = entry
+        if key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._publish_later(key, wait))
+
+    def final(self, session_id: str, speaker: str):
+        """The speaker's utterance is final: drop its held partial and reset the window"""
+        key = (session_id, speaker)
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        self._latest.pop(key, None)
+        self._last_sent.pop(key, None)
+
+    def end_session(self, session_id: str):
+        for key in [key for key in {**self._last_sent, **self._timers} if key[0] == session_id]:
+            self.final(*key)
+
+    async def _publish_later(self, key: Key, delay: float):
+        await asyncio.sleep(delay)
+        self._timers.pop(key, None)
+        entry = self._latest.pop(key, None)
+        if entry is not None:
+            self._last_sent[key] = time.monotonic()
+            # A copy: the pending partial may later be committed as final in place
+            await self.publish(key[0], dict(entry))
@@ -0,0 +1,113 @@
+"""
+Downscaled previews for the admin review UI.
+Previews are written next to their source (<sha256>_thumb.webp,
+<sha256>_preview.webp, ...) so they share the blob's lifetime and storage
+backend. Because blobs are content-addressed, the hash doubles as an ETag.
+"""
+import asyncio
+import cv2
+import numpy as np
+import os
+import logging
+from typing import Dict, List, Optional
+
+from fastapi import Request
+
+from config import settings
+from services.orientation import OrientationNormalizer
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MEDIA_TYPES = {
+    "webp": "image/webp",
+    "jpg": "image/jpeg",
+}
+
+
+class PreviewGenerator:
+    """Renders thumbnail and preview sizes of uploaded images"""
+
+    def __init__(self):
+        self.sizes = settings.PREVIEW_SIZES
+        self.quality = settings.PREVIEW_QUALITY
+        self.orientation = OrientationNormalizer()
+        # Fall back to JPEG on OpenCV builds without a WebP encoder
+        self.extension = "webp" if cv2.haveImageWriter(".webp") else "jpg"
+        self.media_type = PREVIEW_MEDIA_TYPES[self.extension]
+
+    def preview_path(self, source_path: str, size: str) -> str:
+        return f"{os.path.splitext(source_path)[0]}_{size}.{self.extension}"
+
+    def render(self, source_path: str) -> List[str]:
+        """Write every preview size of one image; decodes the source once"""
+        image, _ = self.orientation.load(source_path)
+        if image is None:
+            return []
+
+        written = []
+        # Largest size first so each smaller one is downscaled from the previous
+        for size, max_side in sorted(self.sizes.items(), key=lambda item: -item[1]):
+            image = self._fit(image, max_side)
+            path = self.preview_path(source_path, size)
+            if self._encode(path, image):
+                written.append(path)
+        return written
+
+    async def generate(self, *source_paths: Optional[str]):
+        """Background task: render and store previews for freshly uploaded images"""
+        for source_path in source_paths:
+            if not source_path:
+                continue
+            if all(os.path.exists(self.preview_path(source_path, size)) for size in self.sizes):
+                continue  # Deduplicated upload, previews already rendered
+            try:
+                local_path = await storage.ensure_local(source_path)
+                for path in await asyncio.to_thread(self.render, local_path):
+                    await storage.save(path, self.media_type)
+            except Exception as e:
+                logger.error(f"Preview generation failed for {source_path}: {e}")
+
+    async def get(self, source_path: str, size: str) -> Optional[str]:
+        """Local path of a preview, rendering it on demand if the background stage missed it"""
+        path = self.preview_path(source_path, size)
+        local_path = await self._fetch(path)
+        if local_path is None:
+            await self.generate(source_path)
+            local_path = await self._fetch(path)
+        return local_path
+
+    async def _fetch(self, path: str) -> Optional[str]:
+        try:
+            path = await storage.ensure_local(path)
+        except Exception:
+            return None
+        return path if os.path.exists(path) else None
+
+    def _fit(self, image: np.ndarray, max_side: int) -> np.ndarray:
+        height, width = image.shape[:2]
+        scale = max_side / max(height, width)
+        if scale >= 1.0:
+            return image
+        return cv2.resize(image, (int(round(width * scale)), int(round(height * scale))), interpolation=cv2.INTER_AREA)
+
+    def _encode(self, path: str, image: np.ndarray) -> bool:
+        quality_flag = cv2.IMWRITE_WEBP_QUALITY if self.extension == "webp" else cv2.IMWRITE_JPEG_QUALITY
+        if not cv2.imwrite(path, image, [quality_flag, self.quality]):
+            logger.error(f"Failed to write preview {path}")
+            return False
+        return True
+
+
+def cache_headers(etag: str, immutable: bool = True) -> Dict[str, str]:
+    """Long-lived caching for content-addressed previews, revalidation otherwise"""
+    cache_control = f"private, max-age={settings.PREVIEW_CACHE_MAX_AGE}, immutable" if immutable else "private, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """True when the client already holds this version (If-None-Match)"""
+    return etag in request.headers.get("if-none-match", "")
+
+# Global singleton instance
+preview_generator = PreviewGenerator()
@@ -0,0 +1,293 @@
+"""
+Pub/sub for transcript fan-out across uvicorn workers.
+The agent and the customer of one call may be connected to different
+workers; every transcript is published on the session's channel and each
+worker forwards it to its own WebSocket subscribers.
+
+Backends (PUBSUB_BACKEND):
+- "memory": in-process, for a single worker (the default)
+- "redis": Redis PUBLISH/SUBSCRIBE (or any server speaking the protocol)
+- "postgres": LISTEN/NOTIFY on the application database
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict, bool], Awaitable[None]]  # (message, from another worker)
+
+POSTGRES_CHANNEL_MAX = 63  # Identifier length limit for LISTEN
+POSTGRES_PAYLOAD_MAX = 7999  # NOTIFY payload limit (8000 bytes) minus a byte of headroom
+
+
+class PubSubBackend:
+    """
+    Channel-based publish/subscribe of JSON messages.
+    Messages published by this worker are delivered to its own handlers
+    directly; remote backends only carry them to the other workers.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: dict):
+        await self._dispatch(channel, message, remote=False)
+        await self._publish_remote(channel, json.dumps({"origin": self.worker_id, "message": message}))
+
+    async def subscribe(self, channel: str, handler: Handler):
+        handlers = self._handlers.setdefault(channel, [])
+        handlers.append(handler)
+        if len(handlers) == 1:
+            await self._listen(channel)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        handlers = self._handlers.get(channel)
+        if not handlers or handler not in handlers:
+            return
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[channel]
+            await self._unlisten(channel)
+
+    async def _dispatch(self, channel: str, message: dict, remote: bool):
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message, remote)
+            except Exception as e:
+                logger.error(f"Pub/sub handler error on {channel}: {e}")
+
+    async def _receive(self, channel: str, payload):
+        """Deliver a message from another worker"""
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Malformed pub/sub payload on {channel}")
+            return
+        if envelope.get("origin") != self.worker_id:
+            await self._dispatch(channel, envelope["message"], remote=True)
+
+    async def _publish_remote(self, channel: str, payload: str):
+        pass
+
+    async def _listen(self, channel: str):
+        pass
+
+    async def _unlisten(self, channel: str):
+        pass
+
+
+class InProcessPubSub(PubSubBackend):
+    """Single-worker deployments: local delivery only"""
+
+
+class RedisPubSub(PubSubBackend):
+    """Redis PUBLISH/SUBSCRIBE with one subscriber connection per worker"""
+
+    def __init__(self, url: str):
+        super().__init__()
+        if aioredis is None:
+            raise RuntimeError("PUBSUB_BACKEND=redis requires the 'redis' package")
+        self.url = url
+        self._client = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._client = aioredis.from_url(self.url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        logger.info(f"Redis pub/sub connected ({self.url})")
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+        if self._client:
+            await self._client.aclose()
+
+    async def _publish_remote(self, channel: str, payload: str):
+        try:
+            await self._client.publish(channel, payload)
+        except Exception as e:
+            logger.error(f"Redis publish to {channel} failed: {e}")
+
+    async def _listen(self, channel: str):
+        await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read_forever())
+
+    async def _unlisten(self, channel: str):
+        await self._pubsub.unsubscribe(channel)
+
+    async def _read_forever(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message and message["type"] == "message":
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    await self._receive(channel, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis pub/sub read error: {e} - resubscribing in 1s")
+                await asyncio.sleep(1)
+                try:
+                    if self._handlers:
+                        await self._pubsub.subscribe(*self._handlers)
+                except Exception as resubscribe_error:
+                    logger.error(f"Redis resubscribe failed: {resubscribe_error}")
+
+
+class PostgresPubSub(PubSubBackend):
+    """
+    LISTEN/NOTIFY on a dedicated asyncpg connection.
+    Channel names are capped at 63 characters (longer ones are hashed) and
+    payloads at 8000 bytes, which is ample for a transcript entry.
+    If the LISTEN connection drops, it is reopened and every channel is
+    listened to again; the NOTIFY connection is reopened on the next publish.
+    """
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        if asyncpg is None:
+            raise RuntimeError("PUBSUB_BACKEND=postgres requires the 'asyncpg' package")
+        self.dsn = dsn
+        self._listen_conn = None
+        self._notify_conn = None
+        self._notify_lock = asyncio.Lock()
+        self._callbacks: Dict[str, Callable] = {}
+        # Notifications are queued and dispatched by one task so they keep their order
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._reader: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        await self._connect_listener()
+        self._notify_conn = await asyncpg.connect(self.dsn)
+        self._reader = asyncio.create_task(self._read_forever())
+        logger.info("Postgres LISTEN/NOTIFY pub/sub connected")
+
+    async def stop(self):
+        self._stopping = True
+        for task in (self._reader, self._reconnect):
+            if task:
+                task.cancel()
+        self._reader = self._reconnect = None
+        for conn in (self._listen_conn, self._notify_conn):
+            if conn and not conn.is_closed():
+                await conn.close()
+
+    async def _connect_listener(self):
+        """Open the LISTEN connection and listen on every subscribed channel"""
+        conn = await asyncpg.connect(self.dsn)
+        conn.add_termination_listener(self._on_listener_terminated)
+        # Channels subscribed from here on go straight to the new connection
+        self._listen_conn = conn
+        for channel, callback in list(self._callbacks.items()):
+            await conn.add_listener(self.channel_name(channel), callback)
+
+    def _on_listener_terminated(self, connection):
+        if self._stopping or connection is not self._listen_conn:
+            return
+        logger.error("Postgres LISTEN connection lost - reconnecting")
+        if self._reconnect is None or self._reconnect.done():
+            self._reconnect = asyncio.create_task(self._relisten())
+
+    async def _relisten(self):
+        while True:
+            try:
+                await self._connect_listener()
+                logger.info(f"Postgres LISTEN reconnected ({len(self._callbacks)} channel(s))")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Postgres LISTEN reconnect failed: {e} - retrying in 1s")
+                await asyncio.sleep(1)
+
+    @staticmethod
+    def channel_name(channel: str) -> str:
+        if len(channel) <= POSTGRES_CHANNEL_MAX:
+            return channel
+        return "ch_" + hashlib.sha1(channel.encode()).hexdigest()
+
+    async def _publish_remote(self, channel: str, payload: str):
+        if len(payload.encode()) > POSTGRES_PAYLOAD_MAX:
+            logger.warning(f"Message on {channel} exceeds the NOTIFY payload limit; not sent to other workers")
+            return
+        try:
+            async with self._notify_lock:
+                if self._notify_conn.is_closed():
+                    self._notify_conn = await asyncpg.connect(self.dsn)
+                await self._notify_conn.execute("SELECT pg_notify($1, $2)", self.channel_name(channel), payload)
+        except Exception as e:
+            logger.error(f"Postgres NOTIFY on {channel} failed: {e}")
+
+    async def _listen(self, channel: str):
+        def callback(connection, pid, name, payload):
+            self._inbox.put_nowait((channel, payload))
+
+        self._callbacks[channel] = callback
+        try:
+            await self._listen_conn.add_listener(self.channel_name(channel), callback)
+        except Exception:
+            if not self._listen_conn.is_closed():
+                raise
+            # Connection lost: _relisten listens on the channel once reconnected
+
+    async def _unlisten(self, channel: str):
+        callback = self._callbacks.pop(channel, None)
+        if callback:
+            await self._listen_conn.remove_listener(self.channel_name(channel), callback)
+
+    async def _read_forever(self):
+        while True:
+            channel, payload = await self._inbox.get()
+            await self._receive(channel, payload)
+
+
+def postgres_dsn(database_url: str) -> str:
+    """asyncpg takes a plain postgresql:// URL, not the SQLAlchemy dialect form"""
+    return database_url.replace("postgresql+asyncpg://", "postgresql://", 1).replace("postgres://", "postgresql://", 1)
+
+
+def create_pubsub() -> PubSubBackend:
+    backend = settings.PUBSUB_BACKEND.lower()
+    if backend == "redis":
+        return RedisPubSub(settings.PUBSUB_URL or "redis://localhost:6379/0")
+    if backend == "postgres":
+        return PostgresPubSub(postgres_dsn(settings.PUBSUB_URL or settings.DATABASE_URL))
+    if backend != "memory":
+        raise ValueError(f"Unknown PUBSUB_BACKEND: {settings.PUBSUB_BACKEND}")
+    return InProcessPubSub()
+
+# Global singleton instance
+pubsub = create_pubsub()
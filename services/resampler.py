@@ -0,0 +1,189 @@
+"""
+Streaming polyphase resampler for 16-bit mono PCM.
+Replaces audioop.ratecv (deprecated, removed in Python 3.13) in the STT
+uplink. The anti-aliasing filter is a Kaiser-windowed sinc split into
+polyphase components; state carries across chunks so the output is identical
+to resampling the whole stream at once. The common integer ratio
+(48 kHz -> 16 kHz) runs as a single strided matrix-vector product over a
+preallocated buffer. Filtering is done in float64: in float32 the rounding of
+a sum depends on how many outputs a chunk yields, which made chunked output
+differ from one-shot output by an LSB.
+
+Run `python -m services.resampler` for a benchmark and an aliasing/accuracy
+comparison against audioop (when available).
+"""
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def design_lowpass(up: int, down: int, zero_crossings: int = 16, rolloff: float = 0.9, beta: float = 8.0) -> np.ndarray:
+    """Kaiser-windowed sinc at the upsampled rate, scaled by `up` to keep unity gain"""
+    factor = max(up, down)
+    cutoff = rolloff * 0.5 / factor  # Fraction of the upsampled rate
+    length = 2 * zero_crossings * factor + 1
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+    return taps * (up / taps.sum())
+
+
+class StreamingResampler:
+    """Stateful rational resampler; feed int16 PCM bytes, get int16 PCM bytes"""
+
+    def __init__(self, input_rate: int, output_rate: int = 16000, zero_crossings: int = 16, max_chunk: int = 8192):
+        divisor = math.gcd(input_rate, output_rate)
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self.passthrough = self.up == self.down
+
+        taps = design_lowpass(self.up, self.down, zero_crossings)
+        self.taps_per_phase = -(-len(taps) // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:len(taps)] = taps
+        # phases[p, m] multiplies x[i0 - m]; reversed so it lines up with an ascending window
+        self.phases = np.ascontiguousarray(
+            padded.reshape(self.taps_per_phase, self.up).T[:, ::-1], dtype=np.float64
+        )
+
+        # Input history: the first sample in the buffer has absolute index `self._start`.
+        # Starting at -(taps-1) zero-pads the beginning of the stream.
+        self._history = self.taps_per_phase - 1
+        self._buffer = np.zeros(self._history + max_chunk, dtype=np.float64)
+        self._length = self._history
+        self._start = -self._history
+        self._next = 0  # Upsampled-domain position of the next output sample
+        self._odd_byte = b""
+
+    def process(self, pcm: bytes) -> bytes:
+        """Resample one chunk; returns whatever output the new input completes"""
+        if self._odd_byte:
+            pcm = self._odd_byte + pcm
+            self._odd_byte = b""
+        if len(pcm) % 2:
+            pcm, self._odd_byte = pcm[:-1], pcm[-1:]
+        if self.passthrough or not pcm:
+            return pcm
+
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        self._append(samples)
+
+        # Outputs whose newest input sample (i0) has arrived
+        last_input = self._start + self._length - 1
+        available = (last_input + 1) * self.up - self._next
+        count = max(0, -(-available // self.down))
+        if count == 0:
+            return b""
+
+        if self.up == 1:
+            # Integer decimation: one filter over evenly strided windows of the
+            # preallocated buffer (a view, no copy), then a single BLAS product
+            first = self._next - (self.taps_per_phase - 1) - self._start
+            itemsize = self._buffer.itemsize
+            windows = np.ndarray(
+                (count, self.taps_per_phase), dtype=np.float64, buffer=self._buffer,
+                offset=first * itemsize, strides=(self.down * itemsize, itemsize)
+            )
+            output = np.dot(windows, self.phases[0])
+        else:
+            positions = self._next + self.down * np.arange(count)
+            offsets = positions // self.up - (self.taps_per_phase - 1) - self._start
+            windows = sliding_window_view(self._buffer[:self._length], self.taps_per_phase)
+            output = np.einsum("ij,ij->i", windows[offsets], self.phases[positions % self.up])
+
+        self._next += self.down * count
+        self._discard(self._next // self.up - (self.taps_per_phase - 1))
+        np.rint(output, out=output)
+        np.clip(output, -32768, 32767, out=output)
+        return output.astype(np.int16).tobytes()
+
+    def _append(self, samples: np.ndarray):
+        needed = self._length + len(samples)
+        if needed > len(self._buffer):
+            grown = np.zeros(max(needed, 2 * len(self._buffer)), dtype=np.float64)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+        self._buffer[self._length:needed] = samples
+        self._length = needed
+
+    def _discard(self, first_needed: int):
+        """Shift the buffer so it starts at the oldest sample still needed"""
+        drop = min(first_needed - self._start, self._length)
+        if drop <= 0:
+            return
+        remaining = self._length - drop
+        self._buffer[:remaining] = self._buffer[drop:self._length]
+        self._length = remaining
+        self._start += drop
+
+
+def _benchmark():
+    """Throughput and quality against audioop.ratecv on 48 kHz -> 16 kHz"""
+    import time
+    try:
+        import warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import audioop
+    except ImportError:
+        audioop = None
+
+    input_rate, output_rate, seconds, chunk = 48000, 16000, 10, 2048
+    t = np.arange(input_rate * seconds) / input_rate
+
+    def tone(frequency):
+        return (np.sin(2 * np.pi * frequency * t) * 12000).astype(np.int16).tobytes()
+
+    def run_ours(pcm):
+        resampler = StreamingResampler(input_rate, output_rate)
+        return b"".join(resampler.process(pcm[i:i + chunk * 2]) for i in range(0, len(pcm), chunk * 2))
+
+    def run_audioop(pcm):
+        state, out = None, []
+        for i in range(0, len(pcm), chunk * 2):
+            converted, state = audioop.ratecv(pcm[i:i + chunk * 2], 2, 1, input_rate, output_rate, state)
+            out.append(converted)
+        return b"".join(out)
+
+    def rms(pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+        samples = samples[len(samples) // 10:]  # Skip the filter start-up
+        return np.sqrt(np.mean(samples ** 2))
+
+    def passband_error(pcm, frequency):
+        """Residual after least-squares fitting a sine at `frequency` (any phase/delay)"""
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)[output_rate:]
+        n = np.arange(len(samples)) / output_rate
+        basis = np.stack([np.sin(2 * np.pi * frequency * n), np.cos(2 * np.pi * frequency * n)], axis=1)
+        fit, *_ = np.linalg.lstsq(basis, samples, rcond=None)
+        residual = samples - basis @ fit
+        return 20 * np.log10(np.sqrt(np.mean(residual ** 2)) / np.sqrt(np.mean(samples ** 2)))
+
+    implementations = [("numpy polyphase", run_ours)]
+    if audioop:
+        implementations.append(("audioop.ratecv", run_audioop))
+
+    speech = tone(440)
+    for name, implementation in implementations:
+        started = time.perf_counter()
+        implementation(speech)
+        elapsed = time.perf_counter() - started
+        print(f"{name:16s} {seconds / elapsed:8.0f}x realtime ({elapsed * 1000:.1f} ms for {seconds}s, {chunk}-sample chunks)")
+
+    print()
+    print("Passband accuracy (residual after sine fit, lower is better)")
+    for frequency in (440, 3000, 6500):
+        results = "  ".join(f"{name}: {passband_error(impl(tone(frequency)), frequency):6.1f} dB" for name, impl in implementations)
+        print(f"  {frequency:5d} Hz  {results}")
+
+    print("Aliasing (output level of tones above 8 kHz relative to input, lower is better)")
+    for frequency in (9000, 12000, 15000):
+        pcm = tone(frequency)
+        # Floor at -96 dB: below one 16-bit LSB the output is silent
+        results = "  ".join(f"{name}: {max(-96.0, 20 * np.log10(rms(impl(pcm)) / rms(pcm) + 1e-12)):6.1f} dB" for name, impl in implementations)
+        print(f"  {frequency:5d} Hz  {results}")
+
+
+if __name__ == "__main__":
+    _benchmark()
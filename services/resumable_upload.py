@@ -0,0 +1,218 @@
+"""
+Resumable uploads for documents and selfies.
+Clients create an upload with its total size, PUT chunks at byte offsets, ask
+for the current offset after a dropped connection and finalise once every
+byte has arrived. Finalising yields the same IngestedUpload as a direct
+upload, so blob storage, OCR and face matching run unchanged and only once.
+Partial files that stop receiving chunks expire after RESUMABLE_UPLOAD_TTL.
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.database import async_session_maker
+from database.models import ResumableUpload, UploadKind, DocumentType
+from services.upload_service import (
+    UploadRejected,
+    IngestedUpload,
+    sniff_content_type,
+    hash_file,
+    DOCUMENT_CONTENT_TYPES,
+    SELFIE_CONTENT_TYPES,
+    CONTENT_TYPE_EXTENSIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_CONTENT_TYPES = {
+    UploadKind.DOCUMENT: DOCUMENT_CONTENT_TYPES,
+    UploadKind.SELFIE: SELFIE_CONTENT_TYPES,
+}
+
+SNIFF_BYTES = 16
+
+
+class ResumableUploadService:
+    """Offset-based chunked uploads with expiry of abandoned partial files"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.join(settings.UPLOAD_DIR, "resumable")
+        self.ttl = timedelta(seconds=settings.RESUMABLE_UPLOAD_TTL)
+        self.sweep_interval = settings.RESUMABLE_UPLOAD_SWEEP_INTERVAL
+        self.max_size = settings.MAX_FILE_SIZE
+        self._locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    async def create(
+        self,
+        db: AsyncSession,
+        kyc_session_id: str,
+        kind: UploadKind,
+        size: int,
+        document_type: Optional[DocumentType] = None
+    ) -> ResumableUpload:
+        """Register an upload of `size` bytes; the caller commits the session"""
+        if size <= 0:
+            raise UploadRejected("Empty file")
+        if size > self.max_size:
+            raise UploadRejected("File too large")
+        if kind == UploadKind.DOCUMENT and document_type is None:
+            raise UploadRejected("document_type is required for document uploads")
+
+        upload = ResumableUpload(
+            kyc_session_id=kyc_session_id,
+            kind=kind,
+            document_type=document_type if kind == UploadKind.DOCUMENT else None,
+            size=size,
+            received=0,
+            expires_at=datetime.utcnow() + self.ttl
+        )
+        db.add(upload)
+        await db.flush()
+        async with aiofiles.open(self.part_path(upload.id), "wb"):
+            pass
+        return upload
+
+    async def write_chunk(
+        self,
+        db: AsyncSession,
+        upload: ResumableUpload,
+        offset: int,
+        chunks: AsyncIterator[bytes]
+    ) -> ResumableUpload:
+        """
+        Write a chunk starting at `offset`, which must equal the bytes already
+        received. Bytes that arrive before a dropped connection still count, so
+        the client resumes from wherever the server got to.
+        The caller commits the session, also when this raises.
+        """
+        if offset != upload.received:
+            raise UploadRejected(f"Offset mismatch, expected {upload.received}", status_code=409)
+
+        lock = self._locks.setdefault(upload.id, asyncio.Lock())
+        if lock.locked():
+            raise UploadRejected("Another chunk is being written", status_code=409)
+
+        async with lock:
+            received = upload.received
+            allowed_types = ALLOWED_CONTENT_TYPES[upload.kind]
+            try:
+                async with aiofiles.open(self.part_path(upload.id), "r+b") as out:
+                    head = b""
+                    if upload.content_type is None and received:
+                        head = await out.read(min(received, SNIFF_BYTES))
+                    # Anything past the acknowledged offset is from an interrupted write
+                    await out.seek(received)
+                    await out.truncate()
+
+                    async for chunk in chunks:
+                        if not chunk:
+                            continue
+                        if received + len(chunk) > upload.size:
+                            raise UploadRejected("Chunk exceeds declared size")
+
+                        # Reject the wrong file type as soon as the magic bytes are in
+                        if upload.content_type is None:
+                            head = (head + chunk)[:SNIFF_BYTES]
+                            if len(head) == SNIFF_BYTES or received + len(chunk) == upload.size:
+                                content_type = sniff_content_type(head)
+                                if content_type not in allowed_types:
+                                    await self.discard(db, upload)
+                                    raise UploadRejected("Invalid file type")
+                                upload.content_type = content_type
+
+                        await out.write(chunk)
+                        received += len(chunk)
+            finally:
+                upload.received = received
+                upload.expires_at = datetime.utcnow() + self.ttl
+                self._locks.pop(upload.id, None)
+
+        return upload
+
+    async def finalize(self, db: AsyncSession, upload: ResumableUpload, directory: str) -> IngestedUpload:
+        """
+        Verify the complete file and stage a copy in `directory` as an ingested
+        upload. The row is deleted in the caller's transaction; the partial file
+        stays until that commits (see remove_part), so a failed store can retry.
+        """
+        if upload.received != upload.size:
+            raise UploadRejected(f"Upload incomplete ({upload.received} of {upload.size} bytes)", status_code=409)
+        if upload.id in self._locks:
+            raise UploadRejected("Another chunk is being written", status_code=409)
+
+        part_path = self.part_path(upload.id)
+        sha256, size, content_type = await asyncio.to_thread(hash_file, part_path)
+        if size != upload.size or content_type not in ALLOWED_CONTENT_TYPES[upload.kind]:
+            await self.discard(db, upload)
+            raise UploadRejected("Upload is corrupt, please start again")
+
+        path = os.path.join(directory, f"{uuid.uuid4()}.{CONTENT_TYPE_EXTENSIONS[content_type]}")
+        try:
+            os.link(part_path, path)
+        except OSError:
+            # Different filesystem (or no hard links)
+            await asyncio.to_thread(shutil.copyfile, part_path, path)
+        await db.delete(upload)
+        return IngestedUpload(path, size, sha256, content_type)
+
+    def remove_part(self, upload_id: str):
+        """Delete a finalised upload's partial file once its deletion is committed"""
+        try:
+            os.remove(self.part_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    async def discard(self, db: AsyncSession, upload: ResumableUpload):
+        """Drop an upload and its partial file"""
+        try:
+            os.remove(self.part_path(upload.id))
+        except FileNotFoundError:
+            pass
+        await db.delete(upload)
+
+    async def expire(self, db: AsyncSession) -> int:
+        """Remove uploads whose last chunk is older than the TTL; returns how many"""
+        result = await db.execute(
+            select(ResumableUpload).where(ResumableUpload.expires_at < datetime.utcnow())
+        )
+        expired = result.scalars().all()
+        for upload in expired:
+            await self.discard(db, upload)
+
+        # Partial files left behind without a row (e.g. a failed create)
+        cutoff = time.time() - self.ttl.total_seconds()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        return len(expired)
+
+    async def sweep_forever(self):
+        """Background task started from the app lifespan"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                async with async_session_maker() as db:
+                    removed = await self.expire(db)
+                    await db.commit()
+                if removed:
+                    logger.info(f"Expired {removed} abandoned resumable uploads")
+            except Exception as e:
+                logger.error(f"Resumable upload sweep failed: {e}")
+
+# Global singleton instance
+resumable_uploads = ResumableUploadService()
@@ -0,0 +1,72 @@
+"""
+Reconnect policy helpers for upstream services.
+Exponential backoff with jitter spreads retries from many sessions out
+instead of having them hit a recovering endpoint in lockstep; the circuit
+breaker stops every session from retrying once the endpoint is clearly down,
+letting a single probe through after a cool-down.
+"""
+import random
+import time
+
+from services.metrics import metrics
+
+metrics.describe("circuit_breaker_open", "1 while a circuit breaker is open or half-open")
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Delay before retry number `attempt` (0-based): exponential, capped, with equal jitter"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Closed: attempts pass. After `threshold` consecutive failures it opens and
+    attempts wait out `reset_timeout`; then it is half-open and one probe is
+    allowed, whose result closes or re-opens it.
+    """
+
+    def __init__(self, name: str, threshold: int, reset_timeout: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def acquire(self) -> float:
+        """0 if an attempt may go ahead now, otherwise seconds to wait before asking again"""
+        state = self.state
+        if state == "closed":
+            return 0.0
+        if state == "open":
+            return self.reset_timeout - (time.monotonic() - self.opened_at)
+        if self._probing:
+            return 1.0
+        self._probing = True
+        return 0.0
+
+    def release(self):
+        """End an attempt that produced no verdict (cancelled), freeing the probe slot"""
+        self._probing = False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        metrics.set("circuit_breaker_open", 0, service=self.name)
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            metrics.set("circuit_breaker_open", 1, service=self.name)
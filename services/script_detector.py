@@ -0,0 +1,152 @@
+"""
+Fast script detection on a downscaled document.
+Picks the Tesseract traineddata for the document's actual script instead of
+loading every language at once:
+
+1. Tesseract OSD (the small osd.traineddata model) names the script.
+2. If OSD is unavailable or unsure, a quick pass with the OCR_LANGUAGES packs
+   reads some text and its characters vote by Unicode block.
+3. If neither is confident, OCR runs with all of OCR_LANGUAGES.
+"""
+import cv2
+import numpy as np
+from typing import Dict, Any, Optional
+import logging
+import unicodedata
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Unicode blocks of the scripts we map to a language pack, named as Tesseract OSD names them
+SCRIPT_BLOCKS = {
+    "Devanagari": (0x0900, 0x097F),
+    "Bengali": (0x0980, 0x09FF),
+    "Gurmukhi": (0x0A00, 0x0A7F),
+    "Gujarati": (0x0A80, 0x0AFF),
+    "Oriya": (0x0B00, 0x0B7F),
+    "Tamil": (0x0B80, 0x0BFF),
+    "Telugu": (0x0C00, 0x0C7F),
+    "Kannada": (0x0C80, 0x0CFF),
+    "Malayalam": (0x0D00, 0x0D7F),
+}
+
+
+def script_of(char: str) -> Optional[str]:
+    """Script of one letter, or None for digits, punctuation and unmapped scripts"""
+    code = ord(char)
+    for script, (first, last) in SCRIPT_BLOCKS.items():
+        if first <= code <= last:
+            return script
+    if char.isalpha() and unicodedata.name(char, "").startswith("LATIN"):
+        return "Latin"
+    return None
+
+
+def script_vote(text: str) -> Dict[str, int]:
+    """Letters per script in a piece of OCR output"""
+    votes: Dict[str, int] = {}
+    for char in text:
+        script = script_of(char)
+        if script:
+            votes[script] = votes.get(script, 0) + 1
+    return votes
+
+
+class ScriptDetector:
+    """Identifies the dominant script of a document and its Tesseract language"""
+
+    def __init__(self):
+        self.detect_width = settings.SCRIPT_DETECT_WIDTH
+        self.languages = settings.OCR_SCRIPT_LANGUAGES
+        self.default_language = settings.OCR_DEFAULT_LANGUAGE
+        self.fallback_languages = settings.OCR_LANGUAGES
+        self.min_osd_confidence = settings.OCR_OSD_MIN_CONFIDENCE
+        self.min_text_share = settings.OCR_SCRIPT_MIN_SHARE
+        self._installed: Optional[set] = None
+
+    def detect(self, gray: np.ndarray) -> Dict[str, Any]:
+        """Return the detected script, its Tesseract language, a confidence and how it was decided"""
+        if pytesseract is None:
+            return self._result(None, self.default_language, 0.0, "default")
+
+        scale = min(1.0, self.detect_width / gray.shape[1])
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+        # OSD confidence is Tesseract's score for the best script, not a probability
+        script, confidence = self._osd_script(small)
+        if script in self.languages and confidence >= self.min_osd_confidence:
+            language = self._language_for(script)
+            if language:
+                return self._result(script, language, confidence, "osd")
+
+        # Confidence here is the script's share of the letters read
+        script, confidence = self._text_script(small)
+        if script in self.languages and confidence >= self.min_text_share:
+            language = self._language_for(script)
+            if language:
+                return self._result(script, language, confidence, "text")
+
+        return self._result(script, self._fallback_language(), confidence, "fallback")
+
+    def _result(self, script: Optional[str], language: str, confidence: float, source: str) -> Dict[str, Any]:
+        return {
+            "script": script,
+            "language": language,
+            "confidence": round(float(confidence), 2),
+            "source": source
+        }
+
+    def _osd_script(self, gray: np.ndarray):
+        """(script, confidence) from Tesseract OSD, or (None, 0) if it cannot tell"""
+        try:
+            osd = pytesseract.image_to_osd(gray, output_type=pytesseract.Output.DICT)
+        except Exception as e:
+            # Missing osd.traineddata, or too few characters on the page
+            logger.debug(f"Script OSD failed: {e}")
+            return None, 0.0
+        return osd.get("script"), float(osd.get("script_conf", 0.0))
+
+    def _text_script(self, gray: np.ndarray):
+        """(script, share of letters) from a quick multi-pack OCR pass"""
+        languages = self._fallback_language()
+        try:
+            text = pytesseract.image_to_string(gray, lang=languages, config="--psm 3")
+        except Exception as e:
+            logger.warning(f"Script detection pass with {languages} failed: {e}")
+            return None, 0.0
+        votes = script_vote(text)
+        total = sum(votes.values())
+        if total == 0:
+            return None, 0.0
+        script = max(votes, key=votes.get)
+        return script, votes[script] / total
+
+    def _language_for(self, script: str) -> Optional[str]:
+        """The script's traineddata, if it is installed"""
+        language = self.languages[script]
+        installed = self._installed_languages()
+        if installed and language not in installed:
+            logger.warning(f"Tesseract language '{language}' for {script} script not installed")
+            return None
+        return language
+
+    def _fallback_language(self) -> str:
+        """The installed OCR_LANGUAGES packs, joined for a multi-language run"""
+        installed = self._installed_languages()
+        languages = [lang for lang in self.fallback_languages.split("+") if not installed or lang in installed]
+        return "+".join(languages) or self.default_language
+
+    def _installed_languages(self) -> set:
+        if self._installed is None:
+            try:
+                self._installed = set(pytesseract.get_languages(config="")) if pytesseract else set()
+            except Exception as e:
+                logger.warning(f"Could not list Tesseract languages: {e}")
+                self._installed = set()
+        return self._installed
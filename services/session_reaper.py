@@ -0,0 +1,117 @@
+"""
+Idle-session reaper and per-session memory accounting for transcription.
+end_session normally runs when the agent ends the video session; calls that
+are never ended that way (abandoned or crashed clients, sessions recreated by
+a late transcript) would otherwise stay in memory for the life of the worker.
+The reaper ends them through end_local_session, which writes the session
+file and the transcript_segments rows before dropping the in-memory state.
+A session with an audio stream running is never reaped, however long its
+silence. Every worker holding a session reaps its own copy: each pass
+announces the sessions streaming here, and the other workers count that as
+activity, so an agent watching a call whose user streams through another
+worker is not ended under them.
+
+Memory is estimated from the transcript entries each session holds; the
+lists are append-only, so each pass only sizes entries added since the last.
+"""
+import asyncio
+import logging
+import sys
+import time
+from typing import Dict, List
+
+from config import settings
+from services.metrics import metrics
+from services.transcription_service import TranscriptionService, transcription_service
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("transcription_sessions_active", "Transcription sessions held in memory")
+metrics.describe("transcription_memory_bytes", "Estimated memory held by all transcription sessions")
+metrics.describe("transcription_session_memory_bytes", "Estimated memory held by one transcription session")
+metrics.describe("transcription_session_transcripts", "Final transcripts held in memory for one session")
+metrics.describe("transcription_sessions_reaped_total", "Sessions ended by the reaper (idle: nothing attached, stale: only subscribers, no activity)")
+
+
+def entry_bytes(entry: dict) -> int:
+    """Approximate size of a transcript entry: the dict and its values (keys are shared)"""
+    return sys.getsizeof(entry) + sum(sys.getsizeof(value) for value in entry.values())
+
+
+class SessionReaper:
+    """Ends abandoned transcription sessions and publishes their memory use"""
+
+    def __init__(self, service: TranscriptionService, idle_ttl: float = None, max_idle: float = None):
+        self.service = service
+        self.idle_ttl = settings.SESSION_IDLE_TTL if idle_ttl is None else idle_ttl
+        self.max_idle = settings.SESSION_MAX_IDLE if max_idle is None else max_idle
+        self.interval = settings.SESSION_REAP_INTERVAL
+        self._accounted: Dict[str, List[int]] = {}  # session_id -> [entries sized, bytes]
+
+    def session_bytes(self, session_id: str) -> int:
+        """Estimated bytes held for a session, sizing only entries added since the last call"""
+        transcripts = self.service.active_sessions.get(session_id, [])
+        accounted = self._accounted.setdefault(session_id, [0, 0])
+        if len(transcripts) < accounted[0]:
+            accounted[:] = [0, 0]  # Replaced (e.g. recovered): start over
+        for entry in transcripts[accounted[0]:]:
+            accounted[1] += entry_bytes(entry)
+        accounted[0] = len(transcripts)
+
+        partials = self.service.pending_partials.get(session_id, {})
+        return accounted[1] + sum(entry_bytes(partial) for partial in partials.values())
+
+    async def reap(self) -> int:
+        """One pass: end idle and stale sessions, then refresh the memory metrics"""
+        now = time.monotonic()
+        reaped = 0
+        total = 0
+        for session_id in list(self.service.active_sessions):
+            idle = now - self.service.last_activity.get(session_id, now)
+            streaming = self.service.active_streams.get(session_id)
+            reason = None
+            if streaming:
+                # Audio still arriving (VAD may suppress it for long)
+                pass
+            elif not self.service.subscribers.get(session_id) and idle > self.idle_ttl:
+                reason = "idle"
+            elif idle > self.max_idle:
+                reason = "stale"
+
+            if reason:
+                logger.info(f"Reaping {reason} transcription session {session_id} (no activity for {idle:.0f}s)")
+                # Flushes the journal, session file and database rows, and clears its metrics
+                await self.service.end_local_session(session_id)
+                self._accounted.pop(session_id, None)
+                metrics.inc("transcription_sessions_reaped_total", reason=reason)
+                reaped += 1
+                continue
+
+            size = self.session_bytes(session_id)
+            total += size
+            metrics.set("transcription_session_memory_bytes", size, session=session_id)
+            metrics.set("transcription_session_transcripts", len(self.service.active_sessions[session_id]), session=session_id)
+
+        # Keeps the other workers' copies of sessions streaming here alive
+        await self.service.announce_streams()
+
+        # Sessions ended elsewhere since the last pass
+        for session_id in [session_id for session_id in self._accounted if session_id not in self.service.active_sessions]:
+            del self._accounted[session_id]
+        metrics.set("transcription_sessions_active", len(self.service.active_sessions))
+        metrics.set("transcription_memory_bytes", total)
+        return reaped
+
+    async def reap_forever(self):
+        """Background task started from the app lifespan"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                reaped = await self.reap()
+                if reaped:
+                    logger.info(f"Reaped {reaped} abandoned transcription sessions")
+            except Exception as e:
+                logger.error(f"Transcription session reap failed: {e}")
+
+# Global singleton instance
+session_reaper = SessionReaper(transcription_service)
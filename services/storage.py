@@ -0,0 +1,202 @@
+"""
+Object storage backends for uploads and recordings.
+Files are processed from local disk; the backend decides where the durable
+copy lives and how clients fetch it. `local` serves files through the app's
+static mounts, `s3` stores them in an S3-compatible bucket (AWS, MinIO, moto
+server via S3_ENDPOINT_URL) and hands out presigned GET URLs.
+
+Keys are the POSIX form of the path relative to the working directory
+(e.g. uploads/blobs/ab/cd/<sha256>.jpg, recordings/<name>.mp4), which is what
+the database already stores.
+"""
+import asyncio
+import glob
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional, Dict
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# URL prefix -> local directory served by main.py when the local backend is active
+LOCAL_MOUNTS: Dict[str, str] = {
+    "/uploads": settings.UPLOAD_DIR,
+    "/recordings": "recordings",
+}
+
+
+def storage_key(path: str) -> str:
+    """Storage key for a local path"""
+    return os.path.relpath(path).replace(os.sep, "/")
+
+
+class StorageBackend(ABC):
+    """Interface shared by the storage backends"""
+
+    is_local = False
+
+    @abstractmethod
+    async def save(self, path: str, content_type: Optional[str] = None):
+        """Make the local file at `path` durable under its storage key"""
+
+    @abstractmethod
+    async def ensure_local(self, path: str) -> str:
+        """Return `path`, fetching it back from storage if the local copy is gone"""
+
+    @abstractmethod
+    async def delete(self, path: str):
+        """Remove the stored object and any local copy"""
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str):
+        """Remove every object whose key starts with the key of `prefix`"""
+
+    @abstractmethod
+    def url(self, path: str, filename: Optional[str] = None) -> Optional[str]:
+        """URL a client can GET the file from"""
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files stay where they were written and are served by StaticFiles"""
+
+    is_local = True
+
+    async def save(self, path: str, content_type: Optional[str] = None):
+        pass
+
+    async def ensure_local(self, path: str) -> str:
+        return path
+
+    async def delete(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def delete_prefix(self, prefix: str):
+        for path in glob.glob(f"{glob.escape(prefix)}*"):
+            await self.delete(path)
+
+    def url(self, path: str, filename: Optional[str] = None) -> Optional[str]:
+        absolute = os.path.abspath(path)
+        for prefix, directory in LOCAL_MOUNTS.items():
+            relative = os.path.relpath(absolute, os.path.abspath(directory))
+            if not relative.startswith(".."):
+                return f"{prefix}/{relative.replace(os.sep, '/')}"
+        logger.warning(f"No static mount serves {path}")
+        return None
+
+
+class S3StorageBackend(StorageBackend):
+    """S3-compatible bucket with multipart uploads and presigned GET URLs"""
+
+    def __init__(self):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+        if not settings.S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = settings.S3_BUCKET
+        self.key_prefix = settings.S3_KEY_PREFIX
+        self.keep_local_copy = settings.STORAGE_KEEP_LOCAL_COPY
+        self.url_expiry = settings.STORAGE_URL_EXPIRY
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.AWS_REGION,
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            # Path-style addressing works with MinIO and other local stand-ins
+            config=BotoConfig(
+                signature_version="s3v4",
+                s3={"addressing_style": "path" if settings.S3_ENDPOINT_URL else "auto"}
+            )
+        )
+        # upload_file/download_file switch to multipart above the threshold
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=4
+        )
+
+    def _key(self, path: str) -> str:
+        return f"{self.key_prefix}{storage_key(path)}"
+
+    async def save(self, path: str, content_type: Optional[str] = None):
+        extra_args = {"ContentType": content_type} if content_type else None
+        await asyncio.to_thread(
+            self.client.upload_file,
+            path,
+            self.bucket,
+            self._key(path),
+            ExtraArgs=extra_args,
+            Config=self.transfer_config
+        )
+        if not self.keep_local_copy:
+            os.remove(path)
+
+    async def ensure_local(self, path: str) -> str:
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.download"
+        await asyncio.to_thread(
+            self.client.download_file,
+            self.bucket,
+            self._key(path),
+            temp_path,
+            Config=self.transfer_config
+        )
+        os.replace(temp_path, path)
+        return path
+
+    async def delete(self, path: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._key(path))
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def delete_prefix(self, prefix: str):
+        def delete_all():
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+                objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+                if objects:
+                    self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects})
+
+        await asyncio.to_thread(delete_all)
+        for path in glob.glob(f"{glob.escape(prefix)}*"):
+            os.remove(path)
+
+    def url(self, path: str, filename: Optional[str] = None) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(path)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        try:
+            return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.url_expiry)
+        except ClientError as e:
+            logger.error(f"Could not presign {path}: {e}")
+            return None
+
+
+def create_storage_backend() -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend()
+    if settings.STORAGE_BACKEND != "local":
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend()
+
+# Global singleton instance
+storage = create_storage_backend()
@@ -0,0 +1,48 @@
+"""
+Speech-to-text engine interface.
+TranscriptionService streams every speaker's audio through one engine,
+selected by STT_ENGINE: Sarvam (cloud streaming) or a local Whisper model.
+An engine consumes 16-bit mono PCM chunks from an async generator and
+reports through two callbacks:
+
+- on_transcript(text, is_partial, language, original)
+- on_utterance_end(): the speaker stopped talking, commit their partial
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from services.vad import VoiceActivityDetector
+
+
+class STTEngine(ABC):
+    """Base class for speech-to-text engines"""
+
+    name = "base"
+
+    @property
+    @abstractmethod
+    def available(self) -> bool:
+        """Whether the engine is configured well enough to accept streams"""
+
+    def prewarm(self, session_id: str, speaker: str, language_code: str = "auto"):
+        """Prepare for a speaker who is about to stream (optional)"""
+
+    async def discard_warm(self, session_id: str, speaker: str = None):
+        """Release whatever prewarm() prepared and nobody used (optional)"""
+
+    async def close(self):
+        """Release shared resources at shutdown (optional)"""
+
+    @abstractmethod
+    async def start_streaming_transcription(
+        self,
+        audio_generator,
+        on_transcript: Callable,
+        on_utterance_end: Callable,
+        language_code: str = "auto",
+        input_sample_rate: int = 48000,
+        session_id: str = None,
+        speaker: str = "User",
+        vad: Optional[VoiceActivityDetector] = None
+    ):
+        """Transcribe one speaker's stream until the generator is exhausted"""
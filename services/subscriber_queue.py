@@ -0,0 +1,160 @@
+"""
+Bounded per-subscriber send queues for transcript fan-out.
+Publishing only enqueues; each subscriber's WebSocket is written by its own
+drain task, so one slow client delays neither the other participants nor
+the upstream STT reader. On overflow a queued partial is dropped first (a
+newer partial or the final supersedes it anyway); finals are never dropped.
+A subscriber that falls too far behind is evicted instead.
+
+Subscribers that opt into deltas receive partials after the first of an
+utterance as {"type": "transcript_delta", "id", "keep", "append"}: the
+client keeps the first `keep` UTF-16 units of the text it last showed for
+that id and appends `append`. Deltas are computed against what this queue
+actually sent, so dropping superseded partials never breaks them.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("subscriber_dropped_total", "Partial transcripts dropped from subscriber queues")
+metrics.describe("subscriber_evictions_total", "Subscribers evicted for lagging or overflowing with finals")
+
+
+class SubscriberQueue:
+    """One subscriber: a bounded queue of transcript messages and its drain task"""
+
+    def __init__(
+        self,
+        session_id: str,
+        send: Callable[[dict], Awaitable[None]],
+        on_evict: Optional[Callable[[str], Awaitable[None]]] = None,
+        max_size: int = None,
+        max_lag: float = None,
+        deltas: bool = False
+    ):
+        self.session_id = session_id
+        self.send = send
+        self.on_evict = on_evict
+        self.max_size = max_size or settings.SUBSCRIBER_QUEUE_SIZE
+        self.max_lag = max_lag if max_lag is not None else settings.SUBSCRIBER_MAX_LAG
+        self.deltas = deltas
+        self.evicted = False
+        self._sent_partials: Dict[str, tuple] = {}  # speaker -> (id, text) of the last partial sent
+
+        # Entries are [message, enqueued_at, live]; superseded ones are marked dead in place
+        self._entries = deque()
+        self._live = 0
+        self._partials: Dict[str, list] = {}  # speaker -> queued partial entry
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+
+    def put(self, message: dict):
+        """Enqueue without blocking the publisher"""
+        if self.evicted:
+            return
+        now = time.monotonic()
+        if self._live and now - self._oldest_enqueued_at() > self.max_lag:
+            self._evict(f"lagging more than {self.max_lag:g}s")
+            return
+
+        speaker = message.get("speaker")
+        previous = self._partials.pop(speaker, None)
+        if previous is not None:
+            # A newer partial or the final replaces the queued partial
+            self._kill(previous)
+            metrics.inc("subscriber_dropped_total", reason="superseded")
+
+        if self._live >= self.max_size and not self._drop_oldest_partial():
+            self._evict("queue full of finals")
+            return
+
+        entry = [message, now, True]
+        self._entries.append(entry)
+        self._live += 1
+        if not message.get("is_final", True):
+            self._partials[speaker] = entry
+        self._wakeup.set()
+
+    async def close(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def _drain(self):
+        while True:
+            while not self._entries:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            message, _, live = entry = self._entries.popleft()
+            if not live:
+                continue
+            self._live -= 1
+            if self._partials.get(message.get("speaker")) is entry:
+                del self._partials[message.get("speaker")]
+            if self.deltas:
+                message = self._compact(message)
+            try:
+                await self.send(message)
+            except Exception as e:
+                logger.error(f"Error sending to subscriber of {self.session_id}: {e}")
+
+    def _compact(self, message: dict) -> dict:
+        """A partial as a delta against the previous partial sent for the same utterance"""
+        speaker = message.get("speaker")
+        previous = self._sent_partials.pop(speaker, None)
+        text = message.get("original_text") or ""
+        if message.get("is_final", True) or message.get("translated_text") != text:
+            return message
+        self._sent_partials[speaker] = (message["id"], text)
+        if previous is None or previous[0] != message["id"]:
+            return message
+
+        keep = len(os.path.commonprefix([previous[1], text]))
+        return {
+            "type": "transcript_delta",
+            "id": message["id"],
+            "session_id": message.get("session_id"),
+            "speaker": speaker,
+            "keep": len(text[:keep].encode("utf-16-le")) // 2,  # JavaScript string units
+            "append": text[keep:],
+            "timestamp": message.get("timestamp")
+        }
+
+    def _oldest_enqueued_at(self) -> float:
+        while not self._entries[0][2]:
+            self._entries.popleft()
+        return self._entries[0][1]
+
+    def _kill(self, entry: list):
+        entry[2] = False
+        self._live -= 1
+
+    def _drop_oldest_partial(self) -> bool:
+        for entry in self._entries:
+            if entry[2] and not entry[0].get("is_final", True):
+                self._partials.pop(entry[0].get("speaker"), None)
+                self._kill(entry)
+                metrics.inc("subscriber_dropped_total", reason="overflow")
+                return True
+        return False
+
+    def _evict(self, reason: str):
+        self.evicted = True
+        self._task.cancel()
+        self._entries.clear()
+        self._partials.clear()
+        self._live = 0
+        metrics.inc("subscriber_evictions_total")
+        logger.warning(f"Evicting subscriber of session {self.session_id}: {reason}")
+        if self.on_evict:
+            asyncio.create_task(self.on_evict(reason))
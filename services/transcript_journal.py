@@ -0,0 +1,206 @@
+"""
+Append-only transcript journal.
+Each live session appends one JSON line per final transcript (and metadata
+change) to transcription/<session>_<ts>.jsonl instead of rewriting the whole
+session file. At end_session the journal is compacted into the usual
+<session>_<ts>.json document; journals still on disk at startup belong to
+sessions that were in flight and are replayed.
+
+The worker writing a journal holds an exclusive flock on it, so with several
+workers sharing the directory only journals whose owner has exited (the lock
+dies with the process) are replayed, and each by exactly one worker.
+"""
+import asyncio
+import glob
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiofiles
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No flock (Windows): a single worker owns the directory
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def lock_journal(fd: int) -> bool:
+    """Take the journal's owner lock without waiting; False if another process holds it"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+class RecoveredSession:
+    """Session state rebuilt from a journal"""
+
+    def __init__(self, session_id: str, filename: str, metadata: dict, transcripts: List[dict]):
+        self.session_id = session_id
+        self.filename = filename
+        self.metadata = metadata
+        self.transcripts = transcripts
+
+
+class TranscriptJournal:
+    """Per-session JSONL journals with a configurable fsync policy"""
+
+    def __init__(self, directory: str, fsync_policy: str = None, fsync_interval: float = None):
+        self.directory = directory
+        self.fsync_policy = fsync_policy or settings.TRANSCRIPT_FSYNC_POLICY
+        self.fsync_interval = fsync_interval if fsync_interval is not None else settings.TRANSCRIPT_FSYNC_INTERVAL
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"TRANSCRIPT_FSYNC_POLICY must be one of {FSYNC_POLICIES}")
+        self._files = {}  # session_id -> open journal
+        self._pending_sync: Dict[str, asyncio.Task] = {}  # "interval" policy: one deferred fsync per session
+        os.makedirs(self.directory, exist_ok=True)
+
+    def journal_path(self, filename: str) -> str:
+        """The journal sits next to the final document: <name>.json -> <name>.jsonl"""
+        return f"{os.path.splitext(filename)[0]}.jsonl"
+
+    async def open(self, session_id: str, filename: str, metadata: dict):
+        """Start a journal with a header record"""
+        journal = await aiofiles.open(self.journal_path(filename), "a", encoding="utf-8")
+        lock_journal(journal.fileno())
+        self._files[session_id] = journal
+        await self._append(session_id, {
+            "type": "session",
+            "session_id": session_id,
+            "metadata": metadata,
+            "started_at": datetime.utcnow().isoformat()
+        })
+
+    async def resume(self, session_id: str, filename: str) -> bool:
+        """
+        Reopen the journal of a recovered session for further appends.
+        False if another worker adopted it first (both replayed it at startup).
+        """
+        journal = await aiofiles.open(self.journal_path(filename), "a", encoding="utf-8")
+        if not lock_journal(journal.fileno()):
+            await journal.close()
+            return False
+        self._files[session_id] = journal
+        return True
+
+    async def append_transcript(self, session_id: str, entry: dict):
+        await self._append(session_id, {"type": "transcript", "entry": entry})
+
+    async def append_metadata(self, session_id: str, metadata: dict):
+        await self._append(session_id, {"type": "metadata", "metadata": metadata})
+
+    async def compact(self, session_id: str, filename: str, transcripts: List[dict], metadata: dict):
+        """Write the final session document, then drop the journal"""
+        data = {
+            "session_id": session_id,
+            "metadata": metadata,
+            "transcripts": transcripts,
+            "saved_at": datetime.utcnow().isoformat()
+        }
+        temp_path = f"{filename}.{os.getpid()}.tmp"
+        async with aiofiles.open(temp_path, "w", encoding="utf-8") as f:
+            await f.write(json.dumps(data, indent=2))
+            await f.flush()
+            await asyncio.to_thread(os.fsync, f.fileno())
+        os.replace(temp_path, filename)
+
+        # Unlink while still holding the lock, so no other worker can adopt it in between
+        try:
+            os.remove(self.journal_path(filename))
+        except FileNotFoundError:
+            pass
+        await self.close(session_id)
+
+    async def close(self, session_id: str):
+        """Sync and close a journal (e.g. at shutdown); it is replayed on the next start"""
+        pending = self._pending_sync.pop(session_id, None)
+        if pending:
+            pending.cancel()
+        journal = self._files.pop(session_id, None)
+        if journal:
+            if self.fsync_policy != "never":
+                await asyncio.to_thread(os.fsync, journal.fileno())
+            await journal.close()
+
+    async def close_all(self):
+        for session_id in list(self._files):
+            await self.close(session_id)
+
+    def replay(self) -> List[RecoveredSession]:
+        """Rebuild every session whose journal was not compacted and has no live owner"""
+        recovered = []
+        for journal_path in sorted(glob.glob(os.path.join(self.directory, "*.jsonl"))):
+            session = self._replay_file(journal_path)
+            if session:
+                recovered.append(session)
+        return recovered
+
+    def _replay_file(self, journal_path: str) -> Optional[RecoveredSession]:
+        session_id = None
+        metadata = {}
+        transcripts = []
+        try:
+            f = open(journal_path, "r+b")
+        except FileNotFoundError:
+            return None  # Compacted meanwhile
+        with f:
+            if not lock_journal(f.fileno()):
+                # Still being written by a live worker
+                return None
+            intact = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash: cut it off so later appends start on a clean line
+                    logger.warning(f"Truncating damaged tail of {journal_path} at byte {intact}")
+                    f.truncate(intact)
+                    break
+                intact += len(line)
+
+                if record["type"] == "session":
+                    session_id = record["session_id"]
+                    metadata = record.get("metadata") or {}
+                elif record["type"] == "metadata":
+                    metadata.update(record["metadata"])
+                elif record["type"] == "transcript":
+                    transcripts.append(record["entry"])
+
+        if session_id is None:
+            logger.warning(f"Journal without header skipped: {journal_path}")
+            return None
+        filename = f"{os.path.splitext(journal_path)[0]}.json"
+        return RecoveredSession(session_id, filename, metadata, transcripts)
+
+    async def _append(self, session_id: str, record: dict):
+        journal = self._files.get(session_id)
+        if journal is None:
+            return
+        await journal.write(json.dumps(record) + "\n")
+        await journal.flush()
+
+        if self.fsync_policy == "always":
+            await asyncio.to_thread(os.fsync, journal.fileno())
+        elif self.fsync_policy == "interval" and session_id not in self._pending_sync:
+            # Bound the window of unsynced records without an fsync per line
+            self._pending_sync[session_id] = asyncio.create_task(self._sync_later(session_id))
+
+    async def _sync_later(self, session_id: str):
+        await asyncio.sleep(self.fsync_interval)
+        self._pending_sync.pop(session_id, None)
+        journal = self._files.get(session_id)
+        if journal:
+            await asyncio.to_thread(os.fsync, journal.fileno())
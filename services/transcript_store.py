@@ -0,0 +1,166 @@
+"""
+Database store for final transcripts.
+Finals are buffered in memory and bulk-inserted into transcript_segments by
+a background task every TRANSCRIPT_BATCH_INTERVAL_MS, or sooner once
+TRANSCRIPT_BATCH_SIZE rows are waiting, so a busy call costs one INSERT per
+batch rather than one per utterance. The session journal still covers the
+short window before a final reaches the database. At session end the plain
+text is also written to VideoSession.transcript.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database.database import async_session_maker
+from database.models import TranscriptSegment, VideoSession
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BUFFERED_ROWS = 50000  # Kept for retry while the database is unreachable
+
+metrics.describe("transcript_segments_written_total", "Final transcripts inserted into transcript_segments")
+metrics.describe("transcript_segment_batches_total", "Bulk inserts into transcript_segments")
+metrics.describe("transcript_segment_write_errors_total", "Failed transcript_segments batches (rows are retried)")
+
+
+def encode_cursor(segment: TranscriptSegment) -> str:
+    return f"{segment.spoken_at.isoformat()}_{segment.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    spoken_at, _, segment_id = cursor.rpartition("_")
+    return datetime.fromisoformat(spoken_at), int(segment_id)
+
+
+class TranscriptStore:
+    """Batches final transcripts into transcript_segments"""
+
+    def __init__(self, interval_ms: int = None, batch_size: int = None):
+        self.interval = (interval_ms or settings.TRANSCRIPT_BATCH_INTERVAL_MS) / 1000
+        self.batch_size = batch_size or settings.TRANSCRIPT_BATCH_SIZE
+        self._buffer: List[dict] = []
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def add(self, entry: dict):
+        """Queue a final transcript entry for the next batch"""
+        self._buffer.append({
+            "transcript_id": entry["id"],
+            "session_id": entry["session_id"],
+            "speaker": entry["speaker"],
+            "original_text": entry.get("original_text") or "",
+            "translated_text": entry.get("translated_text"),
+            "source_language": entry.get("source_language"),
+            "target_language": entry.get("target_language"),
+            "confidence": entry.get("confidence"),
+            "spoken_at": datetime.fromisoformat(entry["timestamp"]),
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write the remaining rows; the task is not cancelled mid-insert"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Insert everything buffered so far"""
+        async with self._lock:
+            while self._buffer:
+                rows, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+                try:
+                    async with async_session_maker() as db:
+                        await db.execute(insert(TranscriptSegment), rows)
+                        await db.commit()
+                except IntegrityError:
+                    # A segment already written (e.g. replayed after a crash): insert the rest one by one
+                    rows = await self._insert_new(rows)
+                except Exception as e:
+                    # Put the batch back (bounded) and retry on the next tick
+                    logger.error(f"Writing {len(rows)} transcript segments failed: {e}")
+                    metrics.inc("transcript_segment_write_errors_total")
+                    self._buffer = (rows + self._buffer)[-MAX_BUFFERED_ROWS:]
+                    return
+                metrics.inc("transcript_segment_batches_total")
+                metrics.inc("transcript_segments_written_total", len(rows))
+
+    async def _insert_new(self, rows: List[dict]) -> List[dict]:
+        written = []
+        async with async_session_maker() as db:
+            for row in rows:
+                try:
+                    await db.execute(insert(TranscriptSegment), [row])
+                    await db.commit()
+                    written.append(row)
+                except IntegrityError:
+                    await db.rollback()
+        return written
+
+    async def finish_session(self, session_id: str, transcripts: List[dict]):
+        """Flush the session's segments and store its plain-text transcript on the video session"""
+        await self.flush()
+        text = "\n".join(
+            f"[{entry.get('timestamp', '')[11:19]}] {entry.get('speaker')}: {entry.get('translated_text') or entry.get('original_text')}"
+            for entry in transcripts
+        )
+        try:
+            async with async_session_maker() as db:
+                await db.execute(
+                    update(VideoSession).where(VideoSession.kyc_session_id == session_id).values(transcript=text)
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Saving transcript text for {session_id} failed: {e}")
+
+    async def page(
+        self,
+        db: AsyncSession,
+        session_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        speaker: Optional[str] = None
+    ) -> Tuple[List[TranscriptSegment], Optional[str]]:
+        """One page of a session's segments in time order (keyset pagination on the index)"""
+        query = select(TranscriptSegment).where(TranscriptSegment.session_id == session_id)
+        if cursor:
+            query = query.where(tuple_(TranscriptSegment.spoken_at, TranscriptSegment.id) > decode_cursor(cursor))
+        if speaker:
+            query = query.where(TranscriptSegment.speaker == speaker)
+        query = query.order_by(TranscriptSegment.spoken_at, TranscriptSegment.id).limit(limit + 1)
+
+        segments = list((await db.execute(query)).scalars().all())
+        next_cursor = None
+        if len(segments) > limit:
+            segments = segments[:limit]
+            next_cursor = encode_cursor(segments[-1])
+        return segments, next_cursor
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+# Global singleton instance
+transcript_store = TranscriptStore()
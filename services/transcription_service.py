@@ -1,9 +1,10 @@
 """
 Transcription Service for real-time speech-to-text with translation
-Uses Sarvam AI for real-time transcription and translation to English
+Uses Sarvam AI for real-time transcription and translation to English, or a
+local Whisper model (STT_ENGINE=whisper)
 """
 import asyncio
-from typing import Optional, Dict, List, Callable
+from typing import Optional, Dict, List, Callable, Set
 from datetime import datetime
 import json
 import uuid
@@ -12,31 +13,187 @@ import aiofiles
 import logging
 import websockets
 import base64
-import audioop
+import time
+from collections import deque
 from config import settings
+from services.transcript_journal import TranscriptJournal
+from services.resampler import StreamingResampler
+from services.audio_framer import AudioFramer
+from services.vad import VoiceActivityDetector
+from services.retry import CircuitBreaker, backoff_delay
+from services.metrics import metrics
+from services.pubsub import pubsub
+from services.subscriber_queue import SubscriberQueue
+from services.partial_coalescer import PartialCoalescer
+from services.transcript_store import transcript_store
+from services.stt_engine import STTEngine
+from services.call_recorder import call_recorder
 
 logger = logging.getLogger(__name__)
 
 # Sarvam AI Configuration
 SARVAM_AVAILABLE = bool(settings.SARVAM_API_KEY)
 
-class SarvamService:
+# The envelope around each base64 frame never changes, so skip json.dumps per message
+_AUDIO_MESSAGE_PREFIX = '{"audio":{"data":"'
+_AUDIO_MESSAGE_SUFFIX = '","encoding":"audio/wav","sample_rate":16000}}'
+
+# Session lifecycle messages between workers (end_session, session_active)
+CONTROL_CHANNEL = "transcription:control"
+
+metrics.describe("stt_uplink_messages_total", "Audio messages sent to the STT provider")
+metrics.describe("stt_uplink_bytes_total", "Encoded audio bytes sent to the STT provider")
+metrics.describe("stt_uplink_cpu_seconds_total", "Event-loop CPU spent resampling, framing and encoding uplink audio")
+metrics.describe("stt_uplink_messages_per_second", "Average uplink message rate since the stream started")
+metrics.describe("stt_uplink_cpu_percent", "Average uplink CPU use of one core since the stream started")
+metrics.describe("stt_uplink_dropped_frames_total", "Audio frames dropped while the STT provider was unreachable")
+metrics.describe("stt_connect_seconds", "Time to open an STT provider connection")
+metrics.describe("stt_connect_failures_total", "Failed STT provider connection attempts")
+metrics.describe("stt_reconnects_total", "STT provider connections that dropped mid-stream and were reopened")
+metrics.describe("stt_prewarm_total", "Pre-warmed STT connections by outcome (used/expired/unused)")
+metrics.describe("stt_time_to_first_transcript_seconds", "From the first audio chunk of a stream to its first transcript")
+metrics.describe("vad_audio_seconds_total", "Uplink audio by voice-activity gate decision (forwarded/suppressed)")
+metrics.describe("vad_suppressed_ratio", "Fraction of uplink audio the voice-activity gate kept from the STT provider")
+
+
+def audio_message(frame) -> str:
+    """Sarvam streaming audio message for one 16 kHz PCM frame"""
+    return _AUDIO_MESSAGE_PREFIX + base64.b64encode(frame).decode("ascii") + _AUDIO_MESSAGE_SUFFIX
+
+
+class UplinkStats:
+    """Per-stream uplink counters, published to the metrics registry"""
+
+    def __init__(self, session_id: Optional[str], speaker: str):
+        self.labels = {"session": session_id or "unknown", "speaker": speaker}
+        self.started = time.monotonic()
+        self.messages = 0
+        self.cpu_seconds = 0.0
+
+    def add_cpu(self, seconds: float):
+        self.cpu_seconds += seconds
+        metrics.inc("stt_uplink_cpu_seconds_total", seconds, **self.labels)
+
+    def sent(self, message_bytes: int):
+        self.messages += 1
+        elapsed = max(time.monotonic() - self.started, 1e-3)
+        metrics.inc("stt_uplink_messages_total", **self.labels)
+        metrics.inc("stt_uplink_bytes_total", message_bytes, **self.labels)
+        metrics.set("stt_uplink_messages_per_second", self.messages / elapsed, **self.labels)
+        metrics.set("stt_uplink_cpu_percent", 100 * self.cpu_seconds / elapsed, **self.labels)
+
+    def gated(self, vad: VoiceActivityDetector, received_bytes: int, forwarded_bytes: int):
+        """Account 16 kHz audio seen by the voice-activity gate"""
+        if received_bytes:
+            metrics.inc("vad_audio_seconds_total", forwarded_bytes / 32000, state="forwarded", **self.labels)
+            metrics.inc("vad_audio_seconds_total", (received_bytes - forwarded_bytes) / 32000, state="suppressed", **self.labels)
+            metrics.set("vad_suppressed_ratio", vad.suppressed_ratio, **self.labels)
+
+class SarvamService(STTEngine):
     """Sarvam AI Services Wrapper for Streaming STT and Text Translation"""
     
+    name = "sarvam"
+    
     def __init__(self):
         self.api_key = settings.SARVAM_API_KEY
-        self.ws_url = "wss://api.sarvam.ai/speech-to-text-translate/ws"
+        self.ws_url = settings.SARVAM_WS_URL
+        # Shared by all streams: when Sarvam is down, sessions stop hammering it together
+        self.breaker = CircuitBreaker("sarvam", settings.STT_BREAKER_THRESHOLD, settings.STT_BREAKER_RESET)
+        self._warm: Dict[tuple, tuple] = {}  # (session_id, speaker) -> (language_code, created_at, connect task)
         
         if not SARVAM_AVAILABLE:
             logger.warning("Sarvam API Key not found. Real-time transcription disabled.")
 
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _url(self, language_code: str) -> str:
+        params = ["model=saaras:v2.5"]
+        
+        if language_code and language_code != "auto":
+            params.append(f"language-code={language_code}")
+        else:
+            params.append("language-code=unknown")
+        
+        return f"{self.ws_url}?{'&'.join(params)}"
+
+    async def _connect(self, language_code: str):
+        """Open an upstream connection, feeding the circuit breaker and connect metrics"""
+        started = time.monotonic()
+        try:
+            ws = await websockets.connect(
+                self._url(language_code),
+                subprotocols=[f"api-subscription-key.{self.api_key}"],
+                open_timeout=settings.STT_CONNECT_TIMEOUT
+            )
+        except Exception:
+            self.breaker.failure()
+            metrics.inc("stt_connect_failures_total")
+            raise
+        except BaseException:
+            # Cancelled mid-handshake (e.g. the client left during a half-open probe)
+            self.breaker.release()
+            raise
+        self.breaker.success()
+        metrics.observe("stt_connect_seconds", time.monotonic() - started)
+        return ws
+
+    def prewarm(self, session_id: str, speaker: str, language_code: str = "auto"):
+        """
+        Start connecting for a speaker who is about to stream, so the TLS
+        handshake and auth overlap with session setup instead of delaying
+        the first transcript
+        """
+        key = (session_id, speaker)
+        if not self.api_key or key in self._warm or self.breaker.state != "closed":
+            return
+        self._warm[key] = (language_code, time.monotonic(), asyncio.create_task(self._connect(language_code)))
+
+    async def _take_warm(self, session_id: str, speaker: str, language_code: str):
+        """The pre-warmed connection for this stream, if it is usable"""
+        warm = self._warm.pop((session_id, speaker), None)
+        if warm is None:
+            return None
+        warm_language, created_at, task = warm
+        if warm_language != language_code or time.monotonic() - created_at > settings.STT_PREWARM_TTL:
+            metrics.inc("stt_prewarm_total", result="expired")
+            await self._close_warm(task)
+            return None
+        try:
+            ws = await task  # Possibly still handshaking: the wait is only the remainder
+        except Exception as e:
+            logger.warning(f"Pre-warmed Sarvam connection failed: {e}")
+            return None
+        metrics.inc("stt_prewarm_total", result="used")
+        return ws
+
+    async def discard_warm(self, session_id: str, speaker: str = None):
+        """Close pre-warmed connections nobody streamed over"""
+        for key in [key for key in self._warm if key[0] == session_id and speaker in (None, key[1])]:
+            metrics.inc("stt_prewarm_total", result="unused")
+            await self._close_warm(self._warm.pop(key)[2])
+
+    @staticmethod
+    async def _close_warm(task: asyncio.Task):
+        if not task.done():
+            task.cancel()
+        try:
+            ws = await task
+            await ws.close()
+        except (asyncio.CancelledError, Exception):
+            pass
+
     async def start_streaming_transcription(
         self, 
         audio_generator, 
         on_transcript: Callable,
         on_utterance_end: Callable,
         language_code: str = "auto",
-        input_sample_rate: int = 48000
+        input_sample_rate: int = 48000,
+        session_id: str = None,
+        speaker: str = "User",
+        vad: Optional[VoiceActivityDetector] = None
     ):
         """
         Stream audio to Sarvam AI STT-Translate WebSocket.
@@ -47,139 +204,182 @@ class SarvamService:
             on_utterance_end: Async function() called when VAD detects end of speech
             language_code: Language code for transcription 
             input_sample_rate: Sample rate of input audio (browser is usually 48000)
+            session_id, speaker: Labels for the uplink metrics
+            vad: Optional voice-activity gate applied to the 16 kHz audio before framing
         """
         if not self.api_key:
             logger.error("Sarvam API Key not configured")
             raise RuntimeError("Sarvam API Key not initialized")
 
-        params = ["model=saaras:v2.5"]
-        
-        if language_code and language_code != "auto":
-            params.append(f"language-code={language_code}")
-        else:
-            params.append("language-code=unknown")
-        
-        url = f"{self.ws_url}?{'&'.join(params)}"
         logger.info(f"Connecting to Sarvam STT (lang={language_code}, rate={input_sample_rate})")
         
-        subprotocols = [f"api-subscription-key.{self.api_key}"]
-        
-        last_chunk = None
+        # Resampler and framer live for the whole stream: their state must survive reconnects
+        resampler = StreamingResampler(input_sample_rate, 16000)
+        framer = AudioFramer(16000)
+        unsent = deque()  # Encoded frames not yet acknowledged by ws.send
+        max_unsent = max(1, settings.STT_MAX_BUFFERED_MS // framer.frame_ms)
+        frames_ready = asyncio.Event()
+        stats = UplinkStats(session_id, speaker)
+        stream = {"done": False, "first_audio_at": None, "first_transcript": False}
 
-        # Reconnection loop
-        while True: 
+        def queue_frame(frame):
+            unsent.append(audio_message(frame))
+            if len(unsent) > max_unsent:
+                # Upstream unreachable for a while: late audio is worth less than fresh audio
+                unsent.popleft()
+                metrics.inc("stt_uplink_dropped_frames_total")
+
+        async def pump_audio():
+            # Reads the client's audio for the whole stream, independent of upstream
+            # connections, so a reconnect never cancels (and thereby closes) the generator
             try:
-                # Setup connection
-                async with websockets.connect(url, subprotocols=subprotocols) as ws:
-                    logger.info("Sarvam WebSocket connected")
+                async for chunk in audio_generator:
+                    if not chunk:
+                        continue
+                    if stream["first_audio_at"] is None:
+                        stream["first_audio_at"] = time.monotonic()
                     
-                    # Reset cancellation event for new connection
-                    stop_event = asyncio.Event()
-
-                    async def send_audio():
-                        nonlocal last_chunk
-                        state = None
-                        chunk_count = 0
-                        
-                        try:
-                            # If we have a leftover chunk from previous failed send, try sending it first
-                            if last_chunk:
-                                encoded = base64.b64encode(last_chunk).decode('utf-8')
-                                await ws.send(json.dumps({
-                                    "audio": {"data": encoded, "encoding": "audio/wav", "sample_rate": 16000}
-                                }))
-                                last_chunk = None
+                    # Resample, gate, frame and encode (CPU accounted per session)
+                    cpu_started = time.thread_time()
+                    audio = resampler.process(chunk)
+                    boundary = False
+                    if vad is not None:
+                        received = len(audio)
+                        audio, boundary = vad.process(audio)
+                        stats.gated(vad, received, len(audio))
+                    for frame in framer.push(audio):
+                        queue_frame(frame)
+                    if boundary:
+                        # End of a speech segment or keep-alive: don't hold the tail back
+                        frame = framer.flush()
+                        if frame is not None:
+                            queue_frame(frame)
+                    stats.add_cpu(time.thread_time() - cpu_started)
+                    frames_ready.set()
+                
+                # Stream finished: send the trailing partial frame
+                frame = framer.flush()
+                if frame is not None:
+                    queue_frame(frame)
+            finally:
+                stream["done"] = True
+                frames_ready.set()
+
+        async def send_audio(ws) -> bool:
+            """True once the whole stream has been sent, False if the connection dropped"""
+            try:
+                while True:
+                    frames_ready.clear()
+                    # Kept in `unsent` until sent, in case the connection drops
+                    while unsent:
+                        await ws.send(unsent[0])
+                        stats.sent(len(unsent.popleft()))
+                    if stream["done"]:
+                        return True
+                    await frames_ready.wait()
+            except websockets.exceptions.ConnectionClosed:
+                logger.warning("Sarvam connection closed during send")
+                return False
+            except Exception as e:
+                logger.error(f"Error sending audio: {e}")
+                return False
+
+        async def receive_results(ws):
+            try:
+                async for message in ws:
+                    data = json.loads(message)
+                    if data.get("type") == "data":
+                        result_data = data.get("data", {})
+                        transcript = result_data.get("transcript", "")
+                        if transcript and transcript.strip():
+                            is_final = result_data.get("is_final", False)
+                            detected_lang = result_data.get("language_code", "auto")
+                            original = result_data.get("original_transcript")
                             
-                            # Resume consuming the generator
-                            async for chunk in audio_generator:
-                                if stop_event.is_set():
-                                    break
-                                    
-                                if chunk and len(chunk) > 0:
-                                    last_chunk = chunk # Store in case send fails
-                                    
-                                    # Resample
-                                    if input_sample_rate != 16000:
-                                        try:
-                                            resampled, state = audioop.ratecv(
-                                                chunk, 2, 1, input_sample_rate, 16000, state
-                                            )
-                                            chunk = resampled
-                                        except Exception as e:
-                                            logger.error(f"Resample error: {e}")
-                                    
-                                    base64_audio = base64.b64encode(chunk).decode('utf-8')
-                                    await ws.send(json.dumps({
-                                        "audio": {"data": base64_audio, "encoding": "audio/wav", "sample_rate": 16000}
-                                    }))
-                                    last_chunk = None # Clear after successful send
-                                    chunk_count += 1
-                                    
-                            # If loop finishes naturally, we are done
-                            return True
-                                    
-                        except websockets.exceptions.ConnectionClosed:
-                            logger.warn("Sarvam connection closed during send")
-                            return False # Need reconnect
-                        except Exception as e:
-                            logger.error(f"Error sending audio: {e}")
-                            return False # Need reconnect
-                        finally:
-                            # Signal receiver to stop
-                            stop_event.set()
-
-                    async def receive_results():
-                        try:
-                            async for message in ws:
-                                data = json.loads(message)
-                                if data.get("type") == "data":
-                                    result_data = data.get("data", {})
-                                    transcript = result_data.get("transcript", "")
-                                    if transcript and transcript.strip():
-                                        is_final = result_data.get("is_final", False)
-                                        detected_lang = result_data.get("language_code", "auto")
-                                        original = result_data.get("original_transcript")
-                                        
-                                        logger.info(f"Sarvam: '{transcript[:60]}' (final={is_final})")
-                                        await on_transcript(transcript, not is_final, detected_lang, original)
-                                
-                                elif data.get("type") == "events":
-                                    signal = data.get("data", {}).get("signal_type", "")
-                                    if "end" in signal.lower():
-                                        await on_utterance_end()
-
-                        except Exception as e:
-                            logger.debug(f"Sarvam receiver closed: {e}")
-                        finally:
-                            stop_event.set()
-
-                    # Run concurrently
-                    send_task = asyncio.create_task(send_audio())
-                    recv_task = asyncio.create_task(receive_results())
-                    
-                    done, pending = await asyncio.wait(
-                        [send_task, recv_task], 
-                        return_when=asyncio.FIRST_COMPLETED
-                    )
-                    
-                    # If send_audio finished ensuring complete stream consumption
-                    if send_task in done:
-                        result = send_task.result()
-                        if result: # Generator exhausted successfully
-                            logger.info("Audio stream finished normally")
-                            for task in pending: task.cancel()
-                            return # Exit the main loop completely
+                            if not stream["first_transcript"] and stream["first_audio_at"] is not None:
+                                stream["first_transcript"] = True
+                                metrics.observe("stt_time_to_first_transcript_seconds", time.monotonic() - stream["first_audio_at"])
+                            
+                            logger.info(f"Sarvam: '{transcript[:60]}' (final={is_final})")
+                            await on_transcript(transcript, not is_final, detected_lang, original)
                     
-                    # If we are here, it means either recv failed or send failed (connection drop)
-                    # Cancel pending tasks and Loop to reconnect
-                    for task in pending: task.cancel()
-            
-            except asyncio.CancelledError:
-                logger.info("Streaming cancelled by client")
-                return
+                    elif data.get("type") == "events":
+                        signal = data.get("data", {}).get("signal_type", "")
+                        if "end" in signal.lower():
+                            await on_utterance_end()
+
             except Exception as e:
-                logger.error(f"Sarvam connect error: {e} - Retrying in 1s...")
-                await asyncio.sleep(1)
+                logger.debug(f"Sarvam receiver closed: {e}")
+
+        pump_task = asyncio.create_task(pump_audio())
+        attempt = 0
+        ws = await self._take_warm(session_id, speaker, language_code)
+        try:
+            # Reconnection loop
+            while True:
+                if ws is None:
+                    wait = self.breaker.acquire()
+                    if wait > 0:
+                        if stream["done"] and not unsent:
+                            return
+                        await asyncio.sleep(wait)
+                        continue
+                    try:
+                        ws = await self._connect(language_code)
+                    except Exception as e:
+                        if stream["done"]:
+                            logger.error(f"Sarvam unreachable after the stream ended, dropping {len(unsent)} frames: {e}")
+                            return
+                        delay = backoff_delay(attempt, settings.STT_RECONNECT_BASE, settings.STT_RECONNECT_MAX)
+                        attempt += 1
+                        logger.error(f"Sarvam connect error: {e} - retrying in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                        continue
+                
+                logger.info("Sarvam WebSocket connected")
+                connected_at = time.monotonic()
+                send_task = asyncio.create_task(send_audio(ws))
+                recv_task = asyncio.create_task(receive_results(ws))
+                try:
+                    done, _ = await asyncio.wait([send_task, recv_task], return_when=asyncio.FIRST_COMPLETED)
+                    
+                    # Whole stream sent: we are done
+                    if send_task in done and send_task.result():
+                        logger.info("Audio stream finished normally")
+                        return
+                finally:
+                    send_task.cancel()
+                    recv_task.cancel()
+                    await ws.close()
+                    ws = None
+                
+                # Connection dropped: reconnect, backing off unless it had been stable
+                metrics.inc("stt_reconnects_total")
+                if time.monotonic() - connected_at > settings.STT_RECONNECT_MAX:
+                    attempt = 0
+                delay = backoff_delay(attempt, settings.STT_RECONNECT_BASE, settings.STT_RECONNECT_MAX)
+                attempt += 1
+                logger.warning(f"Sarvam connection dropped - reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        
+        except asyncio.CancelledError:
+            logger.info("Streaming cancelled by client")
+            raise
+        finally:
+            pump_task.cancel()
+            if ws is not None:
+                await ws.close()
+
+
+def create_stt_engine() -> STTEngine:
+    """Engine selected by STT_ENGINE"""
+    engine = settings.STT_ENGINE.lower()
+    if engine == "whisper":
+        from services.whisper_engine import WhisperEngine
+        return WhisperEngine()
+    if engine != "sarvam":
+        raise ValueError(f"Unknown STT_ENGINE: {settings.STT_ENGINE}")
+    return SarvamService()
 
 
 class TranscriptionService:
@@ -187,27 +387,43 @@ class TranscriptionService:
     
     def __init__(self):
         self.active_sessions: Dict[str, List[dict]] = {}
-        self.subscribers: Dict[str, List[Callable]] = {}
+        self.subscribers: Dict[str, List[SubscriberQueue]] = {}
         self.session_metadata: Dict[str, dict] = {} 
         self.default_target_language = "en"
-        self.sarvam_service = None
+        self.stt_engine: Optional[STTEngine] = None
         self.transcription_dir = "transcription"
         self.pending_partials: Dict[str, Dict[str, dict]] = {}  # session_id -> {speaker: last_partial}
         self.session_files: Dict[str, str] = {} # session_id -> filename
+        self.last_activity: Dict[str, float] = {}  # session_id -> monotonic time, for the reaper
+        self.active_streams: Dict[str, int] = {}  # session_id -> audio streams running
+        self.listening: Set[str] = set()  # Sessions whose pub/sub channel this worker is subscribed to
         
         # Create transcription directory
         if not os.path.exists(self.transcription_dir):
             os.makedirs(self.transcription_dir)
         
-        # Initialize Sarvam service
-        self.sarvam_service = SarvamService()
-        logger.info(f"TranscriptionService initialized - Sarvam Available: {SARVAM_AVAILABLE}")
+        # Final transcripts are appended to a per-session journal, compacted at end_session
+        self.journal = TranscriptJournal(self.transcription_dir)
+        
+        # Partials are published at a bounded rate per speaker; finals immediately
+        self.partial_coalescer = PartialCoalescer(self._notify_subscribers)
+        
+        # Initialize the speech-to-text engine
+        self.stt_engine = create_stt_engine()
+        logger.info(f"TranscriptionService initialized - STT engine: {self.stt_engine.name} (available: {self.stt_engine.available})")
     
-    async def start_session(self, session_id: str, metadata: dict = None) -> bool:
-        """Initialize a new transcription session"""
+    async def start_session(self, session_id: str, metadata: dict = None, speaker: str = None) -> bool:
+        """
+        Initialize a new transcription session.
+        With `speaker`, that speaker's upstream STT connection starts opening now.
+        """
+        if speaker and settings.STT_PREWARM and self.stt_engine:
+            self.stt_engine.prewarm(session_id, speaker)
+        
         if session_id not in self.active_sessions:
             self.active_sessions[session_id] = []
-            self.subscribers[session_id] = []
+            self.touch(session_id)
+            self.subscribers.setdefault(session_id, [])
             self.session_metadata[session_id] = metadata or {}
             self.pending_partials[session_id] = {}
             
@@ -215,36 +431,113 @@ class TranscriptionService:
             timestamp = int(datetime.utcnow().timestamp())
             filename = f"{self.transcription_dir}/{session_id}_{timestamp}.json"
             self.session_files[session_id] = filename
+            await self.journal.open(session_id, filename, self.session_metadata[session_id])
             
             logger.info(f"Transcription session started: {session_id} (File: {filename})")
             return True
+        self.touch(session_id)
         return False
     
+    async def recover_sessions(self) -> int:
+        """Replay journals left by sessions that were in flight when the process stopped"""
+        recovered = 0
+        for session in await asyncio.to_thread(self.journal.replay):
+            if session.session_id in self.active_sessions:
+                continue
+            if not await self.journal.resume(session.session_id, session.filename):
+                logger.info(f"Transcription session {session.session_id} was recovered by another worker")
+                continue
+            self.active_sessions[session.session_id] = session.transcripts
+            self.subscribers.setdefault(session.session_id, [])
+            self.session_metadata[session.session_id] = session.metadata
+            self.pending_partials[session.session_id] = {}
+            self.session_files[session.session_id] = session.filename
+            self.touch(session.session_id)
+            # Rows still batched in memory at the crash never reached transcript_segments;
+            # finals already written are skipped by their unique transcript_id
+            for entry in session.transcripts:
+                transcript_store.add(entry)
+            logger.info(f"Recovered transcription session {session.session_id} ({len(session.transcripts)} transcripts)")
+            recovered += 1
+        return recovered
+    
+    async def shutdown(self):
+        """Flush open journals; unfinished sessions are recovered on the next start"""
+        await self.journal.close_all()
+        await self.stt_engine.close()
+    
+    async def start(self):
+        """Listen for session control messages from the other workers"""
+        await pubsub.subscribe(CONTROL_CHANNEL, self._on_control_message)
+
     async def end_session(self, session_id: str) -> Optional[List[dict]]:
-        """End a transcription session, save to file, and return transcripts"""
+        """
+        End a transcription session on every worker.
+        Each worker holding the session (its speakers' streams, its subscribers)
+        finalises its own copy; returns this worker's transcripts, if it had any.
+        """
+        transcripts = await self.end_local_session(session_id)
+        await pubsub.publish(CONTROL_CHANNEL, {"type": "end_session", "session_id": session_id})
+        return transcripts
+
+    async def end_local_session(self, session_id: str) -> Optional[List[dict]]:
+        """End this worker's copy of a session, save to file, and return transcripts"""
         if session_id in self.active_sessions:
             # Commit any pending partials as final entries
             await self._commit_all_partials(session_id)
+            self.partial_coalescer.end_session(session_id)
+            await self.stt_engine.discard_warm(session_id)
+            await call_recorder.finish(session_id)
 
             # Retrieve data before popping
             transcripts = self.active_sessions.get(session_id, [])
             metadata = self.session_metadata.get(session_id, {})
             
-            # Final save
+            # Compact the journal into the final session document
             await self._save_transcription_to_file(session_id, transcripts, metadata)
+            await transcript_store.finish_session(session_id, transcripts)
             
             # Clean up
             self.active_sessions.pop(session_id, None)
-            self.subscribers.pop(session_id, None)
+            queues = self.subscribers.pop(session_id, None)
+            if session_id in self.listening:
+                self.listening.discard(session_id)
+                await pubsub.unsubscribe(self.channel(session_id), self._on_channel_message)
+            for queue in queues or ():
+                await queue.close()
             metadata = self.session_metadata.pop(session_id, None)
             self.pending_partials.pop(session_id, None)
             self.session_files.pop(session_id, None)
+            self.last_activity.pop(session_id, None)
+            metrics.remove(session=session_id)
             
             logger.info(f"Session ended: {session_id} ({len(transcripts)} transcripts saved)")
             return transcripts
-        logger.warning(f"Session {session_id} not found for ending")
+        logger.debug(f"Session {session_id} not held by this worker")
         return None
+
+    async def announce_streams(self):
+        """Tell the other workers which sessions are streaming audio here"""
+        streaming = [session_id for session_id, count in self.active_streams.items() if count]
+        if streaming:
+            await pubsub.publish(CONTROL_CHANNEL, {"type": "session_active", "session_ids": streaming})
+
+    async def _on_control_message(self, message: dict, remote: bool):
+        """Session lifecycle messages published by another worker"""
+        if not remote:
+            return
+        if message.get("type") == "end_session":
+            await self.end_local_session(message.get("session_id"))
+        elif message.get("type") == "session_active":
+            # A speaker streams through that worker: this worker's copy is not abandoned
+            for session_id in message.get("session_ids", ()):
+                self.touch(session_id)
     
+    def touch(self, session_id: str):
+        """Record activity on a session; the reaper ends sessions that go quiet"""
+        if session_id in self.active_sessions:
+            self.last_activity[session_id] = time.monotonic()
+
     async def _commit_all_partials(self, session_id: str):
         """Commit all pending partials as final transcripts"""
         pending = self.pending_partials.get(session_id, {})
@@ -252,6 +545,7 @@ class TranscriptionService:
             if partial:
                 partial["is_final"] = True
                 self.active_sessions[session_id].append(partial)
+                await self._persist_final(session_id, partial)
                 logger.info(f"Committed partial for {speaker}: '{partial.get('original_text', '')[:50]}'")
         # Clear all partials for this session
         if session_id in self.pending_partials:
@@ -274,41 +568,32 @@ class TranscriptionService:
             
             logger.info(f"[VAD] Committed utterance for {speaker}: '{partial['original_text'][:60]}'")
             
+            # Journal before broadcasting so an acknowledged final is never lost
+            await self._persist_final(session_id, partial)
+            
             # Broadcast final version
+            self.partial_coalescer.final(session_id, speaker)
             await self._notify_subscribers(session_id, partial)
-            
-            # IMMEDIATE SAVE to prevent data loss
-            await self._save_transcription_to_file(session_id)
 
 
-    async def _save_transcription_to_file(self, session_id: str, transcripts: List[dict] = None, metadata: dict = None):
-        """Save transcripts to a JSON file. If args not provided, fetches current state."""
+    async def _persist_final(self, session_id: str, entry: dict):
+        """
+        Append-only journal (O(1) I/O per final, crash-safe right away) plus
+        the batched transcript_segments insert that admins query
+        """
+        await self.journal.append_transcript(session_id, entry)
+        transcript_store.add(entry)
+
+    async def _save_transcription_to_file(self, session_id: str, transcripts: List[dict], metadata: dict):
+        """Write the final JSON document for a session and remove its journal"""
         try:
-            # Determine filename
             filename = self.session_files.get(session_id)
             if not filename:
                 # Fallback if somehow missing
                 timestamp = int(datetime.utcnow().timestamp())
                 filename = f"{self.transcription_dir}/{session_id}_{timestamp}.json"
-                self.session_files[session_id] = filename
-
-            # Fetch data if not provided (Incremental Save Mode)
-            if transcripts is None:
-                transcripts = self.active_sessions.get(session_id, [])
-            if metadata is None:
-                metadata = self.session_metadata.get(session_id, {})
-
-            data = {
-                "session_id": session_id,
-                "metadata": metadata,
-                "transcripts": transcripts,
-                "saved_at": datetime.utcnow().isoformat()
-            }
-            
-            async with aiofiles.open(filename, "w") as f:
-                await f.write(json.dumps(data, indent=2))
-                
-            # logger.debug(f"Transcription incrementally saved to {filename}")
+
+            await self.journal.compact(session_id, filename, transcripts, metadata)
         except Exception as e:
             logger.error(f"Error saving transcription file: {e}", exc_info=True)
 
@@ -337,10 +622,12 @@ class TranscriptionService:
         # Auto-create session if it doesn't exist
         if session_id not in self.active_sessions:
             await self.start_session(session_id, metadata)
+        self.touch(session_id)
         
         # Metadata update
         if metadata and session_id in self.session_metadata:
             self.session_metadata[session_id].update(metadata)
+            await self.journal.append_metadata(session_id, metadata)
         
         # Handle translation status
         translated_text = text
@@ -372,15 +659,22 @@ class TranscriptionService:
             
             self.active_sessions[session_id].append(transcript_entry)
             
-            # IMMEDIATE SAVE
-            await self._save_transcription_to_file(session_id)
+            await self._persist_final(session_id, transcript_entry)
         else:
-            # Partial: update in pending_partials (overwrite previous partial for this speaker)
+            # Partial: update in pending_partials (overwrite previous partial for this speaker).
+            # Partials of one utterance share an id, so clients can apply deltas to it
             if session_id in self.pending_partials:
+                previous = self.pending_partials[session_id].get(speaker)
+                if previous:
+                    transcript_entry["id"] = previous["id"]
                 self.pending_partials[session_id][speaker] = transcript_entry
         
-        # Broadcast to UI (both partials and finals)
-        await self._notify_subscribers(session_id, transcript_entry)
+        # Broadcast to UI: finals at once, partials through the rate limiter
+        if is_final:
+            self.partial_coalescer.final(session_id, speaker)
+            await self._notify_subscribers(session_id, transcript_entry)
+        else:
+            await self.partial_coalescer.partial(session_id, transcript_entry)
         
         return transcript_entry
     
@@ -396,9 +690,9 @@ class TranscriptionService:
         Process audio stream from a generator (e.g., WebSocket).
         Audio is PCM format at 48kHz from browser.
         """
-        if not self.sarvam_service:
-            logger.error("Sarvam service not available")
-            raise RuntimeError("Sarvam service not initialized")
+        if not self.stt_engine:
+            logger.error("STT engine not available")
+            raise RuntimeError("STT engine not initialized")
         
         # Ensure session exists
         if session_id not in self.active_sessions:
@@ -407,9 +701,18 @@ class TranscriptionService:
         logger.info(f"Starting audio processing for {speaker} in session {session_id}")
         
         language_code = source_language if source_language else "auto"
+        vad = VoiceActivityDetector(16000) if settings.VAD_ENABLED else None
+        # A session with a running stream is never idle, however long the silence
+        self.active_streams[session_id] = self.active_streams.get(session_id, 0) + 1
+
+        if call_recorder.enabled:
+            # Resample once here so the recording and the engine share the 16 kHz stream
+            await call_recorder.open(session_id, speaker)
+            audio_generator = self._tee_recording(session_id, speaker, audio_generator, input_sample_rate)
+            input_sample_rate = 16000
         
         async def handle_transcript(text: str, is_partial: bool, detected_lang: str = "auto", original: str = None):
-            """Callback for handling transcribed text from Sarvam"""
+            """Callback for handling transcribed text from the STT engine"""
             if not text or not text.strip():
                 return
             
@@ -432,41 +735,125 @@ class TranscriptionService:
         
         # Start streaming transcription
         try:
-            await self.sarvam_service.start_streaming_transcription(
+            await self.stt_engine.start_streaming_transcription(
                 audio_generator, 
                 on_transcript=handle_transcript,
                 on_utterance_end=handle_utterance_end,
                 language_code=language_code,
-                input_sample_rate=input_sample_rate
+                input_sample_rate=input_sample_rate,
+                session_id=session_id,
+                speaker=speaker,
+                vad=vad
             )
             logger.info(f"Audio stream completed for {speaker} in session {session_id}")
         except asyncio.CancelledError:
             logger.info(f"Audio stream cancelled for {speaker} in session {session_id}")
+            raise
         except Exception as e:
             logger.error(f"Audio stream error for {speaker}: {e}")
+        finally:
+            streams = self.active_streams.pop(session_id, 1) - 1
+            if streams > 0:
+                self.active_streams[session_id] = streams
+            self.touch(session_id)
+            await self.stt_engine.discard_warm(session_id, speaker)
+            if vad is not None and vad.frames_total:
+                logger.info(f"VAD suppressed {vad.suppressed_ratio:.0%} of {speaker} audio in session {session_id}")
+
+    @staticmethod
+    async def _tee_recording(session_id: str, speaker: str, audio_generator, input_sample_rate: int):
+        """16 kHz PCM from the uplink, copied into the session's call recording"""
+        resampler = StreamingResampler(input_sample_rate, 16000)
+        async for chunk in audio_generator:
+            pcm = resampler.process(chunk)
+            if pcm:
+                call_recorder.write(session_id, speaker, pcm)
+                yield pcm
+
+    @staticmethod
+    def channel(session_id: str) -> str:
+        return f"transcripts:{session_id}"
 
     async def _notify_subscribers(self, session_id: str, transcript: dict):
-        """Notify all subscribers of a new transcript"""
-        if session_id in self.subscribers:
-            for callback in self.subscribers[session_id]:
-                try:
-                    await callback(transcript)
-                except Exception as e:
-                    logger.error(f"Error notifying subscriber: {e}")
+        """Publish a transcript to the subscribers of every worker"""
+        await pubsub.publish(self.channel(session_id), transcript)
+
+    async def _on_channel_message(self, transcript: dict, remote: bool):
+        """Deliver a published transcript to this worker's subscribers"""
+        session_id = transcript.get("session_id")
+        if remote:
+            self.touch(session_id)
+        if remote and transcript.get("is_final") and session_id in self.active_sessions:
+            # Speaker streaming through another worker: keep the history complete
+            # here too (the originating worker journals it)
+            self.active_sessions[session_id].append(transcript)
+
+        # Only enqueues: each subscriber is written by its own drain task
+        for queue in list(self.subscribers.get(session_id, ())):
+            queue.put(transcript)
     
-    def subscribe(self, session_id: str, callback: Callable):
-        """Subscribe to transcription updates for a session"""
-        if session_id not in self.subscribers:
-            self.subscribers[session_id] = []
-        self.subscribers[session_id].append(callback)
+    async def subscribe(
+        self,
+        session_id: str,
+        callback: Callable,
+        on_evict: Callable = None,
+        deltas: bool = False,
+        history: bool = False,
+        last_id: Optional[str] = None
+    ) -> SubscriberQueue:
+        """
+        Subscribe to transcription updates for a session.
+        `on_evict(reason)` is called if the subscriber falls too far behind;
+        with `deltas`, partials after the first of an utterance are sent as
+        transcript_delta messages. With `history`, the first message is a
+        snapshot of the transcripts after `last_id` (or all of them).
+        """
+        self.touch(session_id)
+        self.subscribers.setdefault(session_id, [])
+        if session_id not in self.listening:
+            # Marked before the await so a concurrent subscriber doesn't register the handler again
+            self.listening.add(session_id)
+            await pubsub.subscribe(self.channel(session_id), self._on_channel_message)
+        queue = SubscriberQueue(session_id, callback, on_evict, deltas=deltas)
+        if history:
+            # Taken together with queue creation (no await in between), so every
+            # later transcript is queued behind the snapshot and none is missed
+            queue.put(self.snapshot(session_id, last_id))
+        self.subscribers[session_id].append(queue)
+        return queue
     
-    def unsubscribe(self, session_id: str, callback: Callable):
+    async def unsubscribe(self, session_id: str, callback: Callable):
         """Unsubscribe from transcription updates"""
-        if session_id in self.subscribers:
-            try:
-                self.subscribers[session_id].remove(callback)
-            except ValueError:
-                pass
+        queues = self.subscribers.get(session_id)
+        queue = next((queue for queue in queues or () if queue.send is callback), None)
+        if queue is None:
+            return
+        queues.remove(queue)
+        await queue.close()
+        self.touch(session_id)
+        if not queues and session_id in self.listening:
+            self.listening.discard(session_id)
+            await pubsub.unsubscribe(self.channel(session_id), self._on_channel_message)
+
+    def snapshot(self, session_id: str, last_id: Optional[str] = None) -> dict:
+        """
+        History as one message. With the id of the last transcript a
+        reconnecting client saw, only later entries are included
+        (`resumed`); an unknown id falls back to the full history.
+        """
+        history = self.active_sessions.get(session_id, [])
+        start = 0
+        if last_id:
+            # Reconnects are recent: search from the end
+            start = next((index + 1 for index in range(len(history) - 1, -1, -1) if history[index].get("id") == last_id), 0)
+        partials = self.pending_partials.get(session_id, {})
+        return {
+            "type": "transcript_snapshot",
+            "session_id": session_id,
+            "resumed": start > 0,
+            "transcripts": history[start:],
+            "partials": [dict(partial) for partial in partials.values()]
+        }
 
     def get_transcripts(self, session_id: str) -> List[dict]:
         """Get all transcripts for a session"""
@@ -0,0 +1,201 @@
+"""
+Streaming upload ingestion shared by document and selfie uploads.
+Chunks are written to storage without blocking the event loop, SHA-256 is
+computed on the fly and the real content type is sniffed from the first bytes.
+
+Starlette spools the whole multipart body before the route runs, so the
+request-level size limit lives in UploadSizeLimit: it rejects an oversized
+Content-Length before any body is read and stops reading a chunked body once
+it passes the limit. The ingestor then enforces the exact per-file limit.
+"""
+import hashlib
+import os
+import uuid
+import logging
+from typing import Optional, Iterable, Tuple
+
+import aiofiles
+from fastapi import UploadFile
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_CONTENT_TYPES = ("image/jpeg", "image/png", "application/pdf")
+SELFIE_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "application/pdf": "pdf",
+}
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Identify the file type from its magic bytes"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> Tuple[str, int, Optional[str]]:
+    """Return (sha256, size, content_type) reading the file in chunks"""
+    hasher = hashlib.sha256()
+    size = 0
+    content_type = None
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if content_type is None:
+                content_type = sniff_content_type(chunk[:16])
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size, content_type
+
+
+class UploadRejected(ValueError):
+    """Upload failed validation while it was being ingested"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class IngestedUpload:
+    """A fully written upload with its verified metadata"""
+
+    def __init__(self, path: str, size: int, sha256: str, content_type: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+
+class RequestTooLarge(HTTPException):
+    """Raised from receive() once a request body passes its limit (an HTTPException,
+    so FastAPI's body parsing re-raises it instead of reporting a parse error)"""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail="File too large")
+
+
+class UploadSizeLimit:
+    """ASGI middleware capping the request body of multipart upload routes"""
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_size: int = None):
+        self.app = app
+        self.paths = set(paths)
+        self.max_size = max_size or settings.MAX_FILE_SIZE + settings.UPLOAD_FORM_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and int(content_length) > self.max_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise RequestTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        logger.warning(f"Rejected upload to {scope['path']}: request body over {self.max_size} bytes")
+        response = JSONResponse({"detail": "File too large"}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
+
+
+class UploadIngestor:
+    """Streams uploads to disk with a per-file size limit and on-the-fly hashing"""
+
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    async def ingest(
+        self,
+        upload: UploadFile,
+        directory: str,
+        allowed_types: Iterable[str],
+        max_size: int = None
+    ) -> IngestedUpload:
+        """
+        Write an upload into `directory`; raises UploadRejected on invalid input.
+        The body has already been received and spooled by Starlette; oversized
+        requests are cut off earlier by UploadSizeLimit.
+        """
+        max_size = max_size or settings.MAX_FILE_SIZE
+
+        # The spooled part's size is known, so reject before copying it
+        if upload.size is not None and upload.size > max_size:
+            raise UploadRejected("File too large")
+
+        temp_path = os.path.join(directory, f".{uuid.uuid4()}.part")
+        hasher = hashlib.sha256()
+        size = 0
+        content_type = None
+
+        try:
+            async with aiofiles.open(temp_path, "wb") as out:
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+
+                    if content_type is None:
+                        content_type = sniff_content_type(chunk[:16])
+                        if content_type not in allowed_types:
+                            raise UploadRejected("Invalid file type")
+
+                    size += len(chunk)
+                    if size > max_size:
+                        raise UploadRejected("File too large")
+
+                    hasher.update(chunk)
+                    await out.write(chunk)
+
+            if size == 0:
+                raise UploadRejected("Empty file")
+
+            path = os.path.join(directory, f"{uuid.uuid4()}.{CONTENT_TYPE_EXTENSIONS[content_type]}")
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return IngestedUpload(path, size, hasher.hexdigest(), content_type)
@@ -0,0 +1,143 @@
+"""
+Streaming voice-activity gate for the STT uplink.
+Classifies 20 ms frames of 16 kHz PCM by energy against an adaptive noise
+floor, with the zero-crossing rate separating unvoiced speech (fricatives)
+from broadband noise. Only speech segments go upstream:
+
+- pre-roll: the frames just before the onset are sent with it, so word
+  beginnings are not clipped (the reason the old client-side RMS gate lost
+  speech);
+- hangover: the gate stays open after the last speech frame, so the
+  provider's own end-of-utterance detection still sees trailing silence;
+- keep-alives: a short burst of ambient audio during long silences keeps
+  the upstream connection from idling out.
+"""
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+
+from config import settings
+
+SILENCE_DBFS = -96.0
+FLOOR_RISE = 0.02  # Noise floor follows quiet and noise-like frames: slowly up, instantly down
+ZCR_VOICED_MAX = 0.3  # Voiced speech crosses zero rarely; fricatives and hiss often
+
+
+class VoiceActivityDetector:
+    """Energy/zero-crossing VAD with hangover, pre-roll and keep-alives"""
+
+    def __init__(self, sample_rate: int = 16000, keepalive: bool = True):
+        self.frame_samples = sample_rate * settings.VAD_FRAME_MS // 1000
+        self.frame_bytes = self.frame_samples * 2
+        frames = lambda ms: max(1, ms // settings.VAD_FRAME_MS)
+        self.onset_frames = frames(settings.VAD_ONSET_MS)
+        self.hangover_frames = frames(settings.VAD_HANGOVER_MS)
+        self.keepalive = keepalive  # Off for engines without an idle timeout (local models)
+        self.keepalive_interval = frames(settings.VAD_KEEPALIVE_INTERVAL_MS)
+        self.keepalive_frames = frames(settings.VAD_KEEPALIVE_MS)
+        self.margin_db = settings.VAD_MARGIN_DB
+        self.min_speech_dbfs = settings.VAD_MIN_SPEECH_DBFS
+
+        self.noise_floor = -60.0
+        self.active = False
+        self._preroll = deque(maxlen=frames(settings.VAD_PREROLL_MS))
+        self._remainder = b""
+        self._speech_run = 0
+        self._hangover = 0
+        self._since_forward = 0   # Frames since anything was forwarded
+        self._keepalive_left = 0
+
+        # Audio accounting for the suppression metric
+        self.frames_total = 0
+        self.frames_forwarded = 0
+
+    @property
+    def suppressed_ratio(self) -> float:
+        if not self.frames_total:
+            return 0.0
+        return 1.0 - self.frames_forwarded / self.frames_total
+
+    def process(self, pcm: bytes) -> Tuple[bytes, bool]:
+        """
+        Gate one chunk. Returns (audio to forward, boundary) where boundary
+        means the forwarded audio ends a segment and should not wait for more.
+        """
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % self.frame_bytes
+        self._remainder = pcm[usable:]
+        if not usable:
+            return b"", False
+
+        # Per-frame features for the whole chunk at once
+        samples = np.frombuffer(pcm[:usable], dtype=np.int16).reshape(-1, self.frame_samples).astype(np.float32)
+        power = np.mean(samples * samples, axis=1)
+        energy_db = 10 * np.log10(np.maximum(power, 1e-10) / (32768.0 ** 2))
+        signs = np.signbit(samples)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_samples - 1)
+
+        forwarded = []
+        boundary = False
+        for index in range(len(samples)):
+            frame = pcm[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            speech = self._is_speech(float(energy_db[index]), float(zcr[index]))
+            self.frames_total += 1
+
+            if self.active:
+                forwarded.append(frame)
+                self._since_forward = 0
+                if speech:
+                    self._hangover = self.hangover_frames
+                else:
+                    self._hangover -= 1
+                    if self._hangover <= 0:
+                        self.active = False
+                        boundary = True
+                continue
+
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.onset_frames:
+                # Onset: send the buffered lead-in, then this frame
+                self.active = True
+                self._hangover = self.hangover_frames
+                self._keepalive_left = 0
+                forwarded.extend(self._preroll)
+                self._preroll.clear()
+                forwarded.append(frame)
+                boundary = False
+                continue
+
+            if self._keepalive_left:
+                # Already upstream, so it must not be repeated as pre-roll
+                forwarded.append(frame)
+                self._preroll.clear()
+                self._keepalive_left -= 1
+                self._since_forward = 0
+                boundary = self._keepalive_left == 0
+                continue
+
+            self._preroll.append(frame)
+            self._since_forward += 1
+            if self.keepalive and self._since_forward >= self.keepalive_interval:
+                self._keepalive_left = self.keepalive_frames
+
+        self.frames_forwarded += len(forwarded)
+        return b"".join(forwarded), boundary
+
+    def _is_speech(self, energy_db: float, zcr: float) -> bool:
+        above_floor = energy_db - self.noise_floor
+        noise_like = zcr >= ZCR_VOICED_MAX
+        if energy_db < self.min_speech_dbfs:
+            speech = False
+        else:
+            # Fricatives and hiss look alike; they need twice the margin
+            speech = above_floor >= (2 if noise_like else 1) * self.margin_db
+
+        # Track the floor on silence and on noise-like frames even inside a
+        # segment: fricatives are too short to move it far, while steady hiss
+        # (a fan, a bad mic) lifts it within a second and closes the gate
+        if energy_db < self.noise_floor:
+            self.noise_floor = max(energy_db, SILENCE_DBFS)
+        elif not speech or noise_like:
+            self.noise_floor += FLOOR_RISE * (energy_db - self.noise_floor)
+        return speech
@@ -0,0 +1,273 @@
+"""
+Local CPU speech-to-text with faster-whisper (CTranslate2, int8 by default).
+Whisper is not a streaming model, so each stream is cut into speech segments
+by the voice-activity gate and each segment is transcribed once, as a final.
+Segments from all sessions go through one InferenceBatcher: whatever is ready
+within WHISPER_BATCH_WAIT_MS is encoded and decoded as a single batch, so the
+cores spend their time in large matrix products instead of per-call overhead
+and one process keeps up with more concurrent speakers.
+
+Requires `pip install faster-whisper`. The model is loaded on first use from
+WHISPER_MODEL (a size such as "small", downloaded once, or a local path).
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.metrics import metrics
+from services.resampler import StreamingResampler
+from services.stt_engine import STTEngine
+from services.vad import VoiceActivityDetector
+
+try:
+    from faster_whisper import WhisperModel
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+    from faster_whisper.transcribe import get_suppressed_tokens
+except ImportError:
+    WhisperModel = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+metrics.describe("whisper_batch_size", "Speech segments per Whisper inference call")
+metrics.describe("whisper_inference_seconds", "Duration of one batched Whisper inference call")
+metrics.describe("whisper_queue_wait_seconds", "Time a speech segment waited for its batch")
+metrics.describe("whisper_audio_seconds_total", "Speech audio transcribed by the local Whisper engine")
+
+
+def whisper_language(language_code: Optional[str]) -> Optional[str]:
+    """Whisper language for a BCP-47 code such as "hi-IN"; None detects it per segment"""
+    if not language_code or language_code in ("auto", "unknown"):
+        return None
+    return language_code.split("-")[0].lower()
+
+
+class InferenceBatcher:
+    """Queues speech segments from all streams and transcribes them in shared batches"""
+
+    def __init__(self, batch_size: int = None, wait_ms: int = None):
+        self.batch_size = batch_size or settings.WHISPER_BATCH_SIZE
+        self.wait = (settings.WHISPER_BATCH_WAIT_MS if wait_ms is None else wait_ms) / 1000
+        self.model = None
+        self._tokenizers: Dict[str, "Tokenizer"] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def transcribe(self, audio: np.ndarray, language: Optional[str]) -> Tuple[str, str]:
+        """(text, language) for one float32 16 kHz segment; text is empty for non-speech"""
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((audio, language, future, time.monotonic()))
+        return await future
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # The first segment opens a batch; others join until it is full or the window closes
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Streams that ended meanwhile have cancelled their segments
+            batch = [item for item in batch if not item[2].done()]
+            if not batch:
+                continue
+            started = time.monotonic()
+            for *_, queued_at in batch:
+                metrics.observe("whisper_queue_wait_seconds", started - queued_at)
+
+            try:
+                if self.model is None:
+                    self.model = await asyncio.to_thread(self._load)
+                results = await asyncio.to_thread(
+                    self._infer, [item[0] for item in batch], [item[1] for item in batch]
+                )
+            except Exception as e:
+                logger.error(f"Whisper inference on {len(batch)} segments failed: {e}")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            metrics.observe("whisper_batch_size", len(batch))
+            metrics.observe("whisper_inference_seconds", time.monotonic() - started)
+            for (_, _, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _load(self):
+        if WhisperModel is None:
+            raise RuntimeError("faster-whisper is not installed")
+        logger.info(f"Loading Whisper model {settings.WHISPER_MODEL} ({settings.WHISPER_COMPUTE_TYPE}, CPU)")
+        return WhisperModel(
+            settings.WHISPER_MODEL,
+            device="cpu",
+            compute_type=settings.WHISPER_COMPUTE_TYPE,
+            cpu_threads=settings.WHISPER_CPU_THREADS
+        )
+
+    def _tokenizer(self, language: str) -> "Tokenizer":
+        if language not in self._tokenizers:
+            self._tokenizers[language] = Tokenizer(
+                self.model.hf_tokenizer, self.model.model.is_multilingual, task="transcribe", language=language
+            )
+        return self._tokenizers[language]
+
+    def _infer(self, audios: List[np.ndarray], languages: List[Optional[str]]) -> List[Tuple[str, str]]:
+        """Runs in a worker thread: one encoder pass and one greedy decode for the whole batch"""
+        model = self.model
+        features = np.stack([pad_or_trim(model.feature_extractor(audio)) for audio in audios])
+        encoder_output = model.encode(features)
+
+        supported = model.supported_languages
+        languages = [language if language in supported else None for language in languages]
+        if None in languages:
+            if len(supported) == 1:
+                languages = [supported[0]] * len(languages)
+            else:
+                # Best language token per segment, e.g. "<|hi|>"
+                detected = model.model.detect_language(encoder_output)
+                languages = [language or detected[index][0][0][2:-2] for index, language in enumerate(languages)]
+
+        tokenizers = [self._tokenizer(language) for language in languages]
+        results = model.model.generate(
+            encoder_output,
+            [model.get_prompt(tokenizer, [], without_timestamps=True) for tokenizer in tokenizers],
+            beam_size=1,
+            max_length=model.max_length,
+            return_no_speech_prob=True,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizers[0], [-1])
+        )
+
+        transcripts = []
+        for result, tokenizer, language in zip(results, tokenizers, languages):
+            text = ""
+            if result.no_speech_prob < settings.WHISPER_NO_SPEECH_THRESHOLD:
+                text = tokenizer.decode(result.sequences_ids[0]).strip()
+            transcripts.append((text, language))
+        return transcripts
+
+
+class WhisperEngine(STTEngine):
+    """Local Whisper transcription of VAD speech segments, batched across sessions"""
+
+    name = "whisper"
+
+    def __init__(self):
+        self.batcher = InferenceBatcher()
+        if WhisperModel is None:
+            logger.warning("faster-whisper not installed. Local transcription disabled.")
+
+    @property
+    def available(self) -> bool:
+        return WhisperModel is not None
+
+    async def close(self):
+        await self.batcher.stop()
+
+    async def start_streaming_transcription(
+        self,
+        audio_generator,
+        on_transcript,
+        on_utterance_end,
+        language_code: str = "auto",
+        input_sample_rate: int = 48000,
+        session_id: str = None,
+        speaker: str = "User",
+        vad: Optional[VoiceActivityDetector] = None
+    ):
+        """
+        Transcribe one stream segment by segment. Every transcript is final,
+        so on_utterance_end is not needed. Segments are cut where the VAD
+        closes, or every WHISPER_MAX_SEGMENT_MS during long speech.
+        """
+        if WhisperModel is None:
+            raise RuntimeError("faster-whisper is not installed")
+
+        language = whisper_language(language_code)
+        resampler = StreamingResampler(input_sample_rate, SAMPLE_RATE)
+        # Segmentation needs the gate even when VAD_ENABLED is off; nothing upstream to keep alive
+        vad = vad or VoiceActivityDetector(SAMPLE_RATE)
+        vad.keepalive = False
+        max_segment_bytes = settings.WHISPER_MAX_SEGMENT_MS * SAMPLE_RATE * 2 // 1000
+        segment = bytearray()
+        results: asyncio.Queue = asyncio.Queue()  # Segment transcriptions, in stream order
+        stream = {"first_audio_at": None, "first_transcript": False}
+
+        def submit():
+            if not segment:
+                return
+            audio = np.frombuffer(bytes(segment), dtype=np.int16).astype(np.float32) / 32768.0
+            metrics.inc("whisper_audio_seconds_total", len(audio) / SAMPLE_RATE)
+            segment.clear()
+            results.put_nowait(asyncio.ensure_future(self.batcher.transcribe(audio, language)))
+
+        async def deliver():
+            # Batches may hold segments of many streams; this keeps one stream's transcripts in order
+            while True:
+                future = await results.get()
+                if future is None:
+                    return
+                try:
+                    text, detected = await future
+                except Exception as e:
+                    logger.error(f"Whisper segment for {speaker} in session {session_id} failed: {e}")
+                    continue
+                if not text:
+                    continue
+                if not stream["first_transcript"]:
+                    stream["first_transcript"] = True
+                    metrics.observe("stt_time_to_first_transcript_seconds", time.monotonic() - stream["first_audio_at"])
+                logger.info(f"Whisper: '{text[:60]}' ({detected})")
+                await on_transcript(text, False, detected, text)
+
+        deliver_task = asyncio.create_task(deliver())
+        try:
+            async for chunk in audio_generator:
+                if not chunk:
+                    continue
+                if stream["first_audio_at"] is None:
+                    stream["first_audio_at"] = time.monotonic()
+                audio, boundary = vad.process(resampler.process(chunk))
+                segment.extend(audio)
+                if boundary or len(segment) >= max_segment_bytes:
+                    submit()
+
+            # Stream finished: transcribe the trailing speech and wait for the last results
+            submit()
+            results.put_nowait(None)
+            await deliver_task
+        except asyncio.CancelledError:
+            logger.info("Streaming cancelled by client")
+            raise
+        finally:
+            deliver_task.cancel()
+            while not results.empty():
+                future = results.get_nowait()
+                if future is not None:
+                    future.cancel()
@@ -826,9 +826,16 @@ async function reviewSession(sessionId) {
             <h4 class="mb-2">Documents</h4>
             ${session.documents?.length > 0 ? session.documents.map(d => `
                 <p>Type: ${d.document_type}, Name: ${d.extracted_name || 'N/A'}</p>
+                <div class="review-previews">
+                    <img data-preview="/documents/${d.id}/preview?size=thumb" data-full="/documents/${d.id}/preview?size=preview" alt="Document">
+                    <img data-preview="/documents/${d.id}/preview?variant=portrait&size=thumb" data-full="/documents/${d.id}/preview?variant=portrait&size=preview" alt="Portrait">
+                </div>
             `).join('') : '<p class="text-muted">No documents</p>'}
             <h4 class="mb-2 mt-3">Face Verification</h4>
             ${session.face_verification ? `
+                <div class="review-previews">
+                    <img data-preview="/face/session/${session.id}/selfie/preview?size=thumb" data-full="/face/session/${session.id}/selfie/preview?size=preview" alt="Selfie">
+                </div>
                 <p>Match: ${session.face_verification.is_match ? '✅ Yes' : '❌ No'}</p>
                 <p>Score: ${(session.face_verification.match_score * 100).toFixed(1)}%</p>
             ` : '<p class="text-muted">Not completed</p>'}
@@ -843,12 +850,38 @@ async function reviewSession(sessionId) {
         `;
 
         document.getElementById('review-modal').classList.add('active');
+        loadPreviews(document.getElementById('review-content'));
 
     } catch (error) {
         alert('Failed to load session: ' + error.message);
     }
 }
 
+// Previews need the auth header, so they are fetched and shown as object URLs.
+// The responses carry ETag/Cache-Control, so repeat views come from the HTTP cache.
+async function fetchPreview(endpoint) {
+    const response = await fetch(`${API_BASE}${endpoint}`, {
+        headers: { 'Authorization': `Bearer ${authToken}` }
+    });
+    if (!response.ok) throw new Error('Preview not available');
+    return URL.createObjectURL(await response.blob());
+}
+
+function loadPreviews(container) {
+    container.querySelectorAll('img[data-preview]').forEach(async img => {
+        try {
+            img.src = await fetchPreview(img.dataset.preview);
+            img.onload = () => URL.revokeObjectURL(img.src);
+            img.onclick = async () => {
+                const fullUrl = await fetchPreview(img.dataset.full);
+                window.open(fullUrl, '_blank');
+            };
+        } catch (error) {
+            img.remove();
+        }
+    });
+}
+
 function closeModal() {
     document.getElementById('review-modal').classList.remove('active');
     selectedSessionId = null;
@@ -1036,14 +1069,33 @@ let currentTranscriptSessionId = null;
 let audioCtx = null;
 let audioProcessor = null;
 let micStream = null;
+let mediaRecorder = null;
+let lastPartials = {};  // speakerKey -> last partial shown, the base for transcript_delta messages
+
+let lastTranscriptId = null;  // Last final shown; a reconnect resumes after it
+let transcriptionReconnectTimer = null;
+let transcriptionReconnectAttempts = 0;
+
+// Uplink audio: Opus in WebM from MediaRecorder where supported (about a tenth of
+// the bandwidth of raw PCM), otherwise 16-bit PCM from a ScriptProcessor.
+// Close code 4415 means the server can't decode Opus: fall back to PCM
+const OPUS_MIME_TYPE = 'audio/webm;codecs=opus';
+const UNSUPPORTED_CODEC = 4415;
+let uplinkCodec = window.MediaRecorder && MediaRecorder.isTypeSupported(OPUS_MIME_TYPE) ? 'webm' : 'pcm';
 
 async function startGlobalTranscription(sessionId, existingMicStream) {
-    if (isTranscribing) return;
+    if (isTranscribing || currentTranscriptSessionId === sessionId) return;
 
     currentTranscriptSessionId = sessionId;
+    lastTranscriptId = null;
+    transcriptionReconnectAttempts = 0;
     const panel = document.getElementById('transcription-panel');
     panel.classList.remove('hidden');
 
+    connectTranscriptionSocket(sessionId, existingMicStream);
+}
+
+function connectTranscriptionSocket(sessionId, existingMicStream) {
     // 1. Connect WebSocket with role info and sample rate
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const role = isAgentMode ? 'agent' : 'user';
@@ -1053,35 +1105,65 @@ async function startGlobalTranscription(sessionId, existingMicStream) {
     const sampleRate = tempCtx.sampleRate;
     tempCtx.close();
 
-    const wsUrl = `${protocol}//${window.location.host}/video/ws/${sessionId}?role=${role}&sample_rate=${sampleRate}`;
-    console.log(`[Transcription] Connecting as ${role}, rate=${sampleRate}, existingMic=${!!existingMicStream}`);
+    let wsUrl = `${protocol}//${window.location.host}/video/ws/${sessionId}?role=${role}&sample_rate=${sampleRate}&codec=${uplinkCodec}&deltas=1`;
+    if (lastTranscriptId) {
+        wsUrl += `&last_id=${encodeURIComponent(lastTranscriptId)}`;
+    }
+    console.log(`[Transcription] Connecting as ${role}, codec=${uplinkCodec}, rate=${sampleRate}, existingMic=${!!existingMicStream}, resume=${!!lastTranscriptId}`);
 
     try {
-        transcriptionSocket = new WebSocket(wsUrl);
+        const socket = new WebSocket(wsUrl);
+        transcriptionSocket = socket;
 
-        transcriptionSocket.onopen = () => {
+        socket.onopen = () => {
             isTranscribing = true;
+            transcriptionReconnectAttempts = 0;
+            lastPartials = {};
             console.log(`[Transcription] WebSocket connected for ${role}`);
-            // Start audio streaming, reuse existing mic stream if available
-            startAudioStreaming(existingMicStream);
+            // Start audio streaming once; across reconnects the running
+            // processor simply resumes sending when the socket is open
+            if (!audioCtx && !mediaRecorder && !recognition) {
+                startAudioStreaming(existingMicStream);
+            } else if (mediaRecorder) {
+                // A new connection needs a WebM stream that starts with its header
+                restartMediaRecorder();
+            }
         };
 
-        transcriptionSocket.onmessage = (event) => {
+        socket.onmessage = (event) => {
             const data = JSON.parse(event.data);
             if (data.type === 'transcript') {
                 appendTranscript(data);
+            } else if (data.type === 'transcript_delta') {
+                applyTranscriptDelta(data);
+            } else if (data.type === 'transcript_snapshot') {
+                applyTranscriptSnapshot(data);
             }
         };
 
-        transcriptionSocket.onerror = (error) => {
+        socket.onerror = (error) => {
             console.error('[Transcription] WebSocket error:', error);
         };
 
-        transcriptionSocket.onclose = () => {
-            console.log('[Transcription] WebSocket closed');
-            isTranscribing = false;
-            stopSpeechRecognition();
-            stopAudioStreaming();
+        socket.onclose = (event) => {
+            if (transcriptionSocket !== socket) return;  // Stopped deliberately
+            if (event.code === UNSUPPORTED_CODEC && uplinkCodec !== 'pcm') {
+                console.warn('[Transcription] Opus uplink unavailable, falling back to PCM');
+                uplinkCodec = 'pcm';
+                stopMediaRecorder();
+                connectTranscriptionSocket(sessionId, existingMicStream);
+                return;
+            }
+            console.log('[Transcription] WebSocket closed, reconnecting');
+            // Exponential backoff with jitter, capped at 30 s
+            const delay = Math.min(30000, 1000 * 2 ** transcriptionReconnectAttempts) * (0.5 + Math.random() / 2);
+            transcriptionReconnectAttempts++;
+            transcriptionReconnectTimer = setTimeout(() => {
+                transcriptionReconnectTimer = null;
+                if (currentTranscriptSessionId === sessionId) {
+                    connectTranscriptionSocket(sessionId, existingMicStream);
+                }
+            }, delay);
         };
 
     } catch (error) {
@@ -1090,9 +1172,14 @@ async function startGlobalTranscription(sessionId, existingMicStream) {
 }
 
 function stopGlobalTranscription() {
+    if (transcriptionReconnectTimer) {
+        clearTimeout(transcriptionReconnectTimer);
+        transcriptionReconnectTimer = null;
+    }
     if (transcriptionSocket) {
-        transcriptionSocket.close();
+        const socket = transcriptionSocket;
         transcriptionSocket = null;
+        socket.close();
     }
     stopSpeechRecognition();
     stopAudioStreaming();
@@ -1101,6 +1188,22 @@ function stopGlobalTranscription() {
     document.getElementById('transcription-panel').classList.add('hidden');
 }
 
+function applyTranscriptSnapshot(snapshot) {
+    // History on connect, or only what was missed when resuming after lastTranscriptId
+    if (snapshot.transcripts.length) {
+        console.log(`[Transcription] Snapshot: ${snapshot.transcripts.length} transcript(s), resumed=${snapshot.resumed}`);
+    }
+    if (!snapshot.resumed) {
+        // A full history replaces what is shown, or a reconnect would repeat every entry
+        document.getElementById('transcript-content')
+            .querySelectorAll('.transcript-message')
+            .forEach(el => el.remove());
+        lastPartials = {};
+    }
+    snapshot.transcripts.forEach(appendTranscript);
+    (snapshot.partials || []).forEach(appendTranscript);
+}
+
 async function startAudioStreaming(existingMicStream) {
     if (!isTranscribing) return;
 
@@ -1109,8 +1212,8 @@ async function startAudioStreaming(existingMicStream) {
         if (existingMicStream) {
             micStream = existingMicStream;
             console.log('[Audio] Using existing LiveKit mic stream');
-        } else {
-            // Fallback: request a new mic stream
+        } else if (!micStream) {
+            // Fallback: request a new mic stream (kept if the Opus uplink fell back to PCM)
             const constraints = {
                 audio: {
                     echoCancellation: true,
@@ -1122,6 +1225,17 @@ async function startAudioStreaming(existingMicStream) {
             console.log('[Audio] Got new mic stream via getUserMedia');
         }
 
+        if (uplinkCodec === 'webm') {
+            try {
+                startMediaRecorder();
+                console.log('[Audio] Streaming Opus/WebM to backend');
+            } catch (error) {
+                console.error('[Audio] MediaRecorder failed:', error);
+                transcriptionSocket.close(UNSUPPORTED_CODEC);
+            }
+            return;
+        }
+
         audioCtx = new (window.AudioContext || window.webkitAudioContext)();
         if (audioCtx.state === 'suspended') {
             await audioCtx.resume();
@@ -1137,9 +1251,9 @@ async function startAudioStreaming(existingMicStream) {
 
             const inputData = event.inputBuffer.getChannelData(0);
 
-            // Noise gate REMOVED: Send all audio to backend.
-            // Sarvam VAD handles silence better than this simple RMS check.
-            // This fixes the "delayed/missing" user transcription issue.
+            // No client-side noise gate: send all audio to the backend.
+            // The server gates silence (with pre-roll and hangover, so word
+            // edges are kept) before forwarding to Sarvam.
 
             // Convert Float32Array to Int16Array (16-bit PCM)
 
@@ -1169,7 +1283,38 @@ async function startAudioStreaming(existingMicStream) {
     }
 }
 
+function startMediaRecorder() {
+    const recorder = new MediaRecorder(new MediaStream(micStream.getAudioTracks()), {
+        mimeType: OPUS_MIME_TYPE,
+        audioBitsPerSecond: 32000
+    });
+    recorder.ondataavailable = (event) => {
+        if (event.data.size && transcriptionSocket && transcriptionSocket.readyState === WebSocket.OPEN) {
+            transcriptionSocket.send(event.data);
+        }
+    };
+    // 100 ms slices: each is sent as soon as it is encoded
+    recorder.start(100);
+    mediaRecorder = recorder;
+}
+
+function stopMediaRecorder() {
+    if (mediaRecorder) {
+        mediaRecorder.ondataavailable = null;  // The last slice belongs to the old stream
+        if (mediaRecorder.state !== 'inactive') {
+            mediaRecorder.stop();
+        }
+        mediaRecorder = null;
+    }
+}
+
+function restartMediaRecorder() {
+    stopMediaRecorder();
+    startMediaRecorder();
+}
+
 function stopAudioStreaming() {
+    stopMediaRecorder();
     if (audioProcessor) {
         audioProcessor.disconnect();
         audioProcessor = null;
@@ -1247,6 +1392,15 @@ function stopSpeechRecognition() {
     }
 }
 
+function applyTranscriptDelta(delta) {
+    // Rebuild the full partial from the one last shown for this utterance
+    const speakerKey = delta.speaker && delta.speaker.toLowerCase() === 'agent' ? 'agent' : 'user';
+    const base = lastPartials[speakerKey];
+    if (!base || base.id !== delta.id) return;  // The next full message resynchronises
+    const text = base.original_text.slice(0, delta.keep) + delta.append;
+    appendTranscript({ ...base, original_text: text, translated_text: text, timestamp: delta.timestamp || base.timestamp });
+}
+
 function appendTranscript(data) {
     const content = document.getElementById('transcript-content');
     const placeholder = content.querySelector('.transcript-placeholder');
@@ -1274,6 +1428,9 @@ function appendTranscript(data) {
     `;
 
     if (data.is_final) {
+        delete lastPartials[speakerKey];
+        if (data.id) lastTranscriptId = data.id;
+
         // FINAL: Remove any active partial for this speaker, then APPEND new final div
         const partialEl = content.querySelector(`[data-partial-speaker="${speakerKey}"]`);
         if (partialEl) partialEl.remove();
@@ -1305,6 +1462,7 @@ function appendTranscript(data) {
             content.appendChild(partialEl);
         }
         partialEl.innerHTML = innerHTML;
+        lastPartials[speakerKey] = data;
     }
 
     // Always scroll to bottom
@@ -0,0 +1,82 @@
+"""Compressed uplink audio decodes to 16 kHz PCM as it streams in"""
+import asyncio
+import io
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+av = pytest.importorskip("av")
+
+from services.audio_decoder import DECODED_SAMPLE_RATE, decode_audio_stream
+
+SOURCE_RATE = 48000
+SECONDS = 1.0
+FREQUENCY = 440
+
+
+def tone_frames(frame_size: int = 960):
+    """A 440 Hz tone at 48 kHz as 20 ms mono s16 frames, as a browser captures it"""
+    t = np.arange(int(SOURCE_RATE * SECONDS)) / SOURCE_RATE
+    samples = (0.5 * 32767 * np.sin(2 * np.pi * FREQUENCY * t)).astype(np.int16)
+    for start in range(0, len(samples), frame_size):
+        frame = av.AudioFrame.from_ndarray(samples[start:start + frame_size].reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = SOURCE_RATE
+        frame.pts = start
+        frame.time_base = Fraction(1, SOURCE_RATE)
+        yield frame
+
+
+def opus_packets() -> list:
+    """One raw Opus packet per message, as WebCodecs' AudioEncoder sends them"""
+    encoder = av.CodecContext.create("libopus", "w")
+    encoder.sample_rate = SOURCE_RATE
+    encoder.layout = "mono"
+    encoder.format = "s16"
+    encoder.bit_rate = 24000
+    packets = []
+    for frame in [*tone_frames(), None]:
+        packets.extend(bytes(packet) for packet in encoder.encode(frame))
+    return packets
+
+
+def webm_chunks(chunk_size: int = 1000) -> list:
+    """An audio/webm;codecs=opus recording cut into MediaRecorder-sized chunks"""
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="webm") as container:
+        stream = container.add_stream("libopus", rate=SOURCE_RATE)
+        stream.layout = "mono"
+        for frame in [*tone_frames(), None]:
+            for packet in stream.encode(frame):
+                container.mux(packet)
+    data = buffer.getvalue()
+    return [data[start:start + chunk_size] for start in range(0, len(data), chunk_size)]
+
+
+async def stream(chunks: list):
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(0)  # Arrives over time, not all at once
+
+
+def decode(codec: str, chunks: list) -> np.ndarray:
+    async def main():
+        return b"".join([pcm async for pcm in decode_audio_stream(codec, stream(chunks))])
+    return np.frombuffer(asyncio.run(main()), dtype=np.int16)
+
+
+@pytest.mark.parametrize("codec, encode", [("opus", opus_packets), ("webm", webm_chunks)])
+def test_tone_decodes_to_16k_pcm(codec, encode):
+    chunks = encode()
+    assert len(chunks) > 10  # Really streamed, not one message
+    pcm = decode(codec, chunks)
+
+    # Opus adds a few ms of pre-skip and padding at most
+    assert len(pcm) / DECODED_SAMPLE_RATE == pytest.approx(SECONDS, abs=0.05)
+
+    # Not silence, and still the tone
+    steady = pcm[DECODED_SAMPLE_RATE // 10:-DECODED_SAMPLE_RATE // 10].astype(np.float64)
+    assert np.sqrt(np.mean(steady ** 2)) > 0.2 * 32767
+    spectrum = np.abs(np.fft.rfft(steady))
+    peak = np.argmax(spectrum) * DECODED_SAMPLE_RATE / len(steady)
+    assert peak == pytest.approx(FREQUENCY, abs=5)
@@ -0,0 +1,92 @@
+"""Blob files follow the outcome of the database transaction"""
+import asyncio
+import hashlib
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.database import Base, begin_before_savepoint
+from database.models import StoredBlob
+from services.blob_store import BlobStore
+from services.upload_service import IngestedUpload
+
+
+def run(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        event.listen(engine.sync_engine, "savepoint", begin_before_savepoint)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        store = BlobStore(root=str(tmp_path / "blobs"))
+        try:
+            await scenario(async_sessionmaker(engine, expire_on_commit=False), store)
+        finally:
+            await engine.dispose()
+    asyncio.run(main())
+
+
+def stage(store: BlobStore, content: bytes) -> IngestedUpload:
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = os.path.join(store.staging_dir, sha256)
+    with open(path, "wb") as f:
+        f.write(content)
+    return IngestedUpload(path, len(content), sha256, "image/jpeg")
+
+
+async def stored(session_maker, store, content=b"selfie") -> StoredBlob:
+    async with session_maker() as db:
+        blob = await store.commit(db, stage(store, content))
+        await db.commit()
+    await store.drain()
+    return blob
+
+
+def test_released_blob_survives_rollback(tmp_path):
+    async def scenario(session_maker, store):
+        blob = await stored(session_maker, store)
+        async with session_maker() as db:
+            await store.release(db, blob.sha256)
+            await db.rollback()
+        await store.drain()
+        assert os.path.exists(blob.path)
+        async with session_maker() as db:
+            assert (await db.get(StoredBlob, blob.sha256)).ref_count == 1
+    run(tmp_path, scenario)
+
+
+def test_released_blob_is_deleted_after_commit(tmp_path):
+    async def scenario(session_maker, store):
+        blob = await stored(session_maker, store)
+        derived = f"{store.derived_prefix(blob.path)}portrait.jpg"
+        open(derived, "wb").close()
+        async with session_maker() as db:
+            await store.release(db, blob.sha256)
+            assert os.path.exists(blob.path)
+            await db.commit()
+        await store.drain()
+        assert not os.path.exists(blob.path)
+        assert not os.path.exists(derived)
+    run(tmp_path, scenario)
+
+
+def test_new_blob_is_removed_when_the_transaction_fails(tmp_path):
+    async def scenario(session_maker, store):
+        async with session_maker() as db:
+            blob = await store.commit(db, stage(store, b"document"))
+            assert os.path.exists(blob.path)
+            # e.g. the document pipeline raised: get_db closes the session uncommitted
+        await store.drain()
+        assert not os.path.exists(blob.path)
+        async with session_maker() as db:
+            assert await db.get(StoredBlob, blob.sha256) is None
+    run(tmp_path, scenario)
+
+
+def test_committed_blob_is_kept(tmp_path):
+    async def scenario(session_maker, store):
+        blob = await stored(session_maker, store)
+        assert os.path.exists(blob.path)
+        duplicate = await stored(session_maker, store)
+        assert duplicate.path == blob.path and os.path.exists(blob.path)
+    run(tmp_path, scenario)
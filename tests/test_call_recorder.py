@@ -0,0 +1,147 @@
+"""One recording per call, across reconnects, resumed sessions and workers"""
+import asyncio
+import os
+import time
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import services.call_recorder as recorder_module
+from database.database import Base
+from database.models import CallRecordingTrack, VideoSession
+from services.call_recorder import SAMPLE_RATE, CallRecorder
+
+
+def tone(seconds: float) -> bytes:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16).tobytes()
+
+
+def duration(path: str) -> float:
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    av = pytest.importorskip("av")
+    with av.open(path) as container:
+        stream = container.streams.audio[0]
+        return sum(frame.samples for frame in container.decode(stream)) / stream.sample_rate
+
+
+@pytest.mark.parametrize("recording_format", ["wav", "opus", "flac"])
+async def use_test_database(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine)
+    monkeypatch.setattr(recorder_module, "async_session_maker", session_maker)
+    async with session_maker() as db:
+        db.add(VideoSession(kyc_session_id="call", room_name="room"))
+        await db.commit()
+    return engine, session_maker
+
+
+async def linked_url(session_maker) -> str:
+    async with session_maker() as db:
+        return await db.scalar(select(VideoSession.recording_url).where(VideoSession.kyc_session_id == "call"))
+
+
+@pytest.mark.parametrize("recording_format", ["wav", "opus", "flac"])
+def test_reconnects_and_resumes_share_one_recording(tmp_path, monkeypatch, recording_format):
+    if recording_format != "wav":
+        pytest.importorskip("av")
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        engine, session_maker = await use_test_database(tmp_path, monkeypatch)
+        recorder = CallRecorder()
+        recorder.format = recording_format
+
+        # The user's socket drops and reconnects: both streams write the user's track
+        await recorder.open("call", "User")
+        recorder.write("call", "User", tone(0.5))
+        await recorder.open("call", "User")
+        recorder.write("call", "User", tone(0.5))
+        url = await recorder.finish("call")
+        assert url and os.path.exists(url.lstrip("/"))
+        assert await linked_url(session_maker) == url
+
+        # Resumed after the session was ended: appended to the linked recording
+        await recorder.open("call", "Agent")
+        recorder.write("call", "Agent", tone(0.75))
+        assert await recorder.finish("call") == url
+
+        assert sorted(os.listdir("recordings")) == sorted([os.path.basename(url), "tracks"])
+        assert os.listdir("recordings/tracks") == []
+        assert duration(url.lstrip("/")) == pytest.approx(1.75, abs=0.05)
+        assert await linked_url(session_maker) == url
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def test_speakers_on_two_workers_mix_into_one_stereo_recording(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    clock = SimpleNamespace(time=lambda: 1000.0, monotonic=time.monotonic)
+    monkeypatch.setattr(recorder_module, "time", clock)
+
+    async def main():
+        engine, session_maker = await use_test_database(tmp_path, monkeypatch)
+        # The user streams through one worker; the agent joins half a second later on another
+        user_worker, agent_worker = CallRecorder(), CallRecorder()
+        user_worker.format = agent_worker.format = "wav"
+        await user_worker.open("call", "User")
+        clock.time = lambda: 1000.5
+        await agent_worker.open("call", "Agent")
+        user_worker.write("call", "User", tone(1.0))
+        agent_worker.write("call", "Agent", tone(1.0))
+
+        # Ended on the user's worker first: the agent's track is still being recorded
+        assert await user_worker.finish("call") is None
+        async with session_maker() as db:
+            statuses = sorted((await db.execute(select(CallRecordingTrack.speaker, CallRecordingTrack.status))).all())
+        assert statuses == [("Agent", "recording"), ("User", "done")]
+
+        # The last worker to finish mixes both tracks
+        url = await agent_worker.finish("call")
+        assert url and await linked_url(session_maker) == url
+        with wave.open(url.lstrip("/"), "rb") as f:
+            assert f.getnchannels() == 2
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).reshape(-1, 2)
+        # Overlapping in time, not one after the other
+        assert len(samples) / SAMPLE_RATE == pytest.approx(1.5, abs=0.01)
+        half = SAMPLE_RATE // 2
+        user, agent = samples[:, 0], samples[:, 1]
+        assert np.array_equal(user[:2 * half], np.frombuffer(tone(1.0), dtype=np.int16))
+        assert not user[2 * half:].any()
+        assert not agent[:half].any()
+        assert np.array_equal(agent[half:], np.frombuffer(tone(1.0), dtype=np.int16))
+
+        # Tracks are gone once mixed
+        async with session_maker() as db:
+            assert await db.scalar(select(CallRecordingTrack.id)) is None
+        assert os.listdir("recordings/tracks") == []
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def test_workers_finishing_together_mix_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        engine, session_maker = await use_test_database(tmp_path, monkeypatch)
+        workers = [CallRecorder() for _ in range(3)]
+        for worker, speaker in zip(workers, ("User", "Agent", "User")):
+            worker.format = "wav"
+            await worker.open("call", speaker)
+            worker.write("call", speaker, tone(0.5))
+
+        # The end broadcast reaches every worker at once: exactly one claims and mixes
+        urls = await asyncio.gather(*(worker.finish("call") for worker in workers))
+        assert len([url for url in urls if url]) == 1
+        assert os.listdir("recordings/tracks") == []
+        assert duration((await linked_url(session_maker)).lstrip("/")) == pytest.approx(0.5, abs=0.05)
+        await engine.dispose()
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""Prometheus exposition is valid and /metrics needs the token"""
+import pytest
+
+from config import settings
+from services.metrics import MetricsRegistry
+
+
+def test_summary_min_max_are_separate_gauges():
+    registry = MetricsRegistry()
+    registry.describe("stt_latency_seconds", "Time to first transcript")
+    for value in (0.2, 0.5, 0.3):
+        registry.observe("stt_latency_seconds", value, engine="sarvam")
+    text = registry.render_prometheus()
+
+    assert "# TYPE stt_latency_seconds summary" in text
+    assert "# TYPE stt_latency_seconds_min gauge" in text
+    assert "# TYPE stt_latency_seconds_max gauge" in text
+    assert 'stt_latency_seconds_min{engine="sarvam"} 0.2' in text
+    assert 'stt_latency_seconds_max{engine="sarvam"} 0.5' in text
+
+
+def test_exposition_parses():
+    parser = pytest.importorskip("prometheus_client.parser")
+    registry = MetricsRegistry()
+    registry.inc("stt_uplink_messages_total", session="abc", speaker="User")
+    for value in (0.2, 0.5, 0.3):
+        registry.observe("stt_latency_seconds", value, engine="sarvam")
+    text = registry.render_prometheus()
+
+    families = {family.name: family for family in parser.text_string_to_metric_families(text)}
+    assert families["stt_latency_seconds"].type == "summary"
+    assert {sample.name for sample in families["stt_latency_seconds"].samples} == {
+        "stt_latency_seconds_count", "stt_latency_seconds_sum"
+    }
+    assert families["stt_latency_seconds_max"].type == "gauge"
+
+
+def test_metrics_endpoint_requires_token(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 403
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,54 @@
+"""Upside-down and sideways documents are turned upright, including all-caps cards"""
+import numpy as np
+import pytest
+
+from services.orientation import OrientationNormalizer
+
+ALL_CAPS = """INCOME TAX DEPARTMENT      GOVT. OF INDIA
+PERMANENT ACCOUNT NUMBER CARD
+ABCDE1234F
+NAME
+RAJESH KUMAR SHARMA
+FATHER'S NAME
+SURESH KUMAR SHARMA
+DATE OF BIRTH
+15/08/1985"""
+
+MIXED_CASE = """Income Tax Department      Govt. of India
+Permanent Account Number Card
+Name
+Rajesh Kumar Sharma
+Father's Name
+Suresh Kumar Sharma
+Date of Birth"""
+
+
+def render_card(text: str, photo: bool = False) -> np.ndarray:
+    """Grayscale card: bordered, left-aligned text, optionally a photo on the right"""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    ImageFont = pytest.importorskip("PIL.ImageFont")
+    try:
+        font = ImageFont.load_default(size=44)
+    except TypeError:
+        pytest.skip("Pillow without a scalable default font")
+
+    image = Image.new("L", (1400, 900), 255)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((10, 10, 1389, 889), outline=0, width=4)
+    draw.multiline_text((60, 50), text, font=font, fill=0, spacing=40)
+    if photo:
+        draw.rectangle((1080, 300, 1340, 640), fill=90)
+    return np.array(image)
+
+
+@pytest.mark.parametrize("text", [ALL_CAPS, MIXED_CASE], ids=["all_caps", "mixed_case"])
+@pytest.mark.parametrize("photo", [False, True], ids=["text", "photo"])
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_rotated_card_is_turned_upright(text, photo, rotation):
+    normalizer = OrientationNormalizer()
+    card = render_card(text, photo)
+    rotated = normalizer.rotate(card, rotation)
+
+    estimate = normalizer.estimate(rotated)
+    assert (rotation + estimate["rotation"]) % 360 == 0
@@ -0,0 +1,164 @@
+"""Cross-worker pub/sub backends deliver between workers and survive dropped connections"""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import services.pubsub as pubsub_module
+from services.pubsub import PostgresPubSub, RedisPubSub
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Timed out waiting for delivery")
+        await asyncio.sleep(0.02)
+
+
+async def exchange(first, second, channel: str, received: list, message_id: str):
+    """Publish from `first`; `second` must get it as a remote message"""
+    await first.publish(channel, {"id": message_id})
+    await wait_for(lambda: (message_id, True) in received)
+
+
+def recorder(received: list):
+    async def handler(message, remote):
+        received.append((message["id"], remote))
+    return handler
+
+
+def test_redis_delivers_across_workers_and_resubscribes(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        pubsub_module, "aioredis", SimpleNamespace(from_url=lambda url: fakeredis.FakeAsyncRedis(server=server))
+    )
+
+    async def main():
+        first, second = RedisPubSub("redis://fake"), RedisPubSub("redis://fake")
+        await first.start()
+        await second.start()
+        local, received = [], []
+        await first.subscribe("transcripts:call", recorder(local))
+        await second.subscribe("transcripts:call", recorder(received))
+        await asyncio.sleep(0.1)
+
+        await exchange(first, second, "transcripts:call", received, "t1")
+        # Local handlers get the message once, directly, not echoed back from Redis
+        await asyncio.sleep(0.1)
+        assert local == [("t1", False)]
+
+        # Drop the broker connection: the reader resubscribes once it is back
+        server.connected = False
+        await asyncio.sleep(1.5)
+        server.connected = True
+        await asyncio.sleep(1.5)
+        await exchange(first, second, "transcripts:call", received, "t2")
+
+        await first.stop()
+        await second.stop()
+    asyncio.run(main())
+
+
+class FakeConnection:
+    """The asyncpg.Connection surface PostgresPubSub uses, on an in-memory bus"""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.listeners = {}
+        self.termination_listeners = []
+        self.closed = False
+        bus.connections.append(self)
+
+    def is_closed(self):
+        return self.closed
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    async def add_listener(self, channel, callback):
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        self.listeners.setdefault(channel, set()).add(callback)
+
+    async def remove_listener(self, channel, callback):
+        if not self.closed:
+            self.listeners.get(channel, set()).discard(callback)
+
+    async def execute(self, query, channel, payload):
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        for conn in self.bus.connections:
+            if not conn.closed:
+                for callback in list(conn.listeners.get(channel, ())):
+                    callback(conn, 1, channel, payload)
+
+    def terminate(self):
+        self.closed = True
+        for callback in self.termination_listeners:
+            callback(self)
+
+    async def close(self):
+        self.terminate()
+
+
+def test_postgres_relistens_after_connection_loss(monkeypatch):
+    bus = SimpleNamespace(connections=[])
+
+    async def connect(dsn):
+        return FakeConnection(bus)
+
+    monkeypatch.setattr(pubsub_module, "asyncpg", SimpleNamespace(connect=connect))
+
+    async def main():
+        first, second = PostgresPubSub("postgresql://fake"), PostgresPubSub("postgresql://fake")
+        await first.start()
+        await second.start()
+        received = []
+        await second.subscribe("transcripts:a", recorder(received))
+        await second.subscribe("transcripts:b", recorder(received))
+        await exchange(first, second, "transcripts:a", received, "t1")
+
+        # Both of the subscriber's connections drop
+        second._listen_conn.terminate()
+        second._notify_conn.terminate()
+        await wait_for(lambda: not second._listen_conn.is_closed())
+        assert set(second._listen_conn.listeners) == {"transcripts:a", "transcripts:b"}
+        await exchange(first, second, "transcripts:b", received, "t2")
+        # The NOTIFY connection is reopened on the next publish
+        first_received = []
+        await first.subscribe("transcripts:c", recorder(first_received))
+        await exchange(second, first, "transcripts:c", first_received, "t3")
+
+        await first.stop()
+        await second.stop()
+    asyncio.run(main())
+
+
+def test_postgres_server_relisten():
+    """Against a real server (TEST_POSTGRES_DSN); skipped when none is reachable"""
+    asyncpg = pytest.importorskip("asyncpg")
+    dsn = os.environ.get("TEST_POSTGRES_DSN", "postgresql://postgres@localhost/postgres")
+
+    async def main():
+        try:
+            probe = await asyncio.wait_for(asyncpg.connect(dsn), 2)
+        except Exception as e:
+            pytest.skip(f"No Postgres at {dsn}: {e}")
+        first, second = PostgresPubSub(dsn), PostgresPubSub(dsn)
+        await first.start()
+        await second.start()
+        received = []
+        await second.subscribe("transcripts:call", recorder(received))
+        await exchange(first, second, "transcripts:call", received, "t1")
+
+        await probe.execute("SELECT pg_terminate_backend($1)", second._listen_conn.get_server_pid())
+        await probe.close()
+        await wait_for(lambda: not second._listen_conn.is_closed() and len(second._listen_conn._listeners) == 1)
+        await exchange(first, second, "transcripts:call", received, "t2")
+
+        await first.stop()
+        await second.stop()
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Streaming resampler: chunking does not change the output; filter quality vs. audioop"""
+import warnings
+
+import numpy as np
+import pytest
+
+from services.resampler import StreamingResampler
+
+OUTPUT_RATE = 16000
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop
+    except ImportError:
+        audioop = None
+
+
+def tone(rate: int, frequency: float, seconds: float = 2.0) -> bytes:
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * frequency * t) * 12000).astype(np.int16).tobytes()
+
+
+def resample(pcm: bytes, rate: int, chunk_bytes: int = None) -> bytes:
+    resampler = StreamingResampler(rate, OUTPUT_RATE)
+    if chunk_bytes is None:
+        return resampler.process(pcm)
+    return b"".join(resampler.process(pcm[i:i + chunk_bytes]) for i in range(0, len(pcm), chunk_bytes))
+
+
+def ratecv(pcm: bytes, rate: int, chunk_bytes: int = 4096) -> bytes:
+    state, out = None, []
+    for i in range(0, len(pcm), chunk_bytes):
+        converted, state = audioop.ratecv(pcm[i:i + chunk_bytes], 2, 1, rate, OUTPUT_RATE, state)
+        out.append(converted)
+    return b"".join(out)
+
+
+def settled(pcm: bytes) -> np.ndarray:
+    """Output samples after the first 0.25 s of filter start-up"""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float64)[OUTPUT_RATE // 4:]
+
+
+def level_db(pcm: bytes, reference: bytes) -> float:
+    """RMS of `pcm` relative to `reference`, floored at one 16-bit LSB"""
+    rms = np.sqrt(np.mean(settled(pcm) ** 2))
+    reference_rms = np.sqrt(np.mean(np.frombuffer(reference, dtype=np.int16).astype(np.float64) ** 2))
+    return max(-96.0, 20 * np.log10(rms / reference_rms + 1e-12))
+
+
+def sine_fit(pcm: bytes, frequency: float):
+    """(gain in dB vs. the 12000 input amplitude, residual in dB) of a least-squares sine fit"""
+    samples = settled(pcm)
+    n = np.arange(len(samples)) / OUTPUT_RATE
+    basis = np.stack([np.sin(2 * np.pi * frequency * n), np.cos(2 * np.pi * frequency * n)], axis=1)
+    fit, *_ = np.linalg.lstsq(basis, samples, rcond=None)
+    residual = samples - basis @ fit
+    gain = 20 * np.log10(np.hypot(*fit) / 12000)
+    return gain, 20 * np.log10(np.sqrt(np.mean(residual ** 2)) / np.sqrt(np.mean(samples ** 2)))
+
+
+@pytest.mark.parametrize("rate", [48000, 44100, 8000])
+def test_chunked_output_matches_one_shot(rate):
+    pcm = np.random.default_rng(rate).integers(-20000, 20000, rate * 2, dtype=np.int16).tobytes()
+    whole = resample(pcm, rate)
+    # Odd chunk sizes also split samples across chunks
+    for chunk_bytes in (2, 37, 640, 4095, 8192 * 2 + 1):
+        assert resample(pcm, rate, chunk_bytes) == whole
+    assert abs(len(whole) // 2 - 2 * OUTPUT_RATE) <= 64
+
+
+@pytest.mark.parametrize("rate", [48000, 44100, 8000])
+def test_passband_is_flat_and_clean(rate):
+    edge = min(rate, OUTPUT_RATE) * 0.375  # 3/4 of the narrower Nyquist band
+    for frequency in (300, 1000, 2500, edge):
+        pcm = resample(tone(rate, frequency), rate, 4096)
+        gain, residual = sine_fit(pcm, frequency)
+        assert abs(gain) < 0.05, f"{frequency} Hz gain {gain:.2f} dB"
+        # Near the 16-bit quantisation floor (about -88 dB for this amplitude)
+        assert residual < -80, f"{frequency} Hz residual {residual:.1f} dB"
+        if audioop:
+            reference_gain, reference_residual = sine_fit(ratecv(tone(rate, frequency), rate), frequency)
+            assert abs(gain) <= abs(reference_gain) + 0.02
+            # No worse than audioop, unless both are down at the quantisation floor
+            assert residual <= max(reference_residual + 3, -85)
+
+
+@pytest.mark.parametrize("rate", [48000, 44100])
+def test_stopband_tones_do_not_alias(rate):
+    for frequency in (9000, 12000, 15000, 20000):
+        pcm = tone(rate, frequency)
+        level = level_db(resample(pcm, rate, 4096), pcm)
+        assert level < -60, f"{frequency} Hz aliased at {level:.1f} dB"
+        if audioop:
+            assert level < level_db(ratecv(pcm, rate), pcm)
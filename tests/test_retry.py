@@ -0,0 +1,98 @@
+"""Backoff delays and the circuit breaker state machine"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.retry as retry_module
+import services.transcription_service as transcription_module
+from services.retry import CircuitBreaker, backoff_delay
+from services.transcription_service import SarvamService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the breaker's clock: patching time.monotonic itself would freeze the event loop
+    monkeypatch.setattr(retry_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_backoff_delay_is_capped_exponential_with_equal_jitter():
+    for attempt in range(12):
+        expected = min(30.0, 0.5 * 2 ** attempt)
+        delays = [backoff_delay(attempt, 0.5, 30.0) for _ in range(200)]
+        assert all(expected / 2 <= delay <= expected for delay in delays)
+        # Jittered: sessions retrying together spread out
+        assert max(delays) - min(delays) > expected / 4
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("test", threshold=3, reset_timeout=10)
+    for _ in range(2):
+        assert breaker.acquire() == 0
+        breaker.failure()
+    assert breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open"
+
+    clock.now += 4
+    assert breaker.acquire() == pytest.approx(6)
+
+
+def test_half_open_allows_one_probe(clock):
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=10)
+    breaker.failure()
+    clock.now += 10
+    assert breaker.state == "half_open"
+    assert breaker.acquire() == 0
+    assert breaker.acquire() > 0  # Others wait for the probe
+
+    # A failed probe re-opens for a full reset_timeout
+    breaker.failure()
+    assert breaker.state == "open"
+    clock.now += 10
+    assert breaker.acquire() == 0
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.acquire() == 0 and breaker.acquire() == 0
+
+
+def test_released_probe_lets_the_next_attempt_probe(clock):
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=10)
+    breaker.failure()
+    clock.now += 10
+    assert breaker.acquire() == 0
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.acquire() == 0
+
+
+def test_cancelled_connect_releases_the_probe(clock, monkeypatch):
+    async def hanging_connect(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(transcription_module.websockets, "connect", hanging_connect)
+
+    async def main():
+        service = SarvamService()
+        service.api_key = "test"
+        service.breaker.failures = service.breaker.threshold
+        service.breaker.opened_at = clock.now - service.breaker.reset_timeout
+        assert service.breaker.acquire() == 0
+
+        probe = asyncio.create_task(service._connect("auto"))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert service.breaker.acquire() == 0
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""Script detection picks the pack for the document's actual script"""
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import services.script_detector as detector_module
+from services.script_detector import ScriptDetector, script_vote
+
+SAMPLES = {
+    "Latin": ("en", "REPUBLIC OF INDIA\nPermanent Account Number\nName of the holder"),
+    "Devanagari": ("hi", "भारत सरकार\nस्थायी लेखा संख्या\nधारक का नाम"),
+    "Tamil": ("ta", "இந்திய அரசு\nநிரந்தர கணக்கு எண்\nஉரிமையாளர் பெயர்"),
+}
+
+
+def render(text: str, lang: str) -> np.ndarray:
+    """Black text on white in a system font that covers `lang`, or skip"""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    ImageFont = pytest.importorskip("PIL.ImageFont")
+    if not shutil.which("fc-match"):
+        pytest.skip("fontconfig not installed")
+    font_path = subprocess.run(
+        ["fc-match", "-f", "%{file}", f":lang={lang}"], capture_output=True, text=True
+    ).stdout.strip()
+    if not font_path:
+        pytest.skip(f"No font for {lang}")
+    try:
+        font = ImageFont.truetype(font_path, 40, layout_engine=ImageFont.Layout.RAQM)
+    except Exception:
+        pytest.skip("Pillow without complex text layout (libraqm)")
+
+    image = Image.new("L", (1200, 400), 255)
+    ImageDraw.Draw(image).multiline_text((40, 40), text, font=font, fill=0, spacing=30)
+    return np.array(image)
+
+
+class FakeTesseract:
+    """pytesseract stand-in returning canned OSD and OCR output"""
+    Output = SimpleNamespace(DICT="dict")
+
+    def __init__(self, osd=None, text="", installed=("eng", "hin", "tam")):
+        self.osd = osd
+        self.text = text
+        self.installed = list(installed)
+        self.string_languages = []
+
+    def image_to_osd(self, image, output_type=None):
+        if self.osd is None:
+            raise RuntimeError("Too few characters. Skipping this page")
+        return self.osd
+
+    def image_to_string(self, image, lang="eng", config=""):
+        self.string_languages.append(lang)
+        return self.text
+
+    def get_languages(self, config=""):
+        return self.installed
+
+
+@pytest.fixture
+def page():
+    return np.full((400, 1200), 255, dtype=np.uint8)
+
+
+def test_osd_script_picks_its_pack(monkeypatch, page):
+    fake = FakeTesseract(osd={"script": "Tamil", "script_conf": 6.5})
+    monkeypatch.setattr(detector_module, "pytesseract", fake)
+    result = ScriptDetector().detect(page)
+    assert (result["script"], result["language"], result["source"]) == ("Tamil", "tam", "osd")
+    assert fake.string_languages == []
+
+
+def test_unsure_osd_falls_back_to_unicode_vote(monkeypatch, page):
+    fake = FakeTesseract(osd={"script": "Latin", "script_conf": 0.4}, text=SAMPLES["Devanagari"][1] + " 1987")
+    monkeypatch.setattr(detector_module, "pytesseract", fake)
+    result = ScriptDetector().detect(page)
+    assert (result["script"], result["language"], result["source"]) == ("Devanagari", "hin", "text")
+    # The vote pass only loads installed packs
+    assert fake.string_languages == ["eng+hin+tam"]
+
+
+def test_uninstalled_pack_and_mixed_text_fall_back_to_ocr_languages(monkeypatch, page):
+    # Telugu pack missing: read with every installed pack rather than a wrong one
+    fake = FakeTesseract(osd={"script": "Telugu", "script_conf": 9.0}, text="name పేరు")
+    monkeypatch.setattr(detector_module, "pytesseract", fake)
+    result = ScriptDetector().detect(page)
+    assert result["language"] == "eng+hin+tam"
+    assert result["source"] == "fallback"
+
+
+def test_script_vote_counts_letters_by_block():
+    votes = script_vote("নাম Name 12/08/1990 ਨਾਮ")
+    assert votes == {"Bengali": 3, "Latin": 4, "Gurmukhi": 3}
+
+
+@pytest.mark.parametrize("script", list(SAMPLES))
+def test_rendered_samples(script):
+    pytesseract = pytest.importorskip("pytesseract")
+    try:
+        installed = set(pytesseract.get_languages(config=""))
+    except Exception:
+        pytest.skip("Tesseract not installed")
+    detector = ScriptDetector()
+    language = detector.languages[script]
+    if language not in installed:
+        pytest.skip(f"Tesseract pack {language} not installed")
+
+    result = detector.detect(render(SAMPLES[script][1], SAMPLES[script][0]))
+    assert result["script"] == script
+    assert result["language"] == language
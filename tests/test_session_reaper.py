@@ -0,0 +1,112 @@
+"""The reaper ends only abandoned sessions, and session end reaches every worker"""
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import services.transcript_store as store_module
+import services.transcription_service as transcription_module
+from database.database import Base
+from services.pubsub import PubSubBackend
+from services.session_reaper import SessionReaper
+from services.transcript_journal import TranscriptJournal
+from services.transcription_service import TranscriptionService
+
+
+class Bus(PubSubBackend):
+    """Stands in for Redis/Postgres: every subscribed worker gets each message as a remote one"""
+
+    async def publish(self, channel: str, message: dict):
+        for handler in list(self._handlers.get(channel, ())):
+            await handler(message, True)
+
+
+async def use_test_database(tmp_path, monkeypatch):
+    # end_local_session writes the transcript to the database
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(store_module, "async_session_maker", async_sessionmaker(engine))
+    return engine
+
+
+async def worker(name: str) -> TranscriptionService:
+    """A worker's service with its own transcription directory"""
+    service = TranscriptionService()
+    service.transcription_dir = os.path.join("transcription", name)
+    service.journal = TranscriptJournal(service.transcription_dir)
+    await service.start()
+    return service
+
+
+def test_streaming_sessions_are_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcription_module, "pubsub", Bus())
+
+    async def main():
+        engine = await use_test_database(tmp_path, monkeypatch)
+        service = await worker("a")
+        for session_id in ("silent-call", "abandoned"):
+            await service.start_session(session_id)
+            service.last_activity[session_id] -= 7200  # Quiet for two hours
+        service.active_streams["silent-call"] = 1  # Held with VAD suppressing the audio
+
+        reaped = await SessionReaper(service, idle_ttl=300, max_idle=3600).reap()
+        assert reaped == 1
+        assert set(service.active_sessions) == {"silent-call"}
+        # Flushed to its session file before being dropped
+        assert [name for name in os.listdir("transcription/a") if name.startswith("abandoned_")][0].endswith(".json")
+        await service.journal.close_all()
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def test_audio_on_another_worker_keeps_the_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcription_module, "pubsub", Bus())
+
+    async def main():
+        engine = await use_test_database(tmp_path, monkeypatch)
+        # The agent watches on the first worker, the user streams through the second
+        agent_worker, user_worker = await worker("a"), await worker("b")
+        for service in (agent_worker, user_worker):
+            await service.start_session("call")
+            service.last_activity["call"] -= 7200
+        user_worker.active_streams["call"] = 1
+
+        # The streaming worker's pass announces the stream; the other counts it as activity
+        assert await SessionReaper(user_worker, idle_ttl=300, max_idle=3600).reap() == 0
+        assert await SessionReaper(agent_worker, idle_ttl=300, max_idle=3600).reap() == 0
+        assert "call" in agent_worker.active_sessions
+
+        # Once the stream stops, each worker reaps its own copy
+        user_worker.active_streams.pop("call")
+        for service in (agent_worker, user_worker):
+            service.last_activity["call"] -= 7200
+            assert await SessionReaper(service, idle_ttl=300, max_idle=3600).reap() == 1
+            assert service.active_sessions == {}
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def test_end_session_reaches_every_worker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcription_module, "pubsub", Bus())
+
+    async def main():
+        engine = await use_test_database(tmp_path, monkeypatch)
+        agent_worker, user_worker = await worker("a"), await worker("b")
+        await agent_worker.start_session("call")
+        await user_worker.start_session("call")
+
+        # Ended on a worker that doesn't hold the session at all
+        bystander = await worker("c")
+        assert await bystander.end_session("call") is None
+
+        # Both copies were finalised into their session files, journals removed
+        assert agent_worker.active_sessions == {} and user_worker.active_sessions == {}
+        for name in ("a", "b"):
+            files = os.listdir(f"transcription/{name}")
+            assert len(files) == 1 and files[0].endswith(".json")
+        await engine.dispose()
+    asyncio.run(main())
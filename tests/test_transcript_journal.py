@@ -0,0 +1,38 @@
+"""Journals are replayed only once their owning worker is gone"""
+import asyncio
+import os
+
+from services.transcript_journal import TranscriptJournal
+
+
+def test_live_journal_is_not_replayed(tmp_path):
+    async def main():
+        owner = TranscriptJournal(str(tmp_path), fsync_policy="never")
+        sibling = TranscriptJournal(str(tmp_path), fsync_policy="never")
+        filename = os.path.join(str(tmp_path), "call_1.json")
+        await owner.open("call", filename, {})
+        await owner.append_transcript("call", {"transcript_id": "t1", "original_text": "hello"})
+
+        assert sibling.replay() == []
+
+        await owner.close("call")  # Worker exits: the lock goes with it
+        recovered = sibling.replay()
+        assert [session.session_id for session in recovered] == ["call"]
+        assert recovered[0].transcripts[0]["transcript_id"] == "t1"
+
+        # Two workers replayed it at startup: only one adopts it
+        assert await sibling.resume("call", filename)
+        assert not await owner.resume("call", filename)
+        await sibling.close("call")
+    asyncio.run(main())
+
+
+def test_compaction_removes_the_journal(tmp_path):
+    async def main():
+        journal = TranscriptJournal(str(tmp_path), fsync_policy="never")
+        filename = os.path.join(str(tmp_path), "call_1.json")
+        await journal.open("call", filename, {})
+        await journal.compact("call", filename, [], {})
+        assert os.listdir(str(tmp_path)) == ["call_1.json"]
+        assert journal.replay() == []
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Recovered sessions backfill transcript_segments from their journal"""
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import services.transcript_store as store_module
+import services.transcription_service as transcription_module
+from database.database import Base
+from database.models import TranscriptSegment
+from services.transcript_journal import TranscriptJournal
+from services.transcript_store import TranscriptStore
+from services.transcription_service import TranscriptionService
+
+
+def entry(transcript_id: str, text: str) -> dict:
+    return {
+        "type": "transcript",
+        "id": transcript_id,
+        "session_id": "call",
+        "speaker": "User",
+        "original_text": text,
+        "translated_text": text,
+        "source_language": "en",
+        "target_language": "en",
+        "confidence": 1.0,
+        "timestamp": datetime.utcnow().isoformat(),
+        "is_final": True
+    }
+
+
+def test_recovered_finals_reach_the_database_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        monkeypatch.setattr(store_module, "async_session_maker", session_maker)
+        store = TranscriptStore()
+        monkeypatch.setattr(transcription_module, "transcript_store", store)
+
+        # Before the crash: both finals journaled, only the first one's batch written
+        journal = TranscriptJournal("transcription", fsync_policy="never")
+        await journal.open("call", os.path.join("transcription", "call_1.json"), {})
+        for final in (entry("t1", "hello"), entry("t2", "world")):
+            await journal.append_transcript("call", final)
+        await journal.close("call")
+        store.add(entry("t1", "hello"))
+        await store.flush()
+
+        service = TranscriptionService()
+        assert await service.recover_sessions() == 1
+        await store.flush()
+
+        async with session_maker() as db:
+            rows = (await db.execute(select(TranscriptSegment.transcript_id))).scalars().all()
+        assert sorted(rows) == ["t1", "t2"]
+        await service.journal.close_all()
+        await engine.dispose()
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""Concurrent subscribers share one pub/sub registration per session"""
+import asyncio
+
+import services.transcription_service as transcription_module
+from services.pubsub import PubSubBackend
+from services.transcription_service import TranscriptionService
+
+
+class SlowListenPubSub(PubSubBackend):
+    """A remote backend: subscribing to the broker yields to the event loop"""
+
+    async def _listen(self, channel: str):
+        await asyncio.sleep(0.01)
+
+    async def _unlisten(self, channel: str):
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_subscribers_register_one_handler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = SlowListenPubSub()
+    monkeypatch.setattr(transcription_module, "pubsub", backend)
+
+    async def main():
+        service = TranscriptionService()
+        channel = service.channel("call")
+        received = {"agent": [], "user": []}
+
+        async def agent(message):
+            received["agent"].append(message["id"])
+
+        async def user(message):
+            received["user"].append(message["id"])
+
+        await asyncio.gather(service.subscribe("call", agent), service.subscribe("call", user))
+        assert len(backend._handlers[channel]) == 1
+
+        await backend.publish(channel, {"id": "t1", "session_id": "call", "speaker": "User", "is_final": True})
+        await asyncio.sleep(0.05)
+        assert received == {"agent": ["t1"], "user": ["t1"]}
+
+        await asyncio.gather(service.unsubscribe("call", agent), service.unsubscribe("call", user))
+        assert channel not in backend._handlers
+        assert "call" not in service.listening
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Oversized upload requests are refused before their body is read"""
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from services.upload_service import UploadSizeLimit
+
+LIMIT = 1000
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimit, paths=["/upload"], max_size=LIMIT)
+    calls = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app), calls
+
+
+def test_small_upload_passes():
+    client, calls = make_client()
+    response = client.post("/upload", files={"file": ("a.jpg", b"x" * 100)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+    assert calls == ["a.jpg"]
+
+
+def test_declared_oversized_body_is_rejected_unread():
+    client, calls = make_client()
+    response = client.post("/upload", files={"file": ("a.jpg", b"x" * (LIMIT * 2))})
+    assert response.status_code == 413
+    assert calls == []
+
+
+def test_chunked_oversized_body_is_cut_off():
+    client, calls = make_client()
+
+    def body():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.jpg"\r\n\r\n'
+        for _ in range(10):
+            yield b"x" * 500
+        yield b"\r\n--b--\r\n"
+
+    response = client.post(
+        "/upload", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413
+    assert calls == []
+
+
+def test_other_routes_are_not_limited():
+    client, _ = make_client()
+    response = client.post("/other", files={"file": ("a.jpg", b"x" * (LIMIT * 2))})
+    assert response.status_code == 200
@@ -0,0 +1,148 @@
+"""Whisper batching across streams, with inference stubbed out"""
+import asyncio
+
+import numpy as np
+import pytest
+
+import services.whisper_engine as whisper_module
+from services.whisper_engine import InferenceBatcher, WhisperEngine
+
+
+def segment(marker: int, samples: int = 1600) -> np.ndarray:
+    """Float32 audio whose value identifies the segment"""
+    return np.full(samples, marker / 32768.0, dtype=np.float32)
+
+
+def marker_of(audio: np.ndarray) -> int:
+    return int(round(audio[0] * 32768))
+
+
+class StubBatcher(InferenceBatcher):
+    """Records each batch; fails the batches listed in `fail`"""
+
+    def __init__(self, fail=(), **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+        self.fail = set(fail)
+
+    def _load(self):
+        return object()
+
+    def _infer(self, audios, languages):
+        self.batches.append([marker_of(audio) for audio in audios])
+        if len(self.batches) in self.fail:
+            raise RuntimeError("inference failed")
+        return [(f"segment {marker_of(audio)}", language or "en") for audio, language in zip(audios, languages)]
+
+
+def test_concurrent_segments_share_one_batch():
+    async def main():
+        batcher = StubBatcher(batch_size=8, wait_ms=50)
+        results = await asyncio.gather(*(batcher.transcribe(segment(i), "hi") for i in range(5)))
+        assert batcher.batches == [[0, 1, 2, 3, 4]]
+        assert results == [(f"segment {i}", "hi") for i in range(5)]
+
+        # A full batch goes without waiting for the window; the rest follow
+        results = await asyncio.gather(*(batcher.transcribe(segment(i), None) for i in range(10, 20)))
+        assert batcher.batches[1:] == [list(range(10, 18)), [18, 19]]
+        assert [text for text, _ in results] == [f"segment {i}" for i in range(10, 20)]
+        await batcher.stop()
+    asyncio.run(main())
+
+
+def test_failed_batch_does_not_wedge_the_batcher():
+    async def main():
+        batcher = StubBatcher(fail={1}, batch_size=8, wait_ms=20)
+        failed = await asyncio.gather(*(batcher.transcribe(segment(i), "en") for i in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in failed)
+        assert await batcher.transcribe(segment(7), "en") == ("segment 7", "en")
+        await batcher.stop()
+    asyncio.run(main())
+
+
+def test_cancelled_segments_are_skipped():
+    async def main():
+        batcher = StubBatcher(batch_size=8, wait_ms=50)
+        tasks = [asyncio.ensure_future(batcher.transcribe(segment(i), "en")) for i in range(4)]
+        await asyncio.sleep(0.01)  # Queued, batch window still open
+        tasks[1].cancel()
+        tasks[2].cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert batcher.batches == [[0, 3]]
+        assert results[0] == ("segment 0", "en") and results[3] == ("segment 3", "en")
+        await batcher.stop()
+    asyncio.run(main())
+
+
+class EveryChunkVad:
+    """Closes a segment after every chunk"""
+    keepalive = True
+    frames_total = 0
+
+    def process(self, pcm):
+        return pcm, True
+
+
+class SlowFirstBatcher:
+    """Earlier segments take longer, so results complete out of stream order"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+
+    async def transcribe(self, audio, language):
+        marker = marker_of(audio)
+        await asyncio.sleep(0.05 / marker)
+        if marker in self.fail:
+            raise RuntimeError("inference failed")
+        return f"segment {marker}", "en"
+
+    async def stop(self):
+        pass
+
+
+def chunk(marker: int) -> bytes:
+    return np.full(1600, marker, dtype=np.int16).tobytes()
+
+
+def run_stream(monkeypatch, batcher, chunks, hold_open: bool = False):
+    """Stream chunks through a WhisperEngine; returns (transcripts, stream task)"""
+    monkeypatch.setattr(whisper_module, "WhisperModel", object)
+    engine = WhisperEngine()
+    engine.batcher = batcher
+    transcripts = []
+
+    async def audio():
+        for data in chunks:
+            yield data
+        if hold_open:
+            await asyncio.Event().wait()
+
+    async def on_transcript(text, is_partial, language, original):
+        transcripts.append(text)
+
+    async def on_utterance_end():
+        pass
+
+    task = asyncio.create_task(engine.start_streaming_transcription(
+        audio(), on_transcript, on_utterance_end, input_sample_rate=16000, vad=EveryChunkVad()
+    ))
+    return transcripts, task
+
+
+def test_stream_keeps_order_and_survives_failed_segments(monkeypatch):
+    async def main():
+        transcripts, task = run_stream(monkeypatch, SlowFirstBatcher(fail={2}), [chunk(i) for i in range(1, 6)])
+        await task
+        assert transcripts == ["segment 1", "segment 3", "segment 4", "segment 5"]
+    asyncio.run(main())
+
+
+def test_cancelled_stream_reraises(monkeypatch):
+    async def main():
+        transcripts, task = run_stream(monkeypatch, SlowFirstBatcher(), [chunk(1)], hold_open=True)
+        await asyncio.sleep(0.1)
+        assert transcripts == ["segment 1"]
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())